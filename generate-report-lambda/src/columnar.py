@@ -0,0 +1,40 @@
+"""Reader for the binary columnar simulation output (simulations.result_blob).
+
+Mirrors unpack_columnar in run-simulation-lambda/src/lib/columnar.py, see there for the layout.
+"""
+import json
+import struct
+import zlib
+
+import numpy as np
+
+MAGIC = b'M2MC\x01'
+
+
+def unpack_columnar(blob):
+    """Decode a result_blob to dicts, lists and (writable) numpy arrays."""
+    blob = bytes(blob)
+    if not blob.startswith(MAGIC):
+        raise ValueError('Not a columnar simulation blob')
+    raw = bytearray(zlib.decompress(blob[len(MAGIC):]))
+    n = struct.unpack_from('<I', raw, 0)[0]
+    manifest = json.loads(raw[4:4 + n].decode('utf-8'))
+    data = memoryview(raw)[4 + n:]
+
+    arrays = []
+    for entry in manifest['arrays']:
+        count = int(np.prod(entry['shape'], dtype=np.int64))
+        arrays.append(np.frombuffer(data, dtype=entry['dtype'], count=count, offset=entry['offset']).reshape(entry['shape']))
+
+    def walk(value):
+        if isinstance(value, dict):
+            if '__array__' in value:
+                return arrays[value['__array__']]
+            if '__columns__' in value:
+                return dict(zip(value['keys'], arrays[value['__columns__']]))
+            return {k: walk(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [walk(v) for v in value]
+        return value
+
+    return walk(manifest['tree'])
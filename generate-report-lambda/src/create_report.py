@@ -100,6 +100,32 @@ def _sanitize_filename_base(name: str, default: str = 'report') -> str:
     s = re.sub(r'[^A-Za-z0-9._ÆØÅæøå-]+', '', s)
     return s or default
 
+def load_table(s):
+    # Rows of the load table. Point loads, moments and self weight have coor2 [None, None], NaN in the simulation
+    last = []
+    for ii in range(s.numOfLoads):
+        if (s.coor2[ii][0] is None or s.coor2[ii][1] is None) and not (s.coor2[ii][0] is None and s.coor2[ii][1] is None): #punktlast
+            last.append({'laster' : s.loadtypes[ii],
+                                'enhed' : 'kN',
+                                'lasttype' : 'Punktlast',
+                                'coor1' : str(s.coor1[ii]),
+                                'coor2' : ' - ',
+                                'Fx1' : str(num2deci(s.Fxy1[ii][0]*10**-3)),
+                                'Fx2' : ' - ',
+                                'Fy1' : str(num2deci(s.Fxy1[ii][1]*10**-3)),
+                                'Fy2' : ' - '})
+        elif not (s.coor2[ii][0] is None and s.coor2[ii][1] is None):
+            last.append({'laster' : s.loadtypes[ii],
+                                'enhed' : 'kN/m',
+                                'lasttype' : 'Linjelast',
+                                'coor1' : str(s.coor1[ii]),
+                                'coor2' : str(s.coor2[ii]),
+                                'Fx1' : str(num2deci(s.Fxy1[ii][0]*10**-3)),
+                                'Fx2' : str(num2deci(s.Fxy2[ii][0]*10**-3)),
+                                'Fy1' : str(num2deci(s.Fxy1[ii][1]*10**-3)),
+                                'Fy2' : str(num2deci(s.Fxy2[ii][1]*10**-3))})
+    return last
+
 def create_report(s, team_id, project_id, title: str | None = None):
 
     def get_template_path(reportName: str) -> str   :
@@ -189,28 +215,7 @@ def create_report(s, team_id, project_id, title: str | None = None):
         membertype = m.beamtype
         memberprop = m.beamprop
         
-        last = []
-        for ii in range(s.numOfLoads):
-            if (s.coor2[ii][0] is None or s.coor2[ii][1] is None) and not (s.coor2[ii][0] is None and s.coor2[ii][1] is None): #punktlast
-                last.append({'laster' : s.loadtypes[ii],
-                                    'enhed' : 'kN',
-                                    'lasttype' : 'Punktlast',
-                                    'coor1' : str(s.coor1[ii]),
-                                    'coor2' : ' - ',
-                                    'Fx1' : str(num2deci(s.Fxy1[ii][0]*10**-3)),
-                                    'Fx2' : ' - ',
-                                    'Fy1' : str(num2deci(s.Fxy1[ii][1]*10**-3)),
-                                    'Fy2' : ' - '})
-            elif not (s.coor2[ii][0] is None and s.coor2[ii][1] is None):
-                last.append({'laster' : s.loadtypes[ii],
-                                    'enhed' : 'kN/m',
-                                    'lasttype' : 'Linjelast',
-                                    'coor1' : str(s.coor1[ii]),
-                                    'coor2' : str(s.coor2[ii]),
-                                    'Fx1' : str(num2deci(s.Fxy1[ii][0]*10**-3)),
-                                    'Fx2' : str(num2deci(s.Fxy2[ii][0]*10**-3)),
-                                    'Fy1' : str(num2deci(s.Fxy1[ii][1]*10**-3)),
-                                    'Fy2' : str(num2deci(s.Fxy2[ii][1]*10**-3))})
+        last = load_table(s)
         
         if membertype == 'Stål':
             if 'HE' in memberprop['profile'] or 'IP' in memberprop['profile'] or 'UN' in memberprop['profile']:
@@ -8,6 +8,7 @@ sys.path.append(os.path.dirname(__file__))
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from src.create_report import create_report
+from src.columnar import unpack_columnar
 from sqlalchemy.sql import select, insert
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy import create_engine, Table, MetaData
@@ -140,8 +141,12 @@ def handler(event, context):
 
     requested_title = body.get('title') or 'Report'
 
-    # Get state from simulation encoded_s (can be dict, JSON string, or bytes)
-    s = sim.get('encoded_s')
+    # Get state from the columnar result_blob if stored, else from simulation encoded_s (can be dict, JSON string, or bytes)
+    result_blob = sim.get('result_blob')
+    if result_blob is not None:
+        s = unpack_columnar(result_blob)
+    else:
+        s = sim.get('encoded_s')
     try:
         print(f"[generate-report] encoded_s python type={type(s).__name__}")
     except Exception:
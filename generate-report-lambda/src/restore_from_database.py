@@ -1,4 +1,5 @@
 from main import simulations_table, engine
+from columnar import unpack_columnar
 from sqlalchemy.sql import select, update
 import numpy as np
 
@@ -25,11 +26,14 @@ def restore_s_from_database(simulation_id, user_id, session):
     if simulation is None:
         raise ValueError("Simulation not found")
 
-    if simulation.result is None:
+    # Parse the stored results, the full output is in the columnar result_blob when present (result is then a summary)
+    result_blob = getattr(simulation, 'result_blob', None)
+    if result_blob is not None:
+        result = unpack_columnar(result_blob)["result"]
+    elif simulation.result is None:
         raise ValueError("Simulation has no stored results")
-
-    # Parse the stored results
-    result = json.loads(simulation.result)
+    else:
+        result = json.loads(simulation.result)
 
     # Create base instances
     project = Project()
@@ -0,0 +1 @@
+ALTER TABLE "simulations" ADD COLUMN "result_blob" bytea;
\ No newline at end of file
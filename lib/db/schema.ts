@@ -149,6 +149,7 @@ export const simulations = pgTable('simulations', {
   result: jsonb('result'),
   meta: jsonb('meta'),
   encodedS: bytea('encoded_s'), // Pickle-serialized Python S class object stored as binary data
+  resultBlob: bytea('result_blob'), // Full simulation output in the binary columnar format, result then holds a summary
   createdAt: timestamp('created_at').notNull().defaultNow(),
   updatedAt: timestamp('updated_at').notNull().defaultNow(),
   deletedAt: timestamp('deleted_at'),
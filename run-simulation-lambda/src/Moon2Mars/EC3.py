@@ -281,3 +281,144 @@ class EC3calc:
             
         self.UR_deformation = self.max_def/self.maxAllowable
         self.UR['Deformation ' + LG_string + ' L/' + str(self.deflectionRequirement)] = self.UR_deformation
+
+
+class EC3calcBatch:
+    # The checks of EC3calc for all combinations of a member in one call.
+    # F1, F2, M, Ve_loc: (n_comb, n_elements, 2) and Ve: (n_comb, n_elements, 2, 2). Results are arrays over the
+    # combinations, view(k) gives the EC3calc object of combination k for the reports
+    def __init__(self, ECbase, F1, F2, M, Ve, Ve_loc):
+        self.ECbase = ECbase
+        self.nComb = np.size(F1,0)
+        self.F1 = F1
+        self.F2 = F2
+        self.M = M
+        self.Ve = Ve
+        self.Ve_loc = Ve_loc
+        self.UR = {}
+        self.constants = {} # attributes of EC3calc that are the same for all combinations
+        self.results = {} # attributes of EC3calc as arrays over the combinations
+
+    def forskydning626(self):
+        ECbase = self.ECbase
+        profile = ECbase.profile
+
+        f_y = ECbase.f_y_krop
+        A = ECbase.A
+        b = ECbase.b
+        t_f = ECbase.t
+        t_w = ECbase.d
+        r = ECbase.r
+        h = ECbase.h
+
+        if 'HE' in profile or 'IP' in profile:
+            A_v_1 = A-2*b*t_f+(t_w+2*r)*t_f
+            A_v_2 = (h-2*t_f)*t_w
+            A_v = np.max([A_v_1, A_v_2])
+        elif 'UN' in profile:
+            A_v = A-2*b*t_f+(t_w+r)*t_f
+        elif 'RH' in profile:
+            A_v = A*h/(b+h)
+        else:
+            raise SyntaxError('MUHAHA THIS BEAM TYPE IS NOT YET IMPLEMENTED FOR SHEAR AREA')
+
+        V_plRd = A_v*(f_y/np.sqrt(3))/ECbase.gamma_M0
+        V_cRd = V_plRd
+        V_Ed = np.max(np.abs(self.F2).reshape((self.nComb,-1)), axis=1)
+
+        self.UR_forskydning626 = V_Ed/V_cRd
+        self.UR['Forskydning - DS/EN 1993-1-1 6.2.6'] = self.UR_forskydning626
+        self.constants.update({'A_v': A_v, 'V_plRd': V_plRd, 'V_cRd': V_cRd})
+        self.results.update({'V_Ed': V_Ed, 'UR_forskydning626': self.UR_forskydning626})
+
+    def boejningsmoment625(self):
+        # Requires forskydning626
+        ECbase = self.ECbase
+        V_Ed = self.results['V_Ed']
+        V_plRd = self.constants['V_plRd']
+
+        f_y = np.full(self.nComb, ECbase.f_y_flange)
+        reduced = self.UR_forskydning626 > 0.5 # f_y reduceret da forskydning er udnyttet mere end 0.5
+        rho = (2*V_Ed[reduced]/V_plRd-1)**2
+        f_y[reduced] = (1-rho)*f_y[reduced]
+
+        M_Ed = np.max(np.abs(self.M).reshape((self.nComb,-1)), axis=1)
+        M_cRd = ECbase.W_pl*f_y/ECbase.gamma_M0
+
+        self.UR_boejningsmoment625 = M_Ed/M_cRd
+        self.UR['Bøjningsmoment - DS/EN 1993-1-1 6.2.5'] = self.UR_boejningsmoment625
+        self.results.update({'M_Ed': M_Ed, 'M_cRd': M_cRd, 'UR_boejningsmoment625': self.UR_boejningsmoment625})
+
+    def trykpaavirkedeElementerMedKonstantTvaersnit631(self):
+        ECbase = self.ECbase
+
+        soejletilfaelde = 'simpel understøttet'
+        N_cr = (np.pi/ECbase.beam['L'])**2*ECbase.beam['E']*ECbase.I_z # about z-axis SIMPEL UNDERSTØTTET
+
+        soejlekurve = 'c'
+        if 'RH' in ECbase.profile:
+            soejlekurve = 'a'
+        if soejlekurve == 'c':
+            alpha = 0.49
+        elif soejlekurve == 'a':
+            alpha = 0.21
+
+        f_y = ECbase.f_y_flange
+        A = ECbase.A
+
+        Lambda = np.sqrt(A*f_y/N_cr) # For klasse 1, 2 og 3
+        Phi = 0.5*(1+alpha*(Lambda-0.2)+Lambda**2)
+        chi = np.min([1/(Phi + np.sqrt(Phi**2 - Lambda**2)), 1])
+        N_bRd = chi*A*f_y/ECbase.gamma_M1 # For klasse 1, 2 og 3
+
+        F1min = np.min(self.F1.reshape((self.nComb,-1)), axis=1)
+        N_Ed = np.where(F1min >= 0, 0, np.abs(F1min))
+
+        self.UR_Tryk631 = N_Ed/N_bRd
+        self.UR['Tryk - DS/EN 1993-1-1 6.3.1'] = self.UR_Tryk631
+        self.constants.update({'soejletilfaelde': soejletilfaelde, 'soejlekurve': soejlekurve, 'alpha': alpha, 'Lambda': Lambda,
+                               'N_cr': N_cr, 'chi': chi, 'N_bRd': N_bRd})
+        self.results.update({'N_Ed': N_Ed, 'UR_Tryk631': self.UR_Tryk631})
+
+    def lokaleTvaergaaendeKraefter617(self):
+        # Capacity from EC3calc.lokaleTvaergaaendeKraefter617, which depends on the profile only
+        view = EC3calc(self.ECbase)
+        view.F2 = np.zeros(1)
+        view.lokaleTvaergaaendeKraefter617()
+
+        R = np.max(np.abs(self.F2).reshape((self.nComb,-1)), axis=1)
+
+        self.UR_lokaleTvaergaaendeKraefter617 = R/view.R_wRd
+        self.UR['Lokale tværgående kræfter - DS/EN 1993-1-3 6.1.7'] = self.UR_lokaleTvaergaaendeKraefter617
+        self.constants.update({name: view.__dict__[name] for name in ['Ss', 'phi', 'h_w', 'k', 'k1', 'k2', 'k3', 'k4', 'k5', 'R_wRd']})
+        self.results.update({'R': R, 'UR_lokaleTvaergaaendeKraefter617': self.UR_lokaleTvaergaaendeKraefter617})
+
+    def deformation(self):
+        ECbase = self.ECbase
+        maxAllowable = ECbase.beam['L']/ECbase.deflectionRequirement
+
+        if ECbase.deflectionIsLocal:
+            max_def = np.max(np.abs(self.Ve_loc).reshape((self.nComb,-1)), axis=1)
+            LG_string = '(lokal),'
+        else:
+            max_def = np.max(np.sqrt(self.Ve[...,0]**2 + self.Ve[...,1]**2).reshape((self.nComb,-1)), axis=1)
+            LG_string = '(global),'
+
+        self.UR_deformation = max_def/maxAllowable
+        self.UR['Deformation ' + LG_string + ' L/' + str(ECbase.deflectionRequirement)] = self.UR_deformation
+        self.constants['maxAllowable'] = maxAllowable
+        self.results.update({'max_def': max_def, 'UR_deformation': self.UR_deformation})
+
+    def view(self, k):
+        # EC3calc object of combination k with the results and section forces of that combination
+        ECcalcObj = EC3calc(self.ECbase)
+        ECcalcObj.__dict__.update(self.constants)
+        for name, value in self.results.items():
+            ECcalcObj.__dict__[name] = value[k]
+        ECcalcObj.F1 = self.F1[k]
+        ECcalcObj.F2 = self.F2[k]
+        ECcalcObj.M = self.M[k]
+        ECcalcObj.Ve = self.Ve[k]
+        ECcalcObj.Ve_loc = self.Ve_loc[k]
+        ECcalcObj.UR = {key: value[k] for key, value in self.UR.items()}
+        return ECcalcObj
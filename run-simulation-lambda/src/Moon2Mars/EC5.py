@@ -9,6 +9,25 @@ from Moon2Mars.Wood_parameters import WoodProp
 import numpy as np
 import math
 
+def getLoadDuration(loadtypes, loads, typeOfState):
+    # Load duration class of a combination from the load types with a nonzero coefficient
+    idx = np.flatnonzero(np.abs(np.asarray(loads, float)) > 1e-12)
+    loadtypesInComb = [loadtypes[i] for i in idx]
+
+    # Determine load duration based on load types in combination
+    if 'Vindlast' in loadtypesInComb:
+        return 'Instantaneous'
+    elif 'ALS' in typeOfState:
+        return 'Instantaneous'
+    elif 'Snelast' in loadtypesInComb:
+        return 'Short term'
+    elif 'Nyttelast' in loadtypesInComb:
+        return 'Medium term'
+    elif 'Egenlast' in loadtypesInComb:
+        return 'Permanent'
+    else:
+        return 'Medium term' ### SIKRE DENNE FOR NYE LASTKOMBINATIONER
+
 class EC5base:
     def __init__(self, selfS, member_discr):
         
@@ -113,32 +132,13 @@ class EC5base:
 
 
 class EC5calc:
-    def __init__(self, ECbase, lc, loadcombMatDict, typeOfState):
+    def __init__(self, ECbase, combination):
         # Copy attributes from EC3base instance
         self.__dict__.update(ECbase.__dict__)
         self.UR = {}
 
-        def getLoadDuration(loadtypes, lc, loadcombMatDict, typeOfState):
-
-            loads = loadcombMatDict[lc]
-            idx = np.flatnonzero(np.abs(np.asarray(loads, float)) > 1e-12)
-            loadtypesInComb = [loadtypes[i] for i in idx]
-
-            # Determine load duration based on load types in combination
-            if 'Vindlast' in loadtypesInComb:
-                return 'Instantaneous'
-            elif 'ALS' in typeOfState:
-                return 'Instantaneous'
-            elif 'Snelast' in loadtypesInComb:
-                return 'Short term'
-            elif 'Nyttelast' in loadtypesInComb:
-                return 'Medium term'
-            elif 'Egenlast' in loadtypesInComb:
-                return 'Permanent'
-            else:
-                return 'Medium term' ### SIKRE DENNE FOR NYE LASTKOMBINATIONER
-
-        self.loadDuration = getLoadDuration(self.loadtypes, lc, loadcombMatDict, typeOfState)
+        # combination: record of the load combination, see S.buildLoadCombinations
+        self.loadDuration = combination['loadDuration']
         self.k_mod = self.woodprop.getKmod(self.loadDuration, self.material1)
         
     def trykVinkelretPaaFibrene615(self):
@@ -311,7 +311,7 @@ class EC5calc:
                 k_h = 1                
         return k_h
 
-    def deformation(self, lc):
+    def deformation(self, combination):
         
         if self.deflectionIsLocal:
             self.maxV = np.max(abs(self.Ve_loc))
@@ -330,25 +330,26 @@ class EC5calc:
         
         self.u_fin = self.u_inst*(1+self.k_def)
 
-        if 'Egenlast' in lc:
+        dominant = combination['dominant']
+        if dominant == 'Egenlast':
             self.maxDefDead = self.L/self.deflectionRequirementFinished
             self.UR_deformation_dead = self.u_fin/self.maxDefDead
 
             self.UR['Deformation ' + LG_string + ' fin L/' + str(self.deflectionRequirementFinished)] = self.UR_deformation_dead
 
-        elif 'Snelast' in lc:
+        elif dominant == 'Snelast':
             self.maxDefSnow = self.L/self.deflectionRequirementInstantSnow
             self.UR_deformation_snow = self.u_inst/self.maxDefSnow
             
             self.UR['Deformation ' + LG_string + ' inst L/' + str(self.deflectionRequirementInstantSnow)] = self.UR_deformation_snow
 
-        elif 'Vindlast' in lc:
+        elif dominant == 'Vindlast':
             self.maxDefWind = self.L/self.deflectionRequirementInstantWind
             self.UR_deformation_wind = self.u_inst/self.maxDefWind
 
             self.UR['Deformation ' + LG_string + ' inst L/' + str(self.deflectionRequirementInstantWind)] = self.UR_deformation_wind
 
-        elif 'Nyttelast' in lc:
+        elif dominant == 'Nyttelast':
             self.maxDefLive = self.L/self.deflectionRequirementInstantLive
             self.UR_deformation_live = self.u_inst/self.maxDefLive
 
@@ -408,21 +409,180 @@ class EC5calc:
         print(f'UR = {UR}')
         
         
-    def Abeam(self,X1,X2):
-        a0 = X2 - X1
-        L = math.sqrt(np.matmul(a0,a0))
-        n = a0/L
-        A = [[n[0], n[1], 0, 0, 0, 0],
-             [-n[1], n[0], 0, 0, 0, 0],
-             [0, 0, 1, 0, 0, 0],
-             [0, 0, 0, n[0], n[1], 0],
-             [0, 0, 0, -n[1], n[0],0],
-             [0, 0, 0, 0, 0, 1]]
-        return A, L
 
-        
 
+class EC5calcBatch:
+    # The checks of EC5calc for all combinations of a member in one call, with the load duration and k_mod as arrays
+    # over the combinations. combinations: the records of the combinations, see S.buildLoadCombinations.
+    # F1, F2, M, Ve_loc: (n_comb, n_elements, 2) and Ve: (n_comb, n_elements, 2, 2).
+    # view(k) gives the EC5calc object of combination k for the reports
+    def __init__(self, ECbase, combinations, F1, F2, M, Ve, Ve_loc):
+        self.ECbase = ECbase
+        self.combinations = combinations
+        self.nComb = len(combinations)
+        self.F1 = F1
+        self.F2 = F2
+        self.M = M
+        self.Ve = Ve
+        self.Ve_loc = Ve_loc
+        self.UR = {}
+        self.constants = {} # attributes of EC5calc that are the same for all combinations
+        self.results = {} # attributes of EC5calc as arrays over the combinations
+        self.present = {} # masks of the combinations having an attribute or check, when not all
+
+        k_mod = {}
+        self.loadDuration = np.array([combination['loadDuration'] for combination in combinations], dtype=object)
+        for loadDuration in self.loadDuration:
+            if loadDuration not in k_mod:
+                k_mod[loadDuration] = ECbase.woodprop.getKmod(loadDuration, ECbase.material1)
+        self.k_mod = np.array([k_mod[loadDuration] for loadDuration in self.loadDuration], float)
+        self.results.update({'loadDuration': self.loadDuration, 'k_mod': self.k_mod})
+
+    def get_k_h(self, h, woodType):
+        return EC5calc.get_k_h(self, h, woodType)
+
+    def trykVinkelretPaaFibrene615(self):
+        ECbase = self.ECbase
+        f_c90d = (self.k_mod*ECbase.k_sys*ECbase.f_c90k)/ECbase.gamma_M
+
+        #For elementer på enkeltunderstøtninger, forudsat at "1 ≥ 2h, se figur 6.2b, bør værdien af kc,90 sættes til:
+        if ECbase.woodType1 == 'Glued laminated' and ECbase.vederlag_længderetning <= 400*10**-3:
+            k_c90 = 1.75
+        elif ECbase.woodType1 == 'Solid timber':
+            k_c90 = 1.5
+
+        A_ef = (ECbase.vederlag_længderetning + 30*10**-3)*ECbase.b
+        R = np.maximum(np.abs(self.F2[:,0,0]), np.abs(self.F2[:,-1,-1]))
+        sigma_c90d = R/A_ef
+
+        self.UR_trykVinkelretPaaFibrene615 = sigma_c90d/(k_c90*f_c90d)
+        self.UR['Tryk vinkelret på fibrene - DS/EN 1995 6.1.5'] = self.UR_trykVinkelretPaaFibrene615
+        self.results['UR_trykVinkelretPaaFibrene615'] = self.UR_trykVinkelretPaaFibrene615
+
+    def trykParalleltMedFibrene614(self):
+        ECbase = self.ECbase
+        F1vec = self.F1.reshape((self.nComb,-1))
+        F1maxAbs = F1vec[np.arange(self.nComb), np.argmax(np.abs(F1vec), axis=1)]
+        N_cEd = np.where(F1maxAbs > 0, 0, np.abs(F1maxAbs))
+
+        A = ECbase.b*ECbase.h
+        sigma_c0d = N_cEd/A
+        f_c0d = self.k_mod*ECbase.k_sys*ECbase.f_c0k/ECbase.gamma_M
+
+        self.UR_trykParalleltMedFibrene614 = sigma_c0d/f_c0d
+        self.UR['Tryk parallelt med fibrene - DS/EN 1995 6.1.4'] = self.UR_trykParalleltMedFibrene614
+        self.results.update({'N_cEd': N_cEd, 'sigma_c0d': sigma_c0d, 'f_c0d': f_c0d, 'UR_trykParalleltMedFibrene614': self.UR_trykParalleltMedFibrene614})
+
+    def traekParalleltMedFibrene612(self):
+        ECbase = self.ECbase
+        F1vec = self.F1.reshape((self.nComb,-1))
+        F1maxAbs = F1vec[np.arange(self.nComb), np.argmax(np.abs(F1vec), axis=1)]
+        N_tEd = np.where(F1maxAbs <= 0, 0, np.abs(F1maxAbs))
+
+        k_ht = self.get_k_h(ECbase.b, ECbase.woodType1)
+        A = ECbase.b*ECbase.h
+        sigma_t0d = N_tEd/A
+        f_t0d = k_ht*self.k_mod*ECbase.k_sys*ECbase.f_t0k/ECbase.gamma_M
 
+        self.UR_traekParalleltMedFibrene612 = sigma_t0d/f_t0d
+        self.UR['Træk parallelt med fibrene - DS/EN 1995 6.1.2'] = self.UR_traekParalleltMedFibrene612
+        self.constants['k_ht'] = k_ht
+        self.results.update({'N_tEd': N_tEd, 'sigma_t0d': sigma_t0d, 'f_t0d': f_t0d, 'UR_traekParalleltMedFibrene612': self.UR_traekParalleltMedFibrene612})
+
+    def forskydning617(self):
+        ECbase = self.ECbase
+        V_Ed = np.max(np.abs(self.F2).reshape((self.nComb,-1)), axis=1)
+
+        k_cr = 1 # altid 1 i DK
+        A_cr = k_cr*ECbase.b*ECbase.h
+        tau = 3/2*V_Ed/A_cr
+        f_vd = self.k_mod*ECbase.k_sys*ECbase.f_vk/ECbase.gamma_M
+
+        self.UR_forskydning617 = tau/f_vd
+        self.UR['Forskydning - DS/EN 1995 6.1.7'] = self.UR_forskydning617
+        self.constants.update({'k_cr': k_cr, 'A_cr': A_cr})
+        self.results.update({'V_Ed': V_Ed, 'tau': tau, 'f_vd': f_vd, 'UR_forskydning617': self.UR_forskydning617})
+
+    def boejning616(self):
+        ECbase = self.ECbase
+        maxM = np.max(np.abs(self.M).reshape((self.nComb,-1)), axis=1)
+
+        k_hm = self.get_k_h(ECbase.h, ECbase.woodType1)
+        sigma_myd = (maxM*(ECbase.h/2))/ECbase.I
+        f_myd = (self.k_mod*ECbase.k_sys*k_hm*ECbase.f_mk)/ECbase.gamma_M
+
+        UR_boejning611 = sigma_myd/f_myd
+        UR_boejning612 = ECbase.k_m*sigma_myd/f_myd
+
+        self.UR_boejning616 = np.maximum(UR_boejning611, UR_boejning612)
+        self.UR['Bøjning - DS/EN 1995 6.1.6'] = self.UR_boejning616
+        self.constants['k_hm'] = k_hm
+        self.results.update({'maxM': maxM, 'sigma_myd': sigma_myd, 'f_myd': f_myd, 'UR_boejning616': self.UR_boejning616})
+
+    def boejningOgTraek623(self):
+        self.traekParalleltMedFibrene612()
+        self.boejning616()
+
+        self.UR_boejningOgTraek623 = self.UR_traekParalleltMedFibrene612 + self.UR_boejning616
+        self.UR['Kombineret bøjning og aksialt træk - DS/EN 1995 6.2.3'] = self.UR_boejningOgTraek623
+        self.results['UR_boejningOgTraek623'] = self.UR_boejningOgTraek623
+
+    def boejningOgTryk624(self):
+        self.trykParalleltMedFibrene614()
+        self.boejning616()
 
+        self.UR_boejningOgTryk624 = self.UR_trykParalleltMedFibrene614**2 + self.UR_boejning616
+        self.UR['Kombineret bøjning og aksialt tryk - DS/EN 1995 6.2.4'] = self.UR_boejningOgTryk624
+        self.results['UR_boejningOgTryk624'] = self.UR_boejningOgTryk624
 
+    def deformation(self):
+        # The requirement follows the dominant load of the combination as in EC5calc.deformation
+        ECbase = self.ECbase
+        if ECbase.deflectionIsLocal:
+            maxV = np.max(np.abs(self.Ve_loc).reshape((self.nComb,-1)), axis=1)
+            LG_string = '(lokal),'
+        else:
+            maxV = np.max(np.sqrt(self.Ve[...,0]**2 + self.Ve[...,1]**2).reshape((self.nComb,-1)), axis=1)
+            LG_string = '(global),'
 
+        u_inst = maxV#*(1+forskydningsudbøjningsFaktor)
+        u_fin = u_inst*(1+ECbase.k_def)
+        self.results.update({'maxV': maxV, 'u_inst': u_inst, 'u_fin': u_fin})
+
+        requirements = [('Egenlast', 'maxDefDead', 'UR_deformation_dead', ' fin L/', ECbase.deflectionRequirementFinished, u_fin),
+                        ('Snelast', 'maxDefSnow', 'UR_deformation_snow', ' inst L/', ECbase.deflectionRequirementInstantSnow, u_inst),
+                        ('Vindlast', 'maxDefWind', 'UR_deformation_wind', ' inst L/', ECbase.deflectionRequirementInstantWind, u_inst),
+                        ('Nyttelast', 'maxDefLive', 'UR_deformation_live', ' inst L/', ECbase.deflectionRequirementInstantLive, u_inst)]
+        dominant = np.array([combination['dominant'] for combination in self.combinations], dtype=object)
+        for loadtype, maxDefName, URname, limitString, deflectionRequirement, u in requirements:
+            mask = dominant == loadtype
+            if not mask.any():
+                continue
+            maxDef = ECbase.L/deflectionRequirement
+            UR = np.full(self.nComb, np.nan)
+            UR[mask] = u[mask]/maxDef
+            self.results.update({maxDefName: np.full(self.nComb, maxDef), URname: UR})
+            self.present.update({maxDefName: mask, URname: mask})
+            key = 'Deformation ' + LG_string + limitString + str(deflectionRequirement) # the same for requirements with equal limits
+            if key in self.UR:
+                self.UR[key][mask] = UR[mask]
+                self.present[key] = self.present[key] | mask
+            else:
+                self.UR[key] = UR
+                self.present[key] = mask
+
+    def view(self, k):
+        # EC5calc object of combination k with the results and section forces of that combination
+        ECcalcObj = EC5calc.__new__(EC5calc) # load duration and k_mod are taken from the batch
+        ECcalcObj.__dict__.update(self.ECbase.__dict__)
+        ECcalcObj.__dict__.update(self.constants)
+        for name, value in self.results.items():
+            if name not in self.present or self.present[name][k]:
+                ECcalcObj.__dict__[name] = value[k]
+        ECcalcObj.F1 = self.F1[k]
+        ECcalcObj.F2 = self.F2[k]
+        ECcalcObj.M = self.M[k]
+        ECcalcObj.Ve = self.Ve[k]
+        ECcalcObj.Ve_loc = self.Ve_loc[k]
+        ECcalcObj.UR = {key: value[k] for key, value in self.UR.items() if key not in self.present or self.present[key][k]}
+        return ECcalcObj
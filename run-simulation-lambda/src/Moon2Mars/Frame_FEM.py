@@ -1,13 +1,15 @@
 #Program to analys of 2D frames
 import numpy as np
-import math
 from Moon2Mars.Steel_beams import SteelBeams
 from Moon2Mars.Steel_parameters import SteelProp
 from Moon2Mars.Wood_parameters import WoodProp
 from Moon2Mars.MurProp import MurProp
 
 # from matplotlib import pyplot as plt #only for development
-from scipy.interpolate import CubicSpline
+from scipy.sparse import coo_matrix
+from scipy.sparse.linalg import splu
+from scipy.linalg import cho_factor, cho_solve, cholesky_banded, cho_solve_banded
+from scipy.sparse.csgraph import reverse_cuthill_mckee
 
 class Model:
     def __init__(self):
@@ -18,6 +20,12 @@ class Model:
         self.murprop = MurProp()
         
         self.ndofn = 3
+        self.solver = 'auto' # 'banded', 'sparse' (symmetric LU) or 'dense' (only for small models/debugging). 'auto' picks banded when the bandwidth is at most maxBandwidth, else sparse
+        self.maxBandwidth = 32
+        self.renumber = True # reverse Cuthill-McKee renumbering of the free dofs before factorization
+        self.condense = False # superelements: condense the internal discretization nodes out of the global system
+        self.discr = 4 # discretization of beam in elements between needed nodes
+        self.exactFields = False # evaluate N, V, M and deflection analytically along the elements, see elementFields
         
         self.X = np.empty((0,2), float)
         self.T = np.empty((0,2), int)
@@ -25,6 +33,7 @@ class Model:
         self.U = np.empty((0), int)
         self.bL = np.empty((0,2), float)
         self.localLoads = np.empty((0,6), float)
+        self.distLoads = np.empty((0,4), float) # local line load intensities per element: [p1_hor, p1_ver, p2_hor, p2_ver]
         
         
         self.E = np.empty((0), float)
@@ -34,9 +43,33 @@ class Model:
         
         self.hingeElementAndNode=np.empty((0,2), int)
         self.member = []
+
+        self._Kfactor = None # factorized stiffness matrix, reset when mesh or supports change
+        self._nodeIndex = {} # rounded coordinate -> node index, see findNode
+        self._nodeIndexSize = 0
+        self._edgeElement = {} # (start node, end node) -> element
+        self._nodeMembers = {} # node -> [(member index, position in member's consistOfnodes)]
+        self._nodePositions = [] # per member: node -> position in consistOfnodes
+        self._hermiteTables = {} # nrp -> shape functions at nrp stations, see hermiteTable
+        self._geometry = None # element and member geometry, see elementGeometry
             
         
     def addMembers(self, entity_set):
+        # The mesh is collected in lists and materialized as arrays once the topology is final
+        self.indexNodes()
+        X = self.X.tolist()
+        T = self.T.tolist()
+        hinge = self.hinge.tolist()
+        Elist = self.E.tolist()
+        Alist = self.A.tolist()
+        Ilist = self.I.tolist()
+        rholist = self.rho.tolist()
+
+        def addNode(xy):
+            X.append(list(xy))
+            self._nodeIndex.setdefault(self.nodeKey(xy), len(X)-1)
+            return len(X)-1
+
         e=0
         for id, mem in entity_set.get('members').items():
             e+=1
@@ -49,8 +82,7 @@ class Model:
             x2 = entity_set.get('nodes').get(node2).get('resolved').get('x')
             y2 = entity_set.get('nodes').get(node2).get('resolved').get('y')
 
-            discr = 4 #discretization of beam in elements between needed nodes
-            self.discr = discr
+            discr = self.discr
 
             # memberProp = {'b': 0.045, 'h':0.295, 'l':4.2, 't':0.136, 'efod':0, 'e5':0.010, 'et':0.017, 't_plade':0.010, 'b_plade':0.100, 'l_plade':0.200,
             #        'l1':0, 't1':0, 'l2':0, 't2':0, 'Ned':21000, 'ned':0, 'afstand_kraft':0, 'vind':0, 'murtype':'Porebeton', 'profile': 'HE140B', 'strength class': 'C24'}
@@ -103,35 +135,34 @@ class Model:
                 A = memberProp['t']*memberProp['l']
                 I = self.steelbeams.getI_y('HE280B')
             
-            consistOfelements = np.empty((0), int)
+            consistOfelements = []
 
-            newNodes = np.empty((0,2))
-            newNodes = np.append(newNodes,[[x1, y1]],axis=0)
-            newNodes = np.append(newNodes,[[x2, y2]],axis=0)
+            newNodes = [[x1, y1], [x2, y2]]
             for dp in mem.get('dependants'):
                 if 'dl' in dp:
                     x1d = entity_set.get('distributedLoads').get(dp).get('resolved').get('point1').get('x')
                     y1d = entity_set.get('distributedLoads').get(dp).get('resolved').get('point1').get('y')
                     x2d = entity_set.get('distributedLoads').get(dp).get('resolved').get('point2').get('x')
                     y2d = entity_set.get('distributedLoads').get(dp).get('resolved').get('point2').get('y')
-                    newNodes = np.append(newNodes,[[x1d,y1d]],axis=0)
-                    newNodes = np.append(newNodes,[[x2d,y2d]],axis=0)
+                    newNodes.append([x1d,y1d])
+                    newNodes.append([x2d,y2d])
                 elif 'pl' in dp:
                     x = entity_set.get('pointLoads').get(dp).get('resolved').get('x')
                     y = entity_set.get('pointLoads').get(dp).get('resolved').get('y')
-                    newNodes = np.append(newNodes,[[x,y]],axis=0)
+                    newNodes.append([x,y])
                 elif 's' in dp:
                     x = entity_set.get('supports').get(dp).get('resolved').get('x')
                     y = entity_set.get('supports').get(dp).get('resolved').get('y')
-                    newNodes = np.append(newNodes,[[x,y]],axis=0)
+                    newNodes.append([x,y])
                 elif 'ml' in dp:
                     x = entity_set.get('momentLoads').get(dp).get('resolved').get('x')
                     y = entity_set.get('momentLoads').get(dp).get('resolved').get('y')
-                    newNodes = np.append(newNodes,[[x,y]],axis=0)
+                    newNodes.append([x,y])
                 elif 'n' in dp:
                     x = entity_set.get('nodes').get(dp).get('resolved').get('x')
                     y = entity_set.get('nodes').get(dp).get('resolved').get('y')
-                    newNodes = np.append(newNodes,[[x,y]],axis=0)
+                    newNodes.append([x,y])
+            newNodes = np.array(newNodes, float)
             
             rounded_nodes = np.round(newNodes, 6)
 
@@ -150,78 +181,134 @@ class Model:
 
             L_beam = np.sqrt((end2[0]-end1[0])**2 + (end2[1]-end1[1])**2)
 
-            x_beamDiscr = np.empty((0))
-            y_beamDiscr = np.empty((0))
-            for ii in range(np.size(newNodes,0)-1):
-                #L_beam = np.sqrt((newNodes[ii+1,0]-newNodes[ii,0])**2 + (newNodes[ii+1,1]-newNodes[ii,1])**2)
-                if np.size(newNodes,0)-2 == ii:
-                    x_beamDiscr = np.append(x_beamDiscr, np.linspace(newNodes[ii,0],newNodes[ii+1,0],int(discr)+1))
-                    y_beamDiscr = np.append(y_beamDiscr, np.linspace(newNodes[ii,1],newNodes[ii+1,1],int(discr)+1))
-                else:
-                    x_beamDiscr = np.append(x_beamDiscr, np.linspace(newNodes[ii,0],newNodes[ii+1,0],int(discr)+1)[:-1])
-                    y_beamDiscr = np.append(y_beamDiscr, np.linspace(newNodes[ii,1],newNodes[ii+1,1],int(discr)+1)[:-1])
+            # Nodes along the member: discr elements between each pair of needed nodes
+            nseg = np.size(newNodes,0)-1
+            xy_beamDiscr = np.linspace(newNodes[:-1],newNodes[1:],int(discr)+1,axis=1)[:,:-1,:]
+            xy_beamDiscr = np.append(xy_beamDiscr.reshape((nseg*int(discr),2)), [newNodes[-1]], axis=0)
                
-            dim = 2 #For 2D
-
-            anyExistingNodesEnd1 = np.any(np.sum(np.round(self.X,6)==np.round(end1,6),1)==dim)
-            if anyExistingNodesEnd1: existingNodeLoc1 = np.argwhere(np.sum(np.round(self.X,6)==np.round(end1,6),1)==dim)[0][0]
-
-            anyExistingNodesEnd2 = np.any(np.sum(np.round(self.X,6)==np.round(end2,6),1)==dim)
-            if anyExistingNodesEnd2: existingNodeLoc2 = np.argwhere(np.sum(np.round(self.X,6)==np.round(end2,6),1)==dim)[0][0]
-
-            if not anyExistingNodesEnd1:
-                self.X = np.append(self.X,[end1],0)
-            for i in range(len(x_beamDiscr)-1):
-                
-                if 0==i and anyExistingNodesEnd1:
-                    i_end1 = existingNodeLoc1
-                    h_end1 = self.findHinge(entity_set, existingNodeLoc1, node1, node2)
-                else:
-                    i_end1 = np.size(self.X,0)-1
-                    h_end1 = False
+            existingNodeLoc1 = self._nodeIndex.get(self.nodeKey(end1))
+            existingNodeLoc2 = self._nodeIndex.get(self.nodeKey(end2))
 
-                end2[0], end2[1] = x_beamDiscr[i+1], y_beamDiscr[i+1]    
+            if existingNodeLoc1 is None:
+                i_end1 = addNode(end1)
+                h_end1 = False
+            else:
+                i_end1 = existingNodeLoc1
+                h_end1 = self.findHinge(entity_set, X[existingNodeLoc1], node1, node2)
 
-                if len(x_beamDiscr)-2==i and anyExistingNodesEnd2:
+            for i in range(len(xy_beamDiscr)-1):
+                if len(xy_beamDiscr)-2==i and existingNodeLoc2 is not None:
                     i_end2 = existingNodeLoc2
-                    h_end2 = self.findHinge(entity_set, existingNodeLoc2, node1, node2)
+                    h_end2 = self.findHinge(entity_set, X[existingNodeLoc2], node1, node2)
                 else:
-                    self.X = np.append(self.X,[end2],0)
-                    i_end2 = np.size(self.X,0)-1
+                    i_end2 = addNode(xy_beamDiscr[i+1])
                     h_end2 = False
 
                 # #Element topology: T[element,:] = [Start node, end node]
-                self.T = np.append(self.T,[[i_end1,i_end2]],0)
-                self.hinge = np.append(self.hinge,[[h_end1,h_end2]],0)
-                self.localLoads = np.append(self.localLoads,np.zeros((1,6), float),axis=0)
+                T.append([i_end1,i_end2])
+                hinge.append([h_end1,h_end2])
 
                 # Material data
-                self.E = np.append(self.E,[E],0)
-                self.A = np.append(self.A,[A],0)
-                self.I = np.append(self.I,[I],0)
-                self.rho = np.append(self.rho,[rho],0)
+                Elist.append(E)
+                Alist.append(A)
+                Ilist.append(I)
+                rholist.append(rho)
                 
-                consistOfelements = np.append(consistOfelements,[len(self.T)-1],0)
+                consistOfelements.append(len(T)-1)
 
-                end1 = end2
+                i_end1 = i_end2
+                h_end1 = False
             
+            consistOfelements = np.array(consistOfelements, int)
+            consistOfnodes = np.array([T[consistOfelements[0]][0]] + [T[c][1] for c in consistOfelements], int)
+
+            # Node pair -> element and node -> (member, position) maps, for walking line loads along members
+            for c in consistOfelements:
+                self._edgeElement.setdefault((T[c][0], T[c][1]), int(c))
+            self._nodePositions.append({int(n): pos for pos, n in enumerate(consistOfnodes)})
+            for pos, n in enumerate(consistOfnodes):
+                self._nodeMembers.setdefault(int(n), []).append((len(self.member), pos))
             
-            beamProp = {'id':id, 'membername':memberName, 'membertype':memberType, 'memberprop':memberProp, 'L':L_beam, 'E':E, 'A':A, 'I':I, 'rho':rho, 'consistOfelements': consistOfelements}
+            beamProp = {'id':id, 'membername':memberName, 'membertype':memberType, 'memberprop':memberProp, 'L':L_beam, 'E':E, 'A':A, 'I':I, 'rho':rho, 'consistOfelements': consistOfelements, 'consistOfnodes': consistOfnodes}
 
             self.member.append(beamProp)
 
+        self.X = np.array(X, float).reshape((-1,2))
+        self.T = np.array(T, int).reshape((-1,2))
+        self.hinge = np.array(hinge, bool).reshape((-1,2))
+        self.E = np.array(Elist, float)
+        self.A = np.array(Alist, float)
+        self.I = np.array(Ilist, float)
+        self.rho = np.array(rholist, float)
+        self.localLoads = np.zeros((np.size(self.T,0),6), float)
+        self.distLoads = np.zeros((np.size(self.T,0),4), float)
+        self._nodeIndexSize = np.size(self.X,0)
+
         self.createD()
 
 
-    def findHinge(self, entity_set, existingNodeLoc, node1, node2):
+    def findHinge(self, entity_set, existingNode, node1, node2):
         for node in [node1, node2]:
-            if np.round(entity_set.get('nodes').get(node).get('resolved').get('x'),6) == np.round(self.X[existingNodeLoc,0],6) and np.round(entity_set.get('nodes').get(node).get('resolved').get('y'),6) == np.round(self.X[existingNodeLoc,1],6):
+            if np.round(entity_set.get('nodes').get(node).get('resolved').get('x'),6) == np.round(existingNode[0],6) and np.round(entity_set.get('nodes').get(node).get('resolved').get('y'),6) == np.round(existingNode[1],6):
                 if entity_set.get('nodes').get(node).get('assembly') == 'Hinge':
                     return True
                 else:
                     return False
                 
 
+    def memberPath(self, i_loc1, i_loc2):
+        # Ordered nodes from i_loc1 to i_loc2 along the first member holding both, or None
+        for im, pos1 in self._nodeMembers.get(i_loc1, []):
+            nodes = self.member[im]['consistOfnodes']
+            pos2 = self._nodePositions[im].get(i_loc2)
+            if pos2 is None or pos2 == pos1:
+                continue
+            if pos1 < pos2:
+                return nodes[pos1:pos2+1]
+            return nodes[pos2:pos1+1][::-1]
+        return None
+
+    def nodeKey(self, location):
+        # Coordinates rounded to 6 decimals, as used for comparing nodes throughout the model
+        return tuple(np.round(np.asarray(location, float),6).tolist())
+
+    def indexNodes(self):
+        # Add nodes appended to X since the last call to the coordinate index.
+        # The first node at a coordinate wins, as with a scan of X.
+        nno = np.size(self.X,0)
+        if self._nodeIndexSize > nno:
+            self._nodeIndex = {}
+            self._nodeIndexSize = 0
+        if self._nodeIndexSize < nno:
+            for i, xy in enumerate(np.round(self.X[self._nodeIndexSize:],6).tolist(), self._nodeIndexSize):
+                self._nodeIndex.setdefault(tuple(xy), i)
+            self._nodeIndexSize = nno
+
+    def findNode(self, location):
+        # Index of the node at location, or None
+        self.indexNodes()
+        return self._nodeIndex.get(self.nodeKey(location))
+
+    def elementGeometry(self):
+        # Lengths, direction cosines and transformation matrices of all elements, and the direction of each member
+        # from its first to its last node. Built once the topology is final, createD resets it when the mesh changes.
+        if self._geometry is None:
+            A, L = self.AbeamBatch(self.X[self.T[:,0]], self.X[self.T[:,1]])
+
+            first = np.array([beam['consistOfelements'][0] for beam in self.member], int)
+            last = np.array([beam['consistOfelements'][-1] for beam in self.member], int)
+            X1beam = self.X[self.T[first,0]]
+            X2beam = self.X[self.T[last,1]]
+            Abeam, Lbeam = self.AbeamBatch(X1beam, X2beam)
+
+            memberOf = np.zeros(np.size(self.T,0), int)
+            for im, beam in enumerate(self.member):
+                memberOf[beam['consistOfelements']] = im
+
+            self._geometry = {'L': L, 'cos': A[:,0,0], 'sin': A[:,0,1], 'A': A, 'memberOf': memberOf,
+                              'X1beam': X1beam, 'X2beam': X2beam, 'Lbeam': Lbeam, 'Abeam': Abeam, 'AuBeam': Abeam[:,0:2,0:2]}
+        return self._geometry
+
     def createD(self):
         T = self.T
         X = self.X
@@ -253,14 +340,15 @@ class Model:
                 D[el,5] = maxdof
        
         self.D = D
+        self._Kfactor = None
+        self._geometry = None
             
         
     def addSupport(self,location,localDof):       #, coor):
-                     
-        dim = 2 #For 2D
         
-        if np.any(np.sum(np.round(self.X,6)==np.round(location,6),1)==dim):
-            i_loc = np.argwhere(np.sum(np.round(self.X,6)==np.round(location,6),1)==dim)[0][0]
+        i_loc = self.findNode(location)
+        
+        if i_loc is not None:
             
             if localDof == "x":
                 dof = i_loc*self.ndofn
@@ -273,6 +361,7 @@ class Model:
                      
             self.U = np.append(self.U,[dof])
             self.nsup = np.size(self.U,0)
+            self._Kfactor = None
             
         else:
             print("addSupport - No node exist at given coordinate!")
@@ -280,14 +369,9 @@ class Model:
         
     def addLoad(self,location,localDof,P0):    # coor, direction):        
         
-        dim = 2
+        i_loc = self.findNode(location)
         
-        if np.any(np.sum(np.round(self.X,6)==np.round(location,6),1)==dim):
-            i_loc = int(np.argwhere(np.sum(np.round(self.X,6)==np.round(location,6),1)==dim)[0][0])
-                      
-            if 'i_loc' not in locals():
-                print('A load is not applied correctly onto beam')
-                return
+        if i_loc is not None:
                           
             if localDof == "Fx":
                 dof = i_loc*self.ndofn
@@ -302,10 +386,8 @@ class Model:
 
     def addLineLoad(self,location1,location2,localDof,p1,p2):    # coor, direction):
 
-        dim = 2
-
-        i_loc1 = int(np.argwhere(np.sum(np.round(self.X,6)==np.round(location1,6),1)==dim)[0][0])
-        i_loc2 = int(np.argwhere(np.sum(np.round(self.X,6)==np.round(location2,6),1)==dim)[0][0])
+        i_loc1 = int(self.findNode(location1))
+        i_loc2 = int(self.findNode(location2))
                          
         end1, end2 = self.X[i_loc1], self.X[i_loc2]
         
@@ -313,44 +395,60 @@ class Model:
         
         r1, r2 = end2[0]-end1[0], end2[1]-end1[1]
         x0, y0 = end1[0], end1[1]
-    
-        nodenum = np.empty((0,2), float)
-        nodenum = np.append(nodenum,[[0, i_loc_ini]],0)
-        for i in range(np.size(self.X,0)):
-            if i == i_loc_ini:
-                continue
- 
-            x = self.X[i,0]
-            y = self.X[i,1]
-            
+
+        # Nodes on the loaded segment, walked along the member carrying both ends of the load
+        path = self.memberPath(i_loc1, i_loc2)
+        if path is not None:
+            x = self.X[path,0]
+            y = self.X[path,1]
             if end1[0] == end2[0]:
-                # vertical beam
-                t2 = np.round((y-y0)/r2,6)        
-                if t2 >= 0 and t2 <= 1 and x == self.X[i_loc_ini,0]:
-                    nodenum = np.append(nodenum,[[t2, i]],0)
-            elif end1[1] == end2[1]:
-                # horizontal beam
-                t1 = np.round((x-x0)/r1,6)
-                if t1 >= 0 and t1 <= 1 and y == self.X[i_loc_ini,1]:
-                    nodenum = np.append(nodenum,[[t1, i]],0)
-            else:     
-                t1 = np.round((x-x0)/r1,6)
-                t2 = np.round((y-y0)/r2,6)
-                if t1 == t2 and t1 >= 0 and t1 <= 1:
-                    nodenum = np.append(nodenum,[[t1, i]],0)
-        
-        nodenum = nodenum[nodenum[:,0].argsort()]
+                t = np.round((y-y0)/r2,6)
+            else:
+                t = np.round((x-x0)/r1,6)
+            t[0] = 0
+            nodenum = np.column_stack((t, path))
+        else:
+            # Load not on a single member: scan all nodes on the segment
+            nodenum = np.empty((0,2), float)
+            nodenum = np.append(nodenum,[[0, i_loc_ini]],0)
+            for i in range(np.size(self.X,0)):
+                if i == i_loc_ini:
+                    continue
+     
+                x = self.X[i,0]
+                y = self.X[i,1]
+                
+                if end1[0] == end2[0]:
+                    # vertical beam
+                    t2 = np.round((y-y0)/r2,6)        
+                    if t2 >= 0 and t2 <= 1 and x == self.X[i_loc_ini,0]:
+                        nodenum = np.append(nodenum,[[t2, i]],0)
+                elif end1[1] == end2[1]:
+                    # horizontal beam
+                    t1 = np.round((x-x0)/r1,6)
+                    if t1 >= 0 and t1 <= 1 and y == self.X[i_loc_ini,1]:
+                        nodenum = np.append(nodenum,[[t1, i]],0)
+                else:     
+                    t1 = np.round((x-x0)/r1,6)
+                    t2 = np.round((y-y0)/r2,6)
+                    if t1 == t2 and t1 >= 0 and t1 <= 1:
+                        nodenum = np.append(nodenum,[[t1, i]],0)
+            
+            nodenum = nodenum[nodenum[:,0].argsort()]
 
+        geometry = self.elementGeometry()
         for i in range(np.size(nodenum,0)-1):
 
-            try:
-                el = np.argwhere(np.sum(self.T==[int(nodenum[i,1]), int(nodenum[i+1,1])],1)==2)[0][0]
-            except:
-                el = np.argwhere(np.sum(self.T==[int(nodenum[i+1,1]), int(nodenum[i,1])],1)==2)[0][0]
+            el = self._edgeElement.get((int(nodenum[i,1]), int(nodenum[i+1,1])))
+            reverse = el is None
+            if reverse:
+                el = self._edgeElement[(int(nodenum[i+1,1]), int(nodenum[i,1]))]
 
-            X1, X2 = self.X[int(nodenum[i,1])], self.X[int(nodenum[i+1,1])]
-            
-            A, L = self.Abeam(X1,X2)
+            # Transformation in the direction of the load, opposite to the element if it is walked backwards
+            A, L = geometry['A'][el].copy(), geometry['L'][el]
+            if reverse:
+                A[0:2,0:2] *= -1
+                A[3:5,3:5] *= -1
             
             p1partly = p1 + (p2-p1)*nodenum[i,0]
             p2partly = p1 + (p2-p1)*nodenum[i+1,0]
@@ -373,33 +471,55 @@ class Model:
             r_globalNodes = np.matmul(np.transpose(A),r_localNodes)
             
             self.localLoads[el,:] = self.localLoads[el,:] + np.transpose(r_localNodes)
+            self.distLoads[el,:] = self.distLoads[el,:] + [p1_hor, p1_ver, p2_hor, p2_ver]
             
             dof = self.D[el,:]
             
-            for ii in range(6):                
-                self.bL = np.append(self.bL,[[int(dof[ii]), r_globalNodes[ii][0]]],0)
+            self.bL = np.append(self.bL,np.column_stack((dof.astype(int), r_globalNodes[:,0])),0)
 
         
     def addSelfWeight(self,factor):
+        # Consistent nodal loads from a uniform vertical line load rho*A*g on every element
+        # of the members with self weight, computed for all elements at once
         
         g = -9.82 # tyngdeacceleration
 
+        els = []
+        q = []
         for i in range(len(self.member)):
             if not self.member[i]['memberprop']['selfWeightEnabled']:
                 continue
-        
-            for j in self.member[i]['consistOfelements']:
-                
-                x1, y1 = self.X[self.T[j,0],0], self.X[self.T[j,0],1]
-                
-                x2, y2 = self.X[self.T[j,1],0], self.X[self.T[j,1],1]
-                
-                N_pr_m = self.member[i]['rho']*self.member[i]['A']*g*factor #[kg/m]*a
-                
-                self.addLineLoad([x1, y1], [x2, y2], "Fy", N_pr_m, N_pr_m)
+
+            N_pr_m = self.member[i]['rho']*self.member[i]['A']*g*factor #[kg/m]*a
+            
+            els.append(self.member[i]['consistOfelements'])
+            q.append(np.full(len(self.member[i]['consistOfelements']), N_pr_m))
+
+        if not els:
+            return
+        els = np.concatenate(els).astype(int)
+        q = np.concatenate(q)
+
+        geometry = self.elementGeometry()
+        A, L = geometry['A'][els], geometry['L'][els]
+
+        # Global load (0, q) in local directions
+        p_hor = A[:,0,1]*q
+        p_ver = A[:,1,1]*q
+
+        r_localNodes = np.column_stack(((2*p_hor+p_hor)*L/6, (7*p_ver+3*p_ver)*L/20, (3*p_ver+2*p_ver)*L**2/60,
+                                        (2*p_hor+p_hor)*L/6, (3*p_ver+7*p_ver)*L/20, -(2*p_ver+3*p_ver)*L**2/60))
+        r_globalNodes = np.einsum('eji,ej->ei', A, r_localNodes)
+
+        np.add.at(self.localLoads, els, r_localNodes)
+        np.add.at(self.distLoads, els, np.column_stack((p_hor, p_ver, p_hor, p_ver)))
+
+        self.bL = np.append(self.bL, np.column_stack((self.D[els].astype(int).ravel(), r_globalNodes.ravel())), 0)
                   
         
-    def run(self):
+    def factorize(self):
+        # Assemble K, apply the support conditions and factor it once.
+        # The factorization is reused by every load case until the mesh or the supports change.
         
         E = self.E
         A = self.A
@@ -408,307 +528,321 @@ class Model:
         X = self.X
         T = self.T
         
-        U = self.U
+        U = self.U.astype(int)
         D = self.D
-        nd = np.max(D)+1
-              
-        self.nl = np.size(self.bL,0)
-        bL = self.bL
-        
-        nl = self.nl
+        nd = int(np.max(D))+1
         
         ndofn = self.ndofn
 
         nel = np.size(T,0)
         
-        nsup = self.nsup
-        
-        G = np.zeros((nel,3))
-              
         #Materials: G[el,:] = [E,A,I]
-        for i in range(0,nel):
-            G[i,:] = [E[i], A[i], I[i]]
+        G = np.column_stack((E,A,I))
       
-    
-        
-        K = np.zeros((int(nd),int(nd)))
-        for el in range(0,nel):
-            no1 = int(T[el,0])
-            no2 = int(T[el,1])
-            X1 = X[no1,:]
-            X2 = X[no2,:]
-            k = self.kbeam(X1,X2,G,el)
-            de = D[el,:]
-            for i in range(0,2*ndofn):
-                for j in range(0,2*ndofn):
-                    K[int(de[i]),int(de[j])] = K[int(de[i]),int(de[j])] + k[i,j]
-              
-        R = np.zeros(int(nd))
-
-        nbL = nl
-        for i in range(0,nbL):
-            d = bL[i,0]
-            R[int(d)] = R[int(d)] + bL[i,1]            
-        
-        # Support conditions
-        #diagK = np.diag(K)
-        #kmax = np.max(diagK)*10**8
-        
-        K_support = np.zeros((nsup,int(nd)))
-        R_support = np.zeros((nsup))
-        for i in range(0,nsup):
-            
-            K_support[i] = K[int(U[i]),:]
-            R_support[i] = R[int(U[i])]
-            
-            K[int(U[i]),:] = 0
-            K[:,int(U[i])] = 0
-            K[int(U[i]),int(U[i])] = 1
-            R[U[i]] = 0
-        
-        #Calculate deformations
-        Kinv = np.linalg.inv(K)
-        V = np.dot(Kinv,R)
-        
-        R0 = np.matmul(K_support,V) - R_support
-        for i in range(0,nsup):
-            R[int(U[i])] = R[int(U[i])] + R_support[i]
-
-        self.F1 = np.zeros((nel,2))
-        self.F2 = np.zeros((nel,2))
-        self.M = np.zeros((nel,2))
-
-        Ve = np.zeros([nel,len(de)])
-        for el in range(0,nel):
-            no1 = int(T[el,0])
-            no2 = int(T[el,1])
-            X1 = X[no1,:]
-            X2 = X[no2,:]
-            de = D[el,:]
-            for i in range(0,len(de)):
-                Ve[el,i] = V[int(de[i])]
-            Re = self.S(X1,X2,G,Ve[el,:],el)
-            self.F1[el,:] = Re[0]
-            self.F2[el,:] = Re[1]
-            self.M[el,:] = Re[2]
-        
-        self.nel = nel
-        self.D = D
-        self.V = V
-        self.R0 = R0
-        self.Ve = Ve
-            
-        #self.TOPplots(X,T,nel,nno)
-        #self.DEFplot(X,T,D,V,nel,Vscale)
-        #Splot(X,T,nel,F1,1,dL,Sscale)
-        #Splot(X,T,nel,F2,2,dL,Sscale)
-        #self.Splot(X,T,nel,M,3,dL,Sscale)
-        
-
+        # Stiffness matrix as COO triplets: each element contributes its 6x6 block at D[el,:] x D[el,:]
+        geometry = self.elementGeometry()
+        ke = self.kbeamBatch(geometry['A'],geometry['L'],G)
 
-    ## ---------------------------Functions -----------------------------------
-    
-    #Transformation matrix 
-    def Abeam(self,X1,X2):
-        a0 = X2 - X1
-        L = math.sqrt(np.matmul(a0,a0))
-        n = a0/L
-        A = [[n[0], n[1], 0, 0, 0, 0],
-             [-n[1], n[0], 0, 0, 0, 0],
-             [0, 0, 1, 0, 0, 0],
-             [0, 0, 0, n[0], n[1], 0],
-             [0, 0, 0, -n[1], n[0],0],
-             [0, 0, 0, 0, 0, 1]]
-        return A, L
-    
-    # Create stiffness matrix
-    def kbeam(self,X1,X2,G,el):
-        Ae = self.Abeam(X1,X2)
-        A = Ae[0]
-        Atrans = np.transpose(A)
-        L = Ae[1]
-        #create stiffness matrix after local orientation
-        EA = G[el,0]*G[el,1]
-        EI = G[el,0]*G[el,2]
-        
-        k = [[EA/L,           0,          0, -EA/L,           0,          0],
-            [    0,  12*EI/L**3,  6*EI/L**2,     0, -12*EI/L**3,  6*EI/L**2],
-            [    0,   6*EI/L**2,     4*EI/L,     0,  -6*EI/L**2,     2*EI/L],
-            [-EA/L,           0,          0,  EA/L,           0,          0],
-            [    0, -12*EI/L**3, -6*EI/L**2,     0,  12*EI/L**3, -6*EI/L**2],
-            [    0,   6*EI/L**2,     2*EI/L,     0,  -6*EI/L**2,     4*EI/L]]
-        
-        k1 = np.matmul(Atrans,k)
-        k = np.matmul(k1,A)
-        return k
-    
-    # Load vector R
-    def rbeam(self,X1,X2,dLe):
-        #Build load vector
-        #Use transformationmatrix
-        Ae = self.Abeam(X1,X2)
-        A = Ae[0]
-        L = Ae[1]
-        #Collect r in accordance with local orientation
-        r = np.zeros(6)
-        if dLe[0] == 1:
-            p = dLe[1]*L/2
-            r = [p, 0, 0, p, 0, 0]
-        elif dLe[0] == 2:
-           p = dLe[1]*L/2
-           m = dLe[1]*L**2/12
-           r = [0, p, m, 0, p, -m]
+        # Superelements: condensed segments enter K with their end dofs only
+        if self.condense:
+            segEls, segDofs = self.condensableSegments()
         else:
-            print('Mistake in load vector')
-        r = np.transpose(A)*r
-    
-    #Calculate sectional forces
-    def S(self,X1,X2,G,Ve,el):
-        #F1: Normal force
-        #F2: Shear force
-        #M: Moment
-        Ae = self.Abeam(X1,X2)
-        A = Ae[0]
-        L = Ae[1]
-        k = self.kbeam(X1,X2,G,el)
-        #Calculate local node loads
-        re1 = np.matmul(A,k)
-        re = np.matmul(re1,Ve)
-
-        re = re-self.localLoads[el,:]
-        f1 = [-re[0], re[3]]
-        f2 = [re[1], -re[4]]
-        m = [-re[2], re[5]]
-        return f1, f2, m
-    
-#---------------------------Displacement and Section force functions -----------------------------------
-    def getDeformation(self, beam):
-        X = self.X
-        T = self.T
-        D = self.D
-        V = self.V
-
-        # Coordinates plus deformations
-        nrp = 10+1
-
-        # Define the cubic Hermite shape functions for displacement and rotation
-        def N1(s): return 1 - 3*s**2 + 2*s**3
-        def N2(s): return L * (s - 2*s**2 + s**3)
-        def N3(s): return 3*s**2 - 2*s**3
-        def N4(s): return L * (-s**2 + s**3)
-
-        X1beam = X[int(T[beam['consistOfelements'][0], 0]),:]
-        X2beam = X[int(T[beam['consistOfelements'][-1], 1]),:]
-
-        AAbeam, _ = self.Abeam(X1beam, X2beam)
-
-        AuBeam = np.zeros((2,2))
-        for i in range(0,2):
-            for j in range(0,2):
-                AuBeam[i][j] = AAbeam[i][j]
-
-        xfine_loc = np.array([])  # Displacement storage
-        Us = np.array([])  # Displacement storage
-
-        for el in beam['consistOfelements']:
-            # Create transformation matrix
-            no1 = int(T[el, 0])
-            no2 = int(T[el, 1])
-            X1 = X[no1, :]
-            X2 = X[no2, :]
-            _, L = self.Abeam(X1, X2)
-
-            xy_loc = np.dot(AuBeam, np.transpose(np.array([X1,X2])))
-            x_loc = xy_loc[0,:]
-            xfine_loc_temp = np.linspace(x_loc[0], x_loc[-1], nrp)  # positions along the beam for plotting
-
-            # Get global deformations
-            v = np.zeros(6)
-            for i in range(6):
-                v[i] = V[int(D[el, i])]
-
-            # make local deformations
-            v = np.matmul(AAbeam, v)
-
-            Us_el = np.zeros(nrp)  # Displacement storage
-            for i in range(nrp):
-                s = i / (nrp - 1)
-                Us_el[i] = N1(s)*v[1]+N2(s)*v[2]+N3(s)*v[4]+N4(s)*v[5]
-
-            
-            # FIX SÅ DEN GEMMER X COORDINATER RIGTIGT FOR HELE BJÆLKEN
-            xfine_loc = np.append(xfine_loc, xfine_loc_temp[:-1])
-            Us = np.append(Us, Us_el[:-2])
-
-        xfine_loc = np.append(xfine_loc, xfine_loc_temp[-1])
-        Us = np.append(Us, Us_el[-1])
-
-        return xfine_loc, Us
-
+            segEls, segDofs = np.empty((0,0), int), np.empty((0,0), int)
+        isCondensed = np.zeros(nel, bool)
+        isCondensed[segEls.ravel()] = True
+        if len(segEls) > 0:
+            Kc, Kii, Xib = self.condenseSegments(ke, segEls)
+            m = np.size(segDofs,1)
+            segBoundary = segDofs[:,np.r_[0:3,m-3:m]]
+            segInternal = segDofs[:,3:m-3]
+        else:
+            Kc, Kii, Xib = np.empty((0,6,6)), np.empty((0,0,0)), np.empty((0,0,6))
+            segBoundary, segInternal = np.empty((0,6), int), np.empty((0,0), int)
+
+        de = D.astype(int)[~isCondensed]
+        rows = np.concatenate((np.repeat(de,2*ndofn,axis=1).ravel(), np.repeat(segBoundary,6,axis=1).ravel()))
+        cols = np.concatenate((np.tile(de,(1,2*ndofn)).ravel(), np.tile(segBoundary,(1,6)).ravel()))
+        vals = np.concatenate((ke[~isCondensed].ravel(), Kc.ravel()))
+        K = coo_matrix((vals,(rows,cols)), shape=(nd,nd)).tocsr()
+        
+        # Support conditions: partition the dofs in free (f) and prescribed (s) dofs.
+        # Only K_ff is factorized, reactions are recovered from the supported rows of K.
+        # Condensed internal dofs are neither, they are recovered per segment after the solve.
+        Us = np.unique(U)
+        isFree = np.ones(nd, bool)
+        isFree[Us] = False
+        isFree[segInternal.ravel()] = False
+        f = np.flatnonzero(isFree)
+
+        K_support = K[U,:]
+        K_f = K[f,:]
+        K_ff = K_f[:,f]
+        K_fs = K_f[:,Us]
+        
+        # Reverse Cuthill-McKee renumbering of the free dofs. createD numbers dofs in node creation
+        # order with hinge dofs last, which scatters the sparsity pattern; RCM gathers it around the diagonal.
+        if self.renumber and len(f) > 0:
+            perm = reverse_cuthill_mckee(K_ff.tocsr(), symmetric_mode=True)
+            K_ff = K_ff[perm,:][:,perm]
+        else:
+            perm = np.arange(len(f))
+
+        backend = self.solver
+        if backend == 'auto':
+            Kcoo = K_ff.tocoo()
+            bandwidth = int(np.max(np.abs(Kcoo.row-Kcoo.col))) if Kcoo.nnz else 0
+            backend = 'banded' if bandwidth <= self.maxBandwidth else 'sparse'
+
+        # K_ff is symmetric positive definite for a stable structure
+        if backend == 'dense':
+            Kfactor = cho_factor(K_ff.toarray())
+        elif backend == 'banded':
+            # Upper banded storage: ab[u-k, k:] holds the k'th superdiagonal
+            Kcoo = K_ff.tocoo()
+            u = int(np.max(Kcoo.col-Kcoo.row)) if Kcoo.nnz else 0
+            ab = np.zeros((u+1, len(f)))
+            for k in range(u+1):
+                ab[u-k,k:] = K_ff.diagonal(k)
+            Kfactor = cholesky_banded(ab)
+        else:
+            Kfactor = splu(K_ff.tocsc(), permc_spec='MMD_AT_PLUS_A', diag_pivot_thresh=0, options={'SymmetricMode': True})
+
+        # Underscored so they are skipped when the model is serialized
+        self._nd = nd
+        self._G = G
+        self._free = f
+        self._prescribed = Us
+        self._K_support = K_support
+        self._K_fs = K_fs
+        self._perm = perm
+        self._backend = backend
+        self._segBoundary = segBoundary
+        self._segInternal = segInternal
+        self._Kii = Kii
+        self._Xib = Xib
+        self._Kfactor = Kfactor
+
+    def condensableSegments(self):
+        # Segments of discr elements between two needed nodes whose internal nodes belong to one member
+        # and carry no supports. Returns the segment elements (ns,discr) and the segment dofs
+        # (ns,3*(discr+1)) ordered start node, internal nodes, end node.
+        discr = self.discr
+        D = self.D.astype(int)
+        if discr < 2 or len(self.member) == 0:
+            return np.empty((0,0), int), np.empty((0,0), int)
+
+        supported = np.zeros(np.size(self.X,0), bool)
+        supported[self.U.astype(int)//self.ndofn] = True
+
+        segEls = []
+        for beam in self.member:
+            els = beam['consistOfelements'].reshape((-1,discr))
+            inner = beam['consistOfnodes'][:-1].reshape((-1,discr))[:,1:]
+            shared = np.array([len(self._nodeMembers[int(n)]) > 1 for n in inner.ravel()], bool).reshape(inner.shape)
+            segEls.append(els[~(supported[inner] | shared).any(1)])
+        segEls = np.concatenate(segEls)
+
+        segDofs = np.concatenate([D[segEls[:,0],0:3]] + [D[segEls[:,j],3:6] for j in range(discr)], axis=1)
+        return segEls, segDofs
+
+    def condenseSegments(self, ke, segEls):
+        # Static condensation of all segments at once: Kc = Kbb - Kbi Kii^-1 Kib
+        # Returns Kc (ns,6,6), Kii (ns,ni,ni) and Xib = Kii^-1 Kib (ns,ni,6) for the recovery
+        ns, discr = segEls.shape
+        m = 3*(discr+1)
+        Kseg = np.zeros((ns,m,m))
+        for j in range(discr):
+            Kseg[:,3*j:3*j+6,3*j:3*j+6] += ke[segEls[:,j]]
+
+        b = np.r_[0:3,m-3:m]
+        i = np.arange(3,m-3)
+        Kii = Kseg[:,i][:,:,i]
+        Kib = Kseg[:,i][:,:,b]
+        Kbb = Kseg[:,b][:,:,b]
+
+        Xib = np.linalg.solve(Kii, Kib)
+        Kc = Kbb - np.matmul(np.transpose(Kib,(0,2,1)), Xib)
+        return Kc, Kii, Xib
+
+    def solve(self, R_f):
+        # Solve K_ff V_f = R_f for one or more right-hand sides, in the original dof order
+        perm = self._perm
+        if self._backend == 'dense':
+            V_perm = cho_solve(self._Kfactor, R_f[perm])
+        elif self._backend == 'banded':
+            V_perm = cho_solve_banded((self._Kfactor, False), R_f[perm])
+        else:
+            V_perm = self._Kfactor.solve(R_f[perm])
+        V_f = np.empty_like(V_perm)
+        V_f[perm] = V_perm
+        return V_f
+
+    def runLoadCases(self, bLs, localLoads, Vs=None, distLoads=None):
+        # Solve all load cases as one multi right-hand-side system against a single factorization of K.
+        # bLs: list of load vectors [[dof, P0], ...], one per load case
+        # localLoads: list of (nel,6) local fixed-end forces, one per load case
+        # Vs: optional (nlc,nsup) prescribed displacements of the supported dofs (settlements), ordered as U
+        # distLoads: optional list of (nel,4) local line load intensities, one per load case, kept for elementFields
+        # Results are stacked with the load case first: V (nlc,nd), Ve (nlc,nel,6), F1/F2/M (nlc,nel,2), R0 (nlc,nsup)
+
+        if self._Kfactor is None:
+            self.factorize()
 
-    def getSectionForces(self, beam):
         X = self.X
         T = self.T
-        M = self.M
-        F1 = self.F1
-        F2 = self.F2
-
-        nrp = 10*self.discr+1
-
-        X1beam = X[int(T[beam['consistOfelements'][0], 0]),:]
-        X2beam = X[int(T[beam['consistOfelements'][-1], 1]),:]
-
-        AAbeam, _ = self.Abeam(X1beam, X2beam)
-
-        AuBeam = np.zeros((2,2))
-        for i in range(0,2):
-            for j in range(0,2):
-                AuBeam[i][j] = AAbeam[i][j]
-
-
-        xfine_loc = np.array([])  # Displacement storage
-        Mfine = np.array([])
-        Vfine = np.array([])
-        Nfine = np.array([])
-
-        # Fit a cubic spline to the calculated moments
-        for d in range(int(len(beam['consistOfelements'])/self.discr)):
+        U = self.U.astype(int)
+        D = self.D
+        G = self._G
+        nd = self._nd
+        nel = np.size(T,0)
+        nlc = len(bLs)
 
-            ele = beam['consistOfelements'][d*self.discr:d*self.discr+self.discr]
+        R = np.zeros((nd,nlc))
+        for lc in range(nlc):
+            bL = bLs[lc]
+            np.add.at(R[:,lc], bL[:,0].astype(int), bL[:,1])
 
-            xy = X[T[ele][:,0]]  # positions along the beam
-            xy = np.append(xy, [X[T[ele][-1,:]][-1,:]], axis=0)
+        # Condensed segments: loads on internal dofs are carried over to the segment ends
+        if len(self._Kii) > 0:
+            R_i = R[self._segInternal,:]
+            np.add.at(R, self._segBoundary, -np.einsum('sib,sil->sbl', self._Xib, R_i))
 
-            xy_loc = np.dot(AuBeam, np.transpose(xy))
-            x_loc = xy_loc[0,:]
+        f = self._free
+        R_f = R[f,:]
 
-            Mp = M[ele,:][:,0]
-            Mp = np.append(Mp, M[ele[-1],1])
+        V = np.zeros((nd,nlc))
+        if Vs is not None:
+            V[U,:] = np.transpose(Vs)
+            R_f = R_f - self._K_fs @ V[self._prescribed,:]
+        
+        #Calculate deformations
+        V[f,:] = self.solve(R_f)
 
-            Vp = F2[ele,:][:,0]
-            Vp = np.append(Vp, F2[ele[-1],1])
+        # Internal dofs of condensed segments: V_i = Kii^-1 R_i - Kii^-1 Kib V_b
+        if len(self._Kii) > 0:
+            V[self._segInternal,:] = np.linalg.solve(self._Kii, R_i) - np.matmul(self._Xib, V[self._segBoundary,:])
+        
+        R0 = self._K_support @ V - R[U,:]
 
-            Np = F1[ele,:][:,0]
-            Np = np.append(Np, F1[ele[-1],1])
+        V = np.transpose(V)
+        Ve = V[:,D.astype(int)]
+        localLoads = np.array(localLoads).reshape((nlc,nel,6))
 
-            splineM = CubicSpline(x_loc, Mp, bc_type='not-a-knot')
-            splineV = CubicSpline(x_loc, Vp, bc_type='not-a-knot')
-            splineN = CubicSpline(x_loc, Np, bc_type='not-a-knot')
+        geometry = self.elementGeometry()
+        F1, F2, M = self.SBatch(geometry['A'],geometry['L'],G,Ve,localLoads)
+        
+        if distLoads is None:
+            distLoads = np.zeros((nlc,nel,4))
+        self._distLoads = np.array(distLoads).reshape((nlc,nel,4))
 
-            xfine_loc_temp = np.linspace(x_loc[0], x_loc[-1], nrp)  # positions along the beam for plotting
+        self.nel = nel
+        self.V = V
+        self.R0 = np.transpose(R0)
+        self.Ve = Ve
+        self.F1 = F1
+        self.F2 = F2
+        self.M = M
 
-            Mfine_temp = splineM(xfine_loc_temp)
-            Vfine_temp = splineV(xfine_loc_temp)
-            Nfine_temp = splineN(xfine_loc_temp)
+#---------------------------Batched element functions (all elements at once) -----------------------------------
+    #Transformation matrices, X1 and X2 are (nel,2)
+    def AbeamBatch(self,X1,X2):
+        a0 = X2 - X1
+        L = np.sqrt(np.sum(a0**2,1))
+        c = a0[:,0]/L
+        s = a0[:,1]/L
+        A = np.zeros((len(L),6,6))
+        for i in [0,3]:
+            A[:,i,i] = c
+            A[:,i,i+1] = s
+            A[:,i+1,i] = -s
+            A[:,i+1,i+1] = c
+            A[:,i+2,i+2] = 1
+        return A, L
 
-            xfine_loc = np.append(xfine_loc, xfine_loc_temp[:-1])
-            Mfine = np.append(Mfine, Mfine_temp[:-1])
-            Vfine = np.append(Vfine, Vfine_temp[:-1])
-            Nfine = np.append(Nfine, Nfine_temp[:-1])
+    #Local stiffness matrices (nel,6,6)
+    def kbeamLocalBatch(self,L,G):
+        EA = G[:,0]*G[:,1]
+        EI = G[:,0]*G[:,2]
+
+        k = np.zeros((len(L),6,6))
+        k[:,0,0] = k[:,3,3] = EA/L
+        k[:,0,3] = k[:,3,0] = -EA/L
+        k[:,1,1] = k[:,4,4] = 12*EI/L**3
+        k[:,1,4] = k[:,4,1] = -12*EI/L**3
+        k[:,1,2] = k[:,2,1] = k[:,1,5] = k[:,5,1] = 6*EI/L**2
+        k[:,2,4] = k[:,4,2] = k[:,4,5] = k[:,5,4] = -6*EI/L**2
+        k[:,2,2] = k[:,5,5] = 4*EI/L
+        k[:,2,5] = k[:,5,2] = 2*EI/L
+        return k
 
-        xfine_loc = np.append(xfine_loc, xfine_loc_temp[-1])
-        Mfine = np.append(Mfine, Mfine_temp[-1])
-        Vfine = np.append(Vfine, Vfine_temp[-1])
-        Nfine = np.append(Nfine, Nfine_temp[-1])
+    #Global stiffness matrices (nel,6,6), A and L as in elementGeometry
+    def kbeamBatch(self,A,L,G):
+        k = self.kbeamLocalBatch(L,G)
+        return np.matmul(np.transpose(A,(0,2,1)),np.matmul(k,A))
+
+    #Sectional forces for all elements and load cases, Ve and localLoads are (nlc,nel,6), A and L as in elementGeometry
+    def SBatch(self,A,L,G,Ve,localLoads):
+        k = self.kbeamLocalBatch(L,G)
+        re = np.einsum('eij,lej->lei',np.matmul(k,A),Ve) - localLoads
+        f1 = np.stack((-re[...,0], re[...,3]),-1)
+        f2 = np.stack((re[...,1], -re[...,4]),-1)
+        m = np.stack((-re[...,2], re[...,5]),-1)
+        return f1, f2, m
+    
+    #Exact fields along elements, F1/F2/M are (nel,2), Ve is (nel,6) and distLoads (nel,4)
+    #All may carry leading load case dimensions, e.g. (nlc,nel,2), which are kept in the results
+    def elementFields(self,els,xi,F1,F2,M,Ve,distLoads):
+        #els: element of each station, xi: relative position 0..1 on the element
+        #N, V and M follow from the start end forces and the linear line load on the element.
+        #The local displacements u, w are the Hermite interpolation of the end displacements
+        #plus the particular solution for the line load on a clamped-clamped element.
+        els = np.asarray(els, int)
+        geometry = self.elementGeometry()
+        A, L = geometry['A'][els], geometry['L'][els]
+        x = xi*L
+
+        px1, py1, px2, py2 = distLoads[...,els,0], distLoads[...,els,1], distLoads[...,els,2], distLoads[...,els,3]
+        dpx = (px2-px1)/L
+        dpy = (py2-py1)/L
+
+        N = F1[...,els,0] - (px1*x + dpx*x**2/2)
+        V = F2[...,els,0] + (py1*x + dpy*x**2/2)
+        Mx = M[...,els,0] + F2[...,els,0]*x + py1*x**2/2 + dpy*x**3/6
+
+        v = np.einsum('eij,...ej->...ei', A, Ve[...,els,:])
+        EA = self.E[els]*self.A[els]
+        EI = self.E[els]*self.I[els]
+
+        u = (1-xi)*v[...,0] + xi*v[...,3] \
+            + L**2/EA*xi*(1-xi)*(px1*(2-xi) + px2*(1+xi))/6
+        w = (1-3*xi**2+2*xi**3)*v[...,1] + (xi-2*xi**2+xi**3)*L*v[...,2] + (3*xi**2-2*xi**3)*v[...,4] + (-xi**2+xi**3)*L*v[...,5] \
+            + L**4/EI*xi**2*(1-xi)**2*(py1*(3-xi) + py2*(2+xi))/120
+        return N, V, Mx, u, w
 
-        return xfine_loc, Mfine, Vfine, Nfine
+#---------------------------Displacement and Section force functions -----------------------------------
+    def hermiteTable(self, nrp):
+        # Shape functions N(s) at nrp equidistant stations s = 0..1, (nrp,2,6): rows axial and transverse.
+        # Columns 2 and 5 (rotations) are to be multiplied by the element length. Cached per nrp.
+        if nrp not in self._hermiteTables:
+            s = np.linspace(0, 1, nrp)
+            N = np.zeros((nrp,2,6))
+            N[:,0,0] = 1-s
+            N[:,0,3] = s
+            N[:,1,1] = 1-3*s**2+2*s**3
+            N[:,1,2] = s-2*s**2+s**3
+            N[:,1,4] = 3*s**2-2*s**3
+            N[:,1,5] = -s**2+s**3
+            self._hermiteTables[nrp] = N
+        return self._hermiteTables[nrp]
+
+    def localDeformations(self, els, Ve, nrp):
+        # Local displacements (u, w) at nrp stations of elements els from the end displacements.
+        # Ve is (...,nel,6) with optional leading load case dimensions, the result is (...,len(els),nrp,2)
+        els = np.asarray(els, int)
+        geometry = self.elementGeometry()
+        A, L = geometry['A'][els], geometry['L'][els]
+        v = np.einsum('eij,...ej->...ei', A, Ve[...,els,:])
+        scale = np.ones((len(els),6))
+        scale[:,2] = L
+        scale[:,5] = L
+        return np.einsum('sij,...ej->...esi', self.hermiteTable(nrp), v*scale)
@@ -6,12 +6,20 @@ Created on Mon Apr 18 16:38:43 2022
 """
 
 import numpy as np
-from Moon2Mars.EC3 import EC3base, EC3calc
-from Moon2Mars.EC5 import EC5base, EC5calc
+from Moon2Mars.EC3 import EC3base, EC3calc, EC3calcBatch
+from Moon2Mars.EC5 import EC5base, EC5calc, EC5calcBatch, getLoadDuration
 from Moon2Mars.EC6 import EC6
 from scipy.interpolate import CubicSpline
 import copy as copy
 import itertools
+import math
+
+class UnreportedCombination():
+    # Stand-in for the EC object of a member and combination that is not reported, see S.setCombinationObjects. Holds the
+    # URs only, -inf for the combinations skipped by S.screenCombinations so they are never picked as governing
+    def __init__(self, URnames, URvalues):
+        self.UR = {name: value for name, value in zip(URnames, URvalues) if not math.isnan(value)}
+
 
 class S():
     def __init__(self, model, project):
@@ -30,6 +38,11 @@ class S():
         self.loadform = []
         self.loadIds = []
 
+        self.maxEnumeratedLoads = 8 # above this number of variable loads only the sign based on/off states are generated, see loadSignPatterns
+        self.envelopeMode = False # only the combinations governing the max/min of some output are generated, see envelopeCombinations
+        self.envelopes = None
+        self.pruneCombinations = True # full Eurocode checks only for the combinations that can govern, see screenCombinations
+
         
     def addLineLoad(self,coor1,coor2,Fxy1,Fxy2,loadtype,loadId):
         
@@ -111,10 +124,7 @@ class S():
         self.loadCombinations['ULS'] = {}
         self.loadCombinations['SLS'] = {}
         self.loadCombinations['ALS'] = {}
-        
-        loadcombMatDict_ULS = {}
-        loadcombMatDict_SLS = {}
-        loadcombMatDict_ALS = {}
+        self._URarrays = {}
 
         F1_singleload = {}
         F2_singleload = {}
@@ -129,11 +139,16 @@ class S():
         Vediscr = {}
 
         # --------- Calculate section forces for each load --------- #
+        # Load vectors are built per load, K is factorized once and all loads are solved together
+        bLs = []
+        localLoads = []
+        distLoads = []
         for i in range(self.numOfLoads):
             #reset loadvectors
             self.model.bL = np.empty((0,2), float)
             self.model.bL_el_map = np.empty((0,2), float)
             self.model.localLoads = np.zeros((np.size(self.model.T,0),6), float)
+            self.model.distLoads = np.zeros((np.size(self.model.T,0),4), float)
 
             if loadform[i] == 'construction':
                 self.model.addSelfWeight(1)
@@ -152,13 +167,18 @@ class S():
                     if M0[i][0] != 0:
                         self.model.addLoad(coor1[i], "M", M0[i][0])
 
-            self.model.run()
+            bLs.append(self.model.bL)
+            localLoads.append(self.model.localLoads)
+            distLoads.append(self.model.distLoads)
+
+        self.model.runLoadCases(bLs, localLoads, distLoads=distLoads)
 
-            F1_singleload[i] = self.model.F1
-            F2_singleload[i] = self.model.F2
-            M_singleload[i] = self.model.M
-            R0_singleload[i] = self.model.R0
-            Ve_singleload[i] = self.model.Ve
+        for i in range(self.numOfLoads):
+            F1_singleload[i] = self.model.F1[i]
+            F2_singleload[i] = self.model.F2[i]
+            M_singleload[i] = self.model.M[i]
+            R0_singleload[i] = self.model.R0[i]
+            Ve_singleload[i] = self.model.Ve[i]
   
 
         # --------- Save section forces for each load combination --------- #                      
@@ -172,7 +192,6 @@ class S():
 
         # --------- Discretize section forces for each load case --------- #
         # Initialize dictionaries with an empty array for each load case
-        firstRow = []
         XFs = np.empty((2,0), float)
         T_discr = np.empty([0,2])
         X_discr = np.empty([0,2])
@@ -181,40 +200,20 @@ class S():
         n=-1
         self.plotDiscr = 10
 
-        for lc in F1_singleload:
-            for i, m in enumerate(self.member):
-                _, F1temp, _, _ = self.discretizeSectionForces(m, 'F1', lc)
-                firstRow = np.append(firstRow, F1temp, axis=0)
-            break
+        # Section forces of all load cases are discretized in one pass per member
+        F1discr, F2discr, Mdiscr, VediscrX, VediscrY, Vediscr_loc = [], [], [], [], [], []
 
-        n_columns = len(firstRow)
-        F1discr = np.zeros([len(singleloadList), n_columns])
-        F2discr = np.zeros([len(singleloadList), n_columns])
-        Mdiscr = np.zeros([len(singleloadList), n_columns])
-        VediscrX = np.zeros([len(singleloadList), n_columns])
-        VediscrY = np.zeros([len(singleloadList), n_columns])
-        Vediscr_loc = np.zeros([len(singleloadList), n_columns])
-
-        start = 0
         for i, m in enumerate(self.member):
-            for lc in F1_singleload:
-                _, F1temp, _, _ = self.discretizeSectionForces(m, 'F1', lc)
-                F1discr[lc,start:start+len(F1temp)] = F1temp
-
-                _, F2temp, _, _ = self.discretizeSectionForces(m, 'F2', lc)
-                F2discr[lc,start:start+len(F2temp)] = F2temp
-
-                _, Mtemp, _, _ = self.discretizeSectionForces(m, 'M', lc)
-                Mdiscr[lc,start:start+len(Mtemp)] = Mtemp
-
-                Vetemp, Ve_loc_temp = self.getDeformation(m, lc)
-                VediscrX[lc,start:start+len(Vetemp[:,0])] = Vetemp[:,0]
-                VediscrY[lc,start:start+len(Vetemp[:,1])] = Vetemp[:,1]
-                Vediscr_loc[lc,start:start+len(Ve_loc_temp[:,1])] = Ve_loc_temp[:,1]
+            xfine_loc, SFfine, AuBeam, X1beam = self.discretizeSectionForcesAll(m, self.model.F1, self.model.F2, self.model.M, self.model.Ve, self.model._distLoads)
+            F1discr.append(SFfine['F1'])
+            F2discr.append(SFfine['F2'])
+            Mdiscr.append(SFfine['M'])
 
-            start += len(F1temp)
+            Vetemp, Ve_loc_temp = self.getDeformationAll(m, self.model.F1, self.model.F2, self.model.M, self.model.Ve, self.model._distLoads)
+            VediscrX.append(Vetemp[:,:,0])
+            VediscrY.append(Vetemp[:,:,1])
+            Vediscr_loc.append(Ve_loc_temp[:,:,1])
 
-            xfine_loc, _, AuBeam, X1beam = self.discretizeSectionForces(m, 'F1', lc)
             XY = np.dot(np.transpose(AuBeam), [xfine_loc,np.zeros(len(xfine_loc))]) 
             XFs = XY + np.tile(np.array([[X1beam[0]], [X1beam[1]]]), (1, np.size(XY,1)))
             n+=1
@@ -235,10 +234,15 @@ class S():
             m_temp['X1beam'] = X1beam
             member_discr.append(m_temp)
 
+        # Columns: stations of all members after each other
+        F1discr, F2discr, Mdiscr, VediscrX, VediscrY, Vediscr_loc = [np.concatenate([np.zeros([len(singleloadList), 0])] + blocks, axis=1)
+                                                                     for blocks in (F1discr, F2discr, Mdiscr, VediscrX, VediscrY, Vediscr_loc)]
+
         self.T_discr = T_discr.astype(int)
         self.X_discr = X_discr
         self.X_loc_discr = X_loc_discr
         self.member_discr = member_discr
+        self.initMemberECobj = [None]*len(self.member_discr)
         R0_singleload_mat = np.array(list(self.loadCombinationsFE['R0'].values()))
 
         self.R0_type = np.empty(len(self.model.U), dtype=object)
@@ -265,625 +269,456 @@ class S():
         while 'Standard' in domList:
             domList.remove('Standard')
 
+        singleLoads = np.stack((F1discr, F2discr, Mdiscr, VediscrX, VediscrY, Vediscr_loc), axis=1) # (n_loads, n_quantities, n_points)
+        contributions = np.concatenate((singleLoads.reshape((len(loadtypes), -1)), R0_singleload_mat.reshape((len(loadtypes), -1))), axis=1) # every output of every load
+        self.interactionOutputs = self.interactionOutputGroups(contributions, np.size(singleLoads,2))
+
         # --------- Generate load combinations --------- #
 
         #if no Egenlast exists make empy array
-        if 'Egenlast' not in loadtypesIndices:
-            combinations_matrix = self.generate_load_combinations(loadtypes, [])
+        if self.envelopeMode:
+            combinations_matrix = np.ones((1, len(loadtypes))) # all loads on, the rows then hold the load factors of each family
+        elif 'Egenlast' not in loadtypesIndices:
+            combinations_matrix = self.generate_load_combinations(loadtypes, [], contributions)
         else:
-            combinations_matrix = self.generate_load_combinations(loadtypes, loadtypesIndices['Egenlast'])
-
-
-        # Load factors
-        psi_0 = {'Nyttelast': 0.5, 'Snelast, med kat E eller dom temp': 0.6, 'Snelast, dom vind': 0, 'Snelast': 0.3, 'Vindlast, med kat E': 0.6, 'Vindlast': 0.3, 'Temperaturlast': 0.6}
-        psi_1 = {'Nyttelast': 0.3, 'Snelast, med kat E eller dom temp': 0.2, 'Snelast, dom vind': 0, 'Snelast': 0.2, 'Vindlast, med kat E': 0.2, 'Vindlast': 0.2, 'Temperaturlast': 0.5}
-        psi_2 = {'Nyttelast': 0.2, 'Snelast, med kat E eller dom temp': 0,   'Snelast, dom vind': 0, 'Snelast': 0,   'Vindlast, med kat E': 0,   'Vindlast': 0,   'Temperaturlast': 0}
-        
-        gamma_Gjsup_6_10a = 1.2
-        gamma_Gjinf_6_10a = 1.0
-        gamma_Gjsup_6_10b = 1.0
-        gamma_Gjinf_6_10b = 0.9
-        
-        gamma_Q1 = 1.5
+            combinations_matrix = self.generate_load_combinations(loadtypes, loadtypesIndices['Egenlast'], contributions)
 
-        ########################################################## --------------- ULS ------------- ###############################################################
-
-        F1 = {}
-        F2 = {}
-        M = {}
-        R0 = {}
-        Ve = {}
-        Ve_loc = {}
-
-        #if loadtypeStandardIndices not empty (meaning 'Standard' load present), add a combination with only this load, with gamma_Gj = 1.0
-        if loadtypeStandardIndices:
-            loadcombMat = np.zeros([1,len(loadtypes)])
-            loadcombMat[:, loadtypeStandardIndices['Standard']] = 1.0
-
-            F1_mat = np.matmul(loadcombMat, F1discr)
-            F2_mat = np.matmul(loadcombMat, F2discr)
-            M_mat = np.matmul(loadcombMat, Mdiscr)
-            VeX_mat = np.matmul(loadcombMat, VediscrX)
-            VeY_mat = np.matmul(loadcombMat, VediscrY)
-            Ve_loc_mat = np.matmul(loadcombMat, Vediscr_loc)
-            R0_mat = np.matmul(loadcombMat, R0_singleload_mat)
-
-            domname = 'Uden lastfaktor / lastkombination'
-            for i in range(np.size(loadcombMat,0)):
-                comb = domname
-                F1[comb] = F1_mat[i,:]
-                F2[comb] = F2_mat[i,:]
-                M[comb] = M_mat[i,:]
-                Ve[comb] = np.array([VeX_mat[i,:], VeY_mat[i,:]]).T
-                Ve_loc[comb] = Ve_loc_mat[i,:]
-                R0[comb] = R0_mat[i,:]
-                loadcombMatDict_ULS[comb] = loadcombMat[i,:]
-        
-        else:
-            c = 0
-            for dom in domList:
-                # Tabel A1.2(B+C) DK NA Regningsmæssige lastværdier for vedvarende og midlertidige dimensioneringstilfælde (STR/GEO) (sæt B og C)
-                if dom == 'Egenlast': # Lastkombination 1 (6.10a)
-                    for gamma_Gj in [gamma_Gjsup_6_10a, gamma_Gjinf_6_10a]:
-                        loadcombMat = np.zeros([1,len(loadtypes)])
-                        loadcombMat[:, loadtypesIndices['Egenlast']] = 1
-
-                        # Tyngde, generelt
-                        if gamma_Gj == gamma_Gjsup_6_10a:
-                            loadcombMat[:, loadtypesIndices['Egenlast']] *= gamma_Gj*self.KFi              
-                            name = 'Tyngde, generelt - Ugunstig - (6.10a)'
-                        else: # gamma_Gjinf
-                            loadcombMat[:, loadtypesIndices['Egenlast']] *= gamma_Gj
-                            name = 'Tyngde, generelt - Gunstig - (6.10a)'                                                      # Uden KFi! Tyngde, generelt
-
-                        for loadtype in loadtypesIndices:
-                            if loadtype != 'Egenlast':
-                                loadcombMat[:, loadtypesIndices[loadtype]] *= 0
-
-                        F1_mat = np.matmul(loadcombMat, F1discr)
-                        F2_mat = np.matmul(loadcombMat, F2discr)
-                        M_mat = np.matmul(loadcombMat, Mdiscr)
-                        VeX_mat = np.matmul(loadcombMat, VediscrX)
-                        VeY_mat = np.matmul(loadcombMat, VediscrY)
-                        Ve_loc_mat = np.matmul(loadcombMat, Vediscr_loc)
-                        R0_mat = np.matmul(loadcombMat, R0_singleload_mat)
-
-                        domname = name
-                        for i in range(np.size(loadcombMat,0)):
-                            comb = 'Komb. ' + str(c+1) + '. ' + domname
-                            F1[comb] = F1_mat[i,:]
-                            F2[comb] = F2_mat[i,:]
-                            M[comb] = M_mat[i,:]
-                            Ve[comb] = np.array([VeX_mat[i,:], VeY_mat[i,:]]).T
-                            Ve_loc[comb] = Ve_loc_mat[i,:]
-                            R0[comb] = R0_mat[i,:]
-                            loadcombMatDict_ULS[comb] = loadcombMat[i,:]
-                            c += 1
-
-                else: # Lastkombination 2 (6.10b)
-                    for gamma_Gj in [gamma_Gjsup_6_10b, gamma_Gjinf_6_10b]:
-                        loadcombMat = copy.deepcopy(combinations_matrix)
-
-                        # Tyngde, generelt
-                        if gamma_Gj == gamma_Gjsup_6_10b:
-                            loadcombMat[:, loadtypesIndices['Egenlast']] *= gamma_Gj*self.KFi               
-                            name = 'Tyngde, generelt - Ugunstig - (6.10b)'
-                        else: # gamma_Gjinf
-                            loadcombMat[:, loadtypesIndices['Egenlast']] *= gamma_Gj                        # Uden KFi! Tyngde, generelt
-                            name = 'Tyngde, generelt - Gunstig - (6.10b)'
-
-                        # Dominerende last
-                        if dom == 'Nyttelast':
-                            alpha_n = (1+(self.n-1)*psi_0[dom])/self.n
-                        else:
-                            alpha_n = 1
-                        loadcombMat[:, loadtypesIndices[dom]] *= gamma_Q1*alpha_n*self.KFi   
-
-                        # Øvrige laster                  
-                        for loadtype in loadtypesIndices:
-                            if loadtype != 'Egenlast' and loadtype != dom:
-                                if loadtype == 'Snelast' and dom == 'Vindlast':
-                                    loadcombMat[:, loadtypesIndices[loadtype]] *= gamma_Q1*psi_0['Snelast, dom vind']*self.KFi    
-                                else:
-                                    loadcombMat[:, loadtypesIndices[loadtype]] *= gamma_Q1*psi_0[loadtype]*self.KFi               
-
-
-                        F1_mat = np.matmul(loadcombMat, F1discr)
-                        F2_mat = np.matmul(loadcombMat, F2discr)
-                        M_mat = np.matmul(loadcombMat, Mdiscr)
-                        VeX_mat = np.matmul(loadcombMat, VediscrX)
-                        VeY_mat = np.matmul(loadcombMat, VediscrY)
-                        Ve_loc_mat = np.matmul(loadcombMat, Vediscr_loc)
-                        R0_mat = np.matmul(loadcombMat, R0_singleload_mat)
-
-                        domname = dom + ' dominerende - ' + name
-                        for i in range(np.size(loadcombMat,0)):
-                            comb = 'Komb. ' + str(c+1) + '. ' + domname
-                            F1[comb] = F1_mat[i,:]
-                            F2[comb] = F2_mat[i,:]
-                            M[comb] = M_mat[i,:]
-                            Ve[comb] = np.array([VeX_mat[i,:], VeY_mat[i,:]]).T
-                            Ve_loc[comb] = Ve_loc_mat[i,:]
-                            R0[comb] = R0_mat[i,:]
-                            loadcombMatDict_ULS[comb] = loadcombMat[i,:]
-                            c += 1
-
-                
-        self.loadCombinationsFE_discr['ULS'] = {
-            'F1': F1,
-            'F2': F2,
-            'M':  M,
-            'R0': R0,
-            'Ve': Ve,
-            'Ve_loc': Ve_loc
-        }
-
-
-        ########################################################## --------------- ALS ------------- ###############################################################
-        
-        F1 = {}
-        F2 = {}
-        M = {}
-        R0 = {}
-        Ve = {}
-        Ve_loc = {}
-        
-        
-        #if loadtypeStandardIndices not empty (meaning 'Standard' load present), add a combination with only this load, with gamma_Gj = 1.0
-        if loadtypeStandardIndices:
-            loadcombMat = np.zeros([1,len(loadtypes)])
-            loadcombMat[:, loadtypeStandardIndices['Standard']] = 1.0
-
-            F1_mat = np.matmul(loadcombMat, F1discr)
-            F2_mat = np.matmul(loadcombMat, F2discr)
-            M_mat = np.matmul(loadcombMat, Mdiscr)
-            VeX_mat = np.matmul(loadcombMat, VediscrX)
-            VeY_mat = np.matmul(loadcombMat, VediscrY)
-            Ve_loc_mat = np.matmul(loadcombMat, Vediscr_loc)
-            R0_mat = np.matmul(loadcombMat, R0_singleload_mat)
-
-            domname = 'Uden lastfaktor / lastkombination'
-            for i in range(np.size(loadcombMat,0)):
-                comb = domname
-                F1[comb] = F1_mat[i,:]
-                F2[comb] = F2_mat[i,:]
-                M[comb] = M_mat[i,:]
-                Ve[comb] = np.array([VeX_mat[i,:], VeY_mat[i,:]]).T
-                Ve_loc[comb] = Ve_loc_mat[i,:]
-                R0[comb] = R0_mat[i,:]
-                loadcombMatDict_ALS[comb] = loadcombMat[i,:]
 
-        else:
-            c=0
-            for prim in domList:
-                #Tabel A1.3 DK NA Regningsmæssige lastværdier til brug ved lastkombinationer ved ulykkesdimensioneringstilstande og seismiske dimensioneringstilstande
-                # Dimensioneringstilfælde: Brand
-                loadcombMat = copy.deepcopy(combinations_matrix)
-
-                # Dominerende last, A_d - ikke nødvendig for nu
-
-                # Ikke-dominerende laster:
-                # Primær last
-                if prim != 'Egenlast':
-                    loadcombMat[:, loadtypesIndices[prim]] *= psi_1[prim]
-                # Andre laster                  
-                for loadtype in loadtypesIndices:
-                    if loadtype != 'Egenlast' and loadtype != prim:
-                            loadcombMat[:, loadtypesIndices[loadtype]] *= psi_2[loadtype] #Bemærk ikke kombineret med nogen dominerende last, men derimod primær last. Derfor f.eks. ikke anvend "Snelast, dom vind"        
-
-                F1_mat = np.matmul(loadcombMat, F1discr)
-                F2_mat = np.matmul(loadcombMat, F2discr)
-                M_mat = np.matmul(loadcombMat, Mdiscr)
-                VeX_mat = np.matmul(loadcombMat, VediscrX)
-                VeY_mat = np.matmul(loadcombMat, VediscrY)
-                Ve_loc_mat = np.matmul(loadcombMat, Vediscr_loc)
-                R0_mat = np.matmul(loadcombMat, R0_singleload_mat)
-
-                domname = prim + ' primær - Brand - (6.11a/b)'
-                for i in range(np.size(loadcombMat,0)):
-                    comb = 'Komb. ' + str(c+1) + '. ' + domname
-                    F1[comb] = F1_mat[i,:]
-                    F2[comb] = F2_mat[i,:]
-                    M[comb] = M_mat[i,:]
-                    Ve[comb] = np.array([VeX_mat[i,:], VeY_mat[i,:]]).T
-                    Ve_loc[comb] = Ve_loc_mat[i,:]
-                    R0[comb] = R0_mat[i,:]
-                    loadcombMatDict_ALS[comb] = loadcombMat[i,:]
-                    c += 1
-
-        self.loadCombinationsFE_discr['ALS'] = {
-            'F1': F1,
-            'F2': F2,
-            'M':  M,
-            'R0': R0,
-            'Ve': Ve,
-            'Ve_loc': Ve_loc
-        }
-
-        ########################################################## --------------- SLS ------------- ###############################################################
-
-        F1 = {}
-        F2 = {}
-        M = {}
-        R0 = {}
-        Ve = {}
-        Ve_loc = {}
-        
-        gamma_Gjsup = 1.0
-        # for SLScombtype in ['Karakteristisk', 'Hyppig', 'Kvasipermanent']:
-        #     for dom in domList:
-        #         for gamma_Gj in [gamma_Gjsup]:
-        #             loadcombMat = copy.deepcopy(combinations_matrix)
-
-        #             # Tyngde, generelt
-        #             if gamma_Gj == gamma_Gjsup:
-        #                 loadcombMat[:, loadtypesIndices['Egenlast']] *= gamma_Gj               
-        #                 name = 'Tyngde, Ugunstig'
-
-        #             # Dominerende last
-        #             # if SLScombtype == 'Karakteristisk':
-        #             #     loadcombMat[:, loadtypesIndices[dom]] *= 1                      # (alle laster multipliceres med 1,0, altså intet her)
-        #             if dom != 'Egenlast':
-        #                 if SLScombtype == 'Hyppig':
-        #                     loadcombMat[:, loadtypesIndices[dom]] *= psi_1[dom]
-        #                 elif SLScombtype == 'Kvasipermanent':
-        #                     loadcombMat[:, loadtypesIndices[dom]] *= psi_2[dom]      
-                
-        #             # Øvrige laster
-        #             for loadtype in loadtypesIndices:
-        #                 if loadtype != 'Egenlast' and loadtype != dom:
-        #                     if loadtype == 'Snelast' and dom == 'Vindlast':
-        #                         if SLScombtype == 'Karakteristisk':
-        #                             loadcombMat[:, loadtypesIndices[loadtype]] *= psi_0['Snelast, dom vind']
-        #                         elif SLScombtype == 'Hyppig' or SLScombtype == 'Kvasipermanent':
-        #                             loadcombMat[:, loadtypesIndices[loadtype]] *= psi_2['Snelast, dom vind']                                                                                                  
-        #                     else:
-        #                         if SLScombtype == 'Karakteristisk':
-        #                             loadcombMat[:, loadtypesIndices[loadtype]] *= psi_0[loadtype]
-        #                         elif SLScombtype == 'Hyppig' or SLScombtype == 'Kvasipermanent':
-        #                             loadcombMat[:, loadtypesIndices[loadtype]] *= psi_2[loadtype]
-
-        #             F1_mat = np.matmul(loadcombMat, F1discr)
-        #             F2_mat = np.matmul(loadcombMat, F2discr)
-        #             M_mat = np.matmul(loadcombMat, Mdiscr)
-        #             VeX_mat = np.matmul(loadcombMat, VediscrX)
-        #             VeY_mat = np.matmul(loadcombMat, VediscrY)
-        #             Ve_loc_mat = np.matmul(loadcombMat, Vediscr_loc)
-
-        #             domname = SLScombtype + ' - ' + dom + ' dominerende - ' + name
-        #             for i in range(np.size(loadcombMat,0)):
-        #                 comb = domname + ' - Komb. ' + str(i+1)
-        #                 F1[comb] = F1_mat[i,:]
-        #                 F2[comb] = F2_mat[i,:]
-        #                 M[comb] = M_mat[i,:]
-        #                 Ve[comb] = np.array([VeX_mat[i,:], VeY_mat[i,:]]).T
-        #                 Ve_loc[comb] = Ve_loc_mat[i,:]
-        #                 loadcombMatDict_SLS[comb] = loadcombMat[i,:]
-        if loadtypeStandardIndices:
-            loadcombMat = np.zeros([1,len(loadtypes)])
-            loadcombMat[:, loadtypeStandardIndices['Standard']] = 1.0
-
-            F1_mat = np.matmul(loadcombMat, F1discr)
-            F2_mat = np.matmul(loadcombMat, F2discr)
-            M_mat = np.matmul(loadcombMat, Mdiscr)
-            VeX_mat = np.matmul(loadcombMat, VediscrX)
-            VeY_mat = np.matmul(loadcombMat, VediscrY)
-            Ve_loc_mat = np.matmul(loadcombMat, Vediscr_loc)
-            R0_mat = np.matmul(loadcombMat, R0_singleload_mat)
-
-            domname = 'Uden lastfaktor / lastkombination'
-            for i in range(np.size(loadcombMat,0)):
-                comb = domname
-                F1[comb] = F1_mat[i,:]
-                F2[comb] = F2_mat[i,:]
-                M[comb] = M_mat[i,:]
-                Ve[comb] = np.array([VeX_mat[i,:], VeY_mat[i,:]]).T
-                Ve_loc[comb] = Ve_loc_mat[i,:]
-                R0[comb] = R0_mat[i,:]
-                loadcombMatDict_SLS[comb] = loadcombMat[i,:]
+        # --------- Combine single loads for all limit states --------- #
+        # Coefficient matrices with metadata for every limit state, applied in one product against the single loads
+        combinationSets = self.buildLoadCombinations(loadtypes, loadtypesIndices, loadtypeStandardIndices, domList, combinations_matrix, contributions)
+        self._loadCombinationArrays = self.combineLoads(combinationSets, singleLoads, R0_singleload_mat)
+        if self.envelopeMode:
+            self.envelopes = self.splitEnvelopes(combinationSets, np.shape(singleLoads)[2])
 
-        else:
-            c=0
-            for SLScombtype in ['Karakteristisk']:
-                for dom in domList:
-                    loadtypesIndicesOneLoadtype ={}
-                    loadtypesIndicesOneLoadtype = {dom: loadtypesIndices[dom]}
-                    loadcombMat = self.generate_load_combinations_SLS_DKNA(loadtypes, loadtypesIndicesOneLoadtype)
-
-                    F1_mat = np.matmul(loadcombMat, F1discr)
-                    F2_mat = np.matmul(loadcombMat, F2discr)
-                    M_mat = np.matmul(loadcombMat, Mdiscr)
-                    VeX_mat = np.matmul(loadcombMat, VediscrX)
-                    VeY_mat = np.matmul(loadcombMat, VediscrY)
-                    Ve_loc_mat = np.matmul(loadcombMat, Vediscr_loc)
-                    R0_mat = np.matmul(loadcombMat, R0_singleload_mat)
-
-                    domname = SLScombtype + ', ' + dom + ' alene'
-                    for i in range(np.size(loadcombMat,0)):
-                        comb = 'Komb. ' + str(c+1) + '. ' + domname
-                        F1[comb] = F1_mat[i,:]
-                        F2[comb] = F2_mat[i,:]
-                        M[comb] = M_mat[i,:]
-                        Ve[comb] = np.array([VeX_mat[i,:], VeY_mat[i,:]]).T
-                        Ve_loc[comb] = Ve_loc_mat[i,:]
-                        R0[comb] = R0_mat[i,:]
-                        loadcombMatDict_SLS[comb] = loadcombMat[i,:]
-                        c += 1
-
-        self.loadCombinationsFE_discr['SLS'] = {
-            'F1': F1,
-            'F2': F2,
-            'M':  M,
-            'R0': R0,
-            'Ve': Ve,
-            'Ve_loc': Ve_loc
-        }
+        # Per combination views, keyed by combination name
+        for state in self._loadCombinationArrays:
+            arrays = self._loadCombinationArrays[state]
+            self.loadCombinationsFE_discr[state] = {key: dict(zip(arrays['names'], arrays[key])) for key in ['F1', 'F2', 'M', 'R0', 'Ve', 'Ve_loc']}
+        loadcombMatDict_ULS = dict(zip(combinationSets['ULS']['names'], combinationSets['ULS']['coefficients']))
+        loadcombMatDict_ALS = dict(zip(combinationSets['ALS']['names'], combinationSets['ALS']['coefficients']))
+        loadcombMatDict_SLS = dict(zip(combinationSets['SLS']['names'], combinationSets['SLS']['coefficients']))
 
 
         # --------- Calculate utilization ratios --------- #
 
-        self.initMemberECobj = [None]*len(self.member_discr)
+        # Pre-screening, (n_members, n_comb) masks of the member/combination pairs that get the full checks
+        evaluate = {}
+        domainMasks = {}
+        groups = {}
+        for state in ['ULS', 'SLS', 'ALS']:
+            domainMasks[state] = self.domainMasks(state, domList, loadtypeStandardIndices)
+            groups[state] = self.combinationGroups(state, domainMasks[state])
+            if self.pruneCombinations:
+                evaluate[state] = self.screenCombinations(state, groups[state])
+            else:
+                evaluate[state] = np.ones((len(self.member_discr), len(self._loadCombinationArrays[state]['meta'])), bool)
         
-        for comb in loadcombMatDict_ULS:
-            self.loadCombinations['ULS'][comb] = self.getURvalues(comb, 'ULS', loadcombMatDict_ULS)
-
-        for comb in loadcombMatDict_SLS:
-            self.loadCombinations['SLS'][comb] = self.getURvalues(comb, 'SLS', loadcombMatDict_SLS)
+        self.checkCombinations('ULS', evaluate['ULS'])
+        self.checkCombinations('SLS', evaluate['SLS'])
+        self.checkCombinations('ALS', evaluate['ALS']) #ALS er ikke implementeret endnu, så vi bruger ULS. Først nødvendigt når kipning skal medtages, da der så skal itereres mht. ståltemp og udnyttelse
 
-        for comb in loadcombMatDict_ALS:
-            self.loadCombinations['ALS'][comb] = self.getURvalues(comb, 'ALS', loadcombMatDict_ALS) #ALS er ikke implementeret endnu, så vi bruger ULS. Først nødvendigt når kipning skal medtages, da der så skal itereres mht. ståltemp og udnyttelse
+        for state in ['ULS', 'SLS', 'ALS']:
+            self.fillPrunedCombinations(state, groups[state])
 
 
        #______________________________________________________________________________________________________________________#
+        # Per member UR matrices, governing combinations and the reported union of them, all sliced from self._URarrays
+        states = ['ULS', 'SLS', 'ALS']
+        loadcombMatDicts = {'ULS': loadcombMatDict_ULS, 'SLS': loadcombMatDict_SLS, 'ALS': loadcombMatDict_ALS}
+        layout = {state: [self.memberURlayout(state, i) for i in range(len(self.member_discr))] for state in states}
+
         self.sectionResultsFull = []
         self.sectionResultsMember = []
-        self.sectionResults = []
-        nMembers = len(self.loadCombinations['ULS'][list(self.loadCombinations['ULS'].keys())[0]])
-        for i in range(nMembers):
-            section = {}
+        topColumns = {state: [np.zeros(0, int)] for state in states}
+        for i in range(len(self.member_discr)):
             sectionFull = {}
             sectionMember = {}
-            loadCombUR_ULS = {}
-            loadCombUR_SLS = {}
-            loadCombUR_ALS = {}
-            URnames_ULS = []
-            URnames_SLS = []
-            URnames_ALS = []
-            LoadCombnames_ULS = []
-            LoadCombnames_SLS = []
-            LoadCombnames_ALS = []
-
-            for combination in self.loadCombinations['ULS']:
-                URs_ULS = {}
-                b = self.loadCombinations['ULS'][combination][i]
-                for URs in b.UR:
-                    URs_ULS[URs] = b.UR[URs]
-                    LoadCombnames_ULS.append(combination)
-                    URnames_ULS.append(URs)
-
-                loadCombUR_ULS[combination] = URs_ULS
-
-            for combination in self.loadCombinations['SLS']:
-                URs_SLS = {}
-                b = self.loadCombinations['SLS'][combination][i]
-                for URs in b.UR:
-                    URs_SLS[URs] = b.UR[URs]
-                    LoadCombnames_SLS.append(combination)
-                    URnames_SLS.append(URs)
-
-                loadCombUR_SLS[combination] = URs_SLS
-
-            for combination in self.loadCombinations['ALS']:
-                URs_ALS = {}
-                b = self.loadCombinations['ALS'][combination][i]
-                for URs in b.UR:
-                    URs_ALS[URs] = b.UR[URs]
-                    LoadCombnames_ALS.append(combination)
-                    URnames_ALS.append(URs)
-
-                loadCombUR_ALS[combination] = URs_ALS
-            
-            URnames_ULS = list(dict.fromkeys(URnames_ULS))
-            URnames_SLS = list(dict.fromkeys(URnames_SLS))
-            URnames_ALS = list(dict.fromkeys(URnames_ALS))
-
-            LoadCombnames_ULS = list(dict.fromkeys(LoadCombnames_ULS))
-            LoadCombnames_SLS = list(dict.fromkeys(LoadCombnames_SLS))
-            LoadCombnames_ALS = list(dict.fromkeys(LoadCombnames_ALS))
-           
-            UR_loadcomb_mat_ULS = np.zeros([len(URnames_ULS),len(LoadCombnames_ULS)])           
-            UR_loadcomb_mat_SLS = np.zeros([len(URnames_SLS),len(LoadCombnames_SLS)])
-            UR_loadcomb_mat_ALS = np.zeros([len(URnames_ALS),len(LoadCombnames_ALS)])
-            
-            
-            for ii in range(np.size(UR_loadcomb_mat_ULS,0)):
-                for iii in range(np.size(UR_loadcomb_mat_ULS,1)):
-                    UR_loadcomb_mat_ULS[ii,iii] = loadCombUR_ULS[LoadCombnames_ULS[iii]][URnames_ULS[ii]]
-
-            for ii in range(np.size(UR_loadcomb_mat_SLS,0)):
-                for iii in range(np.size(UR_loadcomb_mat_SLS,1)):
-                    try:
-                        UR_loadcomb_mat_SLS[ii,iii] = loadCombUR_SLS[LoadCombnames_SLS[iii]][URnames_SLS[ii]]
-                    except KeyError:
-                        UR_loadcomb_mat_SLS[ii,iii] = np.nan
-
-            for ii in range(np.size(UR_loadcomb_mat_ALS,0)):
-                for iii in range(np.size(UR_loadcomb_mat_ALS,1)):
-                    UR_loadcomb_mat_ALS[ii,iii] = loadCombUR_ALS[LoadCombnames_ALS[iii]][URnames_ALS[ii]]
-            
-            if not UR_loadcomb_mat_ULS.size==0:
-                maxArg_ULS = np.argmax(UR_loadcomb_mat_ULS,1)
-            if not UR_loadcomb_mat_SLS.size==0:
-                maxArg_SLS = np.argmax(UR_loadcomb_mat_SLS,1)
-            if not UR_loadcomb_mat_ALS.size==0:
-                maxArg_ALS = np.argmax(UR_loadcomb_mat_ALS,1)
-            
-
-            UR_loadcomb_mat_ULS_member, LoadCombnames_ULS_member, top_indices = self.getTopXValuesPerRow_ULS(UR_loadcomb_mat_ULS, 1, LoadCombnames_ULS, domList, loadtypeStandardIndices)
-
-            sectionFull['URnames_ULS'] = URnames_ULS
-            sectionFull['LoadCombnames_ULS'] = LoadCombnames_ULS
-            sectionFull['UR_loadcomb_mat_ULS'] = UR_loadcomb_mat_ULS
-
-            sectionMember['URnames_ULS'] = URnames_ULS
-            sectionMember['LoadCombnames_ULS'] = LoadCombnames_ULS_member
-            sectionMember['UR_loadcomb_mat_ULS'] = UR_loadcomb_mat_ULS_member
-            sectionMember['UR_loadcomb_top_indices_ULS'] = top_indices
-
-
-            UR_loadcomb_mat_SLS_member, LoadCombnames_SLS_member, top_indices = self.getTopXValuesPerRow_SLS(UR_loadcomb_mat_SLS, domList, LoadCombnames_SLS, loadtypeStandardIndices)
-
-            sectionFull['URnames_SLS'] = URnames_SLS
-            sectionFull['LoadCombnames_SLS'] = LoadCombnames_SLS
-            sectionFull['UR_loadcomb_mat_SLS'] = UR_loadcomb_mat_SLS
-
-            sectionMember['URnames_SLS'] = URnames_SLS
-            sectionMember['LoadCombnames_SLS'] = LoadCombnames_SLS_member
-            sectionMember['UR_loadcomb_mat_SLS'] = UR_loadcomb_mat_SLS_member
-            sectionMember['UR_loadcomb_top_indices_SLS'] = top_indices
-
+            for state in states:
+                checks, combs = layout[state][i]
+                URnames = [self._URarrays[state]['checks'][c] for c in checks]
+                LoadCombnames = [self._loadCombinationArrays[state]['names'][j] for j in combs]
+                UR_loadcomb_mat = self._URarrays[state]['UR'][i][np.ix_(checks, combs)]
+
+                if state == 'SLS':
+                    UR_loadcomb_mat_member, LoadCombnames_member, top_indices = self.getTopXValuesPerRow_SLS(UR_loadcomb_mat, LoadCombnames, domainMasks[state][:, combs])
+                else:
+                    UR_loadcomb_mat_member, LoadCombnames_member, top_indices = self.getTopXValuesPerRow_ULS(UR_loadcomb_mat, 1, LoadCombnames, domainMasks[state][:, combs])
+                topColumns[state].append(combs[np.asarray(top_indices, int)])
 
-            UR_loadcomb_mat_ALS_member, LoadCombnames_ALS_member, top_indices = self.getTopXValuesPerRow_ULS(UR_loadcomb_mat_ALS, 1, LoadCombnames_ALS, domList, loadtypeStandardIndices)
+                sectionFull['URnames_' + state] = URnames
+                sectionFull['LoadCombnames_' + state] = LoadCombnames
+                sectionFull['UR_loadcomb_mat_' + state] = UR_loadcomb_mat
 
-            sectionFull['URnames_ALS'] = URnames_ALS
-            sectionFull['LoadCombnames_ALS'] = LoadCombnames_ALS
-            sectionFull['UR_loadcomb_mat_ALS'] = UR_loadcomb_mat_ALS
-
-            sectionMember['URnames_ALS'] = URnames_ALS
-            sectionMember['LoadCombnames_ALS'] = LoadCombnames_ALS_member
-            sectionMember['UR_loadcomb_mat_ALS'] = UR_loadcomb_mat_ALS_member
-            sectionMember['UR_loadcomb_top_indices_ALS'] = top_indices
-            
-            
-            # section['URnames_ALS'] = URnames_ALS
-            # section['LoadCombnames_ALS'] = LoadCombnames_ALS
-            # section['UR_loadcomb_mat_ALS'] = UR_loadcomb_mat_ALS
-            
+                sectionMember['URnames_' + state] = URnames
+                sectionMember['LoadCombnames_' + state] = LoadCombnames_member
+                sectionMember['UR_loadcomb_mat_' + state] = UR_loadcomb_mat_member
+                sectionMember['UR_loadcomb_top_indices_' + state] = top_indices
 
             self.sectionResultsFull.append(sectionFull)
             self.sectionResultsMember.append(sectionMember)
 
-        tempIndices_ULS = [
-            idx
-            for member in self.sectionResultsMember
-            for idx in member['UR_loadcomb_top_indices_ULS']
-        ]
-        unique_vals_ULS, _ = np.unique(tempIndices_ULS, return_index=True)
-
-        tempIndices_SLS = [
-            idx
-            for member in self.sectionResultsMember
-            for idx in member['UR_loadcomb_top_indices_SLS']
-        ]
-        unique_vals_SLS, _ = np.unique(tempIndices_SLS, return_index=True)
-
-        tempIndices_ALS = [
-            idx
-            for member in self.sectionResultsMember
-            for idx in member['UR_loadcomb_top_indices_ALS']
-        ]
-        unique_vals_ALS, _ = np.unique(tempIndices_ALS, return_index=True)
-
-        for i in range(len(self.sectionResultsMember)):
-            section = {}
-            UR_CriticalLoadComb_ULS = {}
-            UR_CriticalLoadComb_SLS = {}
-            UR_CriticalLoadComb_ALS = {}
-
-            section['URnames_ULS'] = self.sectionResultsFull[i]['URnames_ULS']
-            section['LoadCombnames_ULS'] = list(np.array(self.sectionResultsFull[i]['LoadCombnames_ULS'])[unique_vals_ULS])
-            section['UR_loadcomb_mat_ULS'] = self.sectionResultsFull[i]['UR_loadcomb_mat_ULS'][:,unique_vals_ULS]
-
-            section['URnames_SLS'] = self.sectionResultsFull[i]['URnames_SLS']
-            section['LoadCombnames_SLS'] = list(np.array(self.sectionResultsFull[i]['LoadCombnames_SLS'])[unique_vals_SLS])
-            section['UR_loadcomb_mat_SLS'] = self.sectionResultsFull[i]['UR_loadcomb_mat_SLS'][:,unique_vals_SLS]
-
-            section['URnames_ALS'] = self.sectionResultsFull[i]['URnames_ALS']
-            section['LoadCombnames_ALS'] = list(np.array(self.sectionResultsFull[i]['LoadCombnames_ALS'])[unique_vals_ALS])
-            section['UR_loadcomb_mat_ALS'] = self.sectionResultsFull[i]['UR_loadcomb_mat_ALS'][:,unique_vals_ALS]
-
-            if not section['UR_loadcomb_mat_ULS'].size==0:
-                maxArg_ULS = np.argmax(section['UR_loadcomb_mat_ULS'],1)
-            if not section['UR_loadcomb_mat_ULS'].size==0:
-                for ii in range(len(maxArg_ULS)):
-                    UR_CriticalLoadComb_ULS[section['URnames_ULS'][ii]] = section['LoadCombnames_ULS'][maxArg_ULS[ii]]
-
-
-            if not section['UR_loadcomb_mat_SLS'].size==0:
-                maxArg_SLS = np.argmax(section['UR_loadcomb_mat_SLS'],1)
-            if not section['UR_loadcomb_mat_SLS'].size==0:
-                for ii in range(len(maxArg_SLS)):
-                    UR_CriticalLoadComb_SLS[section['URnames_SLS'][ii]] = section['LoadCombnames_SLS'][maxArg_SLS[ii]]
-
-
-            if not section['UR_loadcomb_mat_ALS'].size==0:
-                maxArg_ALS = np.argmax(section['UR_loadcomb_mat_ALS'],1)
-            if not section['UR_loadcomb_mat_ALS'].size==0:
-                for ii in range(len(maxArg_ALS)):
-                    UR_CriticalLoadComb_ALS[section['URnames_ALS'][ii]] = section['LoadCombnames_ALS'][maxArg_ALS[ii]]
-
-
-            section['UR_CriticalLoadComb_ULS'] = UR_CriticalLoadComb_ULS
-            section['UR_CriticalLoadComb_SLS'] = UR_CriticalLoadComb_SLS
-            section['UR_CriticalLoadComb_ALS'] = UR_CriticalLoadComb_ALS
-
-
-            loadcombMatDict_reduced = {}
-            for loadcomb in section['LoadCombnames_ULS']:
-                loadcombMatDict_reduced[loadcomb] = loadcombMatDict_ULS[loadcomb]
-            section['loadcombMatDict_ULS'] = loadcombMatDict_reduced
-
-
-            loadcombMatDict_reduced = {}
-            for loadcomb in section['LoadCombnames_SLS']:
-                loadcombMatDict_reduced[loadcomb] = loadcombMatDict_SLS[loadcomb]
-            section['loadcombMatDict_SLS'] = loadcombMatDict_reduced 
+        # Governing combinations of any member, skipped pairs among them are checked so every member reports them in full
+        governing = {}
+        for state in states:
+            governing[state] = np.unique(np.concatenate(topColumns[state]))
+            self.completePrunedCombinations(state, governing[state])
+            self.setCombinationObjects(state, governing[state])
+            for i in range(len(self.member_discr)):
+                checks, combs = layout[state][i]
+                self.sectionResultsFull[i]['UR_loadcomb_mat_' + state] = self._URarrays[state]['UR'][i][np.ix_(checks, combs)]
 
+        self.sectionResults = []
+        for i in range(len(self.member_discr)):
+            section = {}
+            for state in states:
+                checks, _ = layout[state][i]
+                section['URnames_' + state] = self.sectionResultsFull[i]['URnames_' + state]
+                section['LoadCombnames_' + state] = list(np.array(self._loadCombinationArrays[state]['names'], dtype=str)[governing[state]])
+                section['UR_loadcomb_mat_' + state] = self._URarrays[state]['UR'][i][np.ix_(checks, governing[state])]
+
+            for state in states:
+                UR_CriticalLoadComb = {}
+                if not section['UR_loadcomb_mat_' + state].size==0:
+                    maxArg = np.argmax(section['UR_loadcomb_mat_' + state], 1)
+                    UR_CriticalLoadComb = dict(zip(section['URnames_' + state], np.array(section['LoadCombnames_' + state])[maxArg]))
+                section['UR_CriticalLoadComb_' + state] = UR_CriticalLoadComb
+
+            for state in states:
+                section['loadcombMatDict_' + state] = {loadcomb: loadcombMatDicts[state][loadcomb] for loadcomb in section['LoadCombnames_' + state]}
 
-            loadcombMatDict_reduced = {}
-            for loadcomb in section['LoadCombnames_ALS']:
-                loadcombMatDict_reduced[loadcomb] = loadcombMatDict_ALS[loadcomb]
-            section['loadcombMatDict_ALS'] = loadcombMatDict_reduced           
-            
-            
             section['loadIds'] = self.loadIds
             self.sectionResults.append(section)
 
 
 ##########################################################################################################################
-   
 
-    def getURvalues(self, lc, typeOfState, loadcombMatDict):
-        memberList = []
-        for i in range(len(self.member_discr)):
-            member = self.member_discr[i]
-            memberprop = member['memberprop']
-
-            #Only init base once per member (for speed)
-            if self.initMemberECobj[i] == None:
-                if member['membertype'] == 'Stål':
-                    self.initMemberECobj[i] = EC3base(self, member)
-                if member['membertype'] == 'Træ':
-                    self.initMemberECobj[i] = EC5base(self, member)
-                elif member['membertype'] == 'Murværk':
-                    self.initMemberECobj[i] = EC6(self.model, member, self.project)
+    def buildLoadCombinations(self, loadtypes, loadtypesIndices, loadtypeStandardIndices, domList, combinations_matrix, contributions=None):
+        # Coefficient matrices for ULS, ALS and SLS, contributions as in generate_load_combinations. Returns per limit state a dict with
+        # 'coefficients' (n_comb, n_loads), 'meta' (one record per row: state, dominant load, gamma_G variant, equation, load
+        # duration class, row index and number) and 'names', the display names made from the records by combinationName.
+        # In envelope mode every family is reduced to its governing combinations and 'envelope' holds the max/min of every output
+        # with the index of the governing combination
 
+        # Load factors
+        psi_0 = {'Nyttelast': 0.5, 'Snelast, med kat E eller dom temp': 0.6, 'Snelast, dom vind': 0, 'Snelast': 0.3, 'Vindlast, med kat E': 0.6, 'Vindlast': 0.3, 'Temperaturlast': 0.6}
+        psi_1 = {'Nyttelast': 0.3, 'Snelast, med kat E eller dom temp': 0.2, 'Snelast, dom vind': 0, 'Snelast': 0.2, 'Vindlast, med kat E': 0.2, 'Vindlast': 0.2, 'Temperaturlast': 0.5}
+        psi_2 = {'Nyttelast': 0.2, 'Snelast, med kat E eller dom temp': 0,   'Snelast, dom vind': 0, 'Snelast': 0,   'Vindlast, med kat E': 0,   'Vindlast': 0,   'Temperaturlast': 0}
+        
+        gamma_Gjsup_6_10a = 1.2
+        gamma_Gjinf_6_10a = 1.0
+        gamma_Gjsup_6_10b = 1.0
+        gamma_Gjinf_6_10b = 0.9
+        
+        gamma_Q1 = 1.5
 
-            ECbaseObj = self.initMemberECobj[i] # base object
+        allLoads = np.arange(len(loadtypes))
+        deadIndices = np.asarray(loadtypesIndices.get('Egenlast', []), int)
+        fixedIndices = np.union1d(deadIndices, np.asarray(loadtypeStandardIndices.get('Standard', []), int)) # always on when part of a family
+
+        combinationSets = {}
+        for state in ['ULS', 'ALS', 'SLS']:
+            rows = []
+            meta = []
+            envelope = None
+            if self.envelopeMode:
+                nOutputs = np.size(contributions,1)
+                envelope = {'max': np.full(nOutputs, -np.inf), 'min': np.full(nOutputs, np.inf),
+                            'maxCombination': np.full(nOutputs, -1), 'minCombination': np.full(nOutputs, -1)}
+
+            def add(loadcombMat, members, dominant, gammaG, equation, numbered=True):
+                # members: the loads switched on/off within the family
+                if self.envelopeMode: # loadcombMat holds the load factors of the family
+                    loadcombMat, valueMax, valueMin, combMax, combMin = self.envelopeCombinations(contributions, loadcombMat[0,:], members, np.intersect1d(members, fixedIndices))
+                    better = valueMax > envelope['max']
+                    envelope['max'][better] = valueMax[better]
+                    envelope['maxCombination'][better] = len(rows) + combMax[better]
+                    better = valueMin < envelope['min']
+                    envelope['min'][better] = valueMin[better]
+                    envelope['minCombination'][better] = len(rows) + combMin[better]
+                for i in range(np.size(loadcombMat,0)):
+                    meta.append({'state': state, 'dominant': dominant, 'gammaG': gammaG, 'equation': equation,
+                                 'loadDuration': getLoadDuration(loadtypes, loadcombMat[i,:], state),
+                                 'index': len(rows), 'number': len(rows)+1 if numbered else None})
+                    rows.append(loadcombMat[i,:])
+
+            #if loadtypeStandardIndices not empty (meaning 'Standard' load present), add a combination with only this load, with gamma_Gj = 1.0
+            if loadtypeStandardIndices:
+                loadcombMat = np.zeros([1,len(loadtypes)])
+                loadcombMat[:, loadtypeStandardIndices['Standard']] = 1.0
+                add(loadcombMat, loadtypeStandardIndices['Standard'], 'Standard', None, None, numbered=False)
+
+            elif state == 'ULS':
+                for dom in domList:
+                    # Tabel A1.2(B+C) DK NA Regningsmæssige lastværdier for vedvarende og midlertidige dimensioneringstilfælde (STR/GEO) (sæt B og C)
+                    if dom == 'Egenlast': # Lastkombination 1 (6.10a)
+                        for gamma_Gj in [gamma_Gjsup_6_10a, gamma_Gjinf_6_10a]:
+                            loadcombMat = np.zeros([1,len(loadtypes)])
+                            loadcombMat[:, loadtypesIndices['Egenlast']] = 1
+
+                            # Tyngde, generelt
+                            if gamma_Gj == gamma_Gjsup_6_10a:
+                                loadcombMat[:, loadtypesIndices['Egenlast']] *= gamma_Gj*self.KFi              
+                                variant = 'sup'
+                            else: # gamma_Gjinf
+                                loadcombMat[:, loadtypesIndices['Egenlast']] *= gamma_Gj                                           # Uden KFi! Tyngde, generelt
+                                variant = 'inf'
+
+                            add(loadcombMat, deadIndices, dom, variant, '6.10a')
+
+                    else: # Lastkombination 2 (6.10b)
+                        for gamma_Gj in [gamma_Gjsup_6_10b, gamma_Gjinf_6_10b]:
+                            loadcombMat = copy.deepcopy(combinations_matrix)
+
+                            # Tyngde, generelt
+                            if gamma_Gj == gamma_Gjsup_6_10b:
+                                loadcombMat[:, loadtypesIndices['Egenlast']] *= gamma_Gj*self.KFi               
+                                variant = 'sup'
+                            else: # gamma_Gjinf
+                                loadcombMat[:, loadtypesIndices['Egenlast']] *= gamma_Gj                        # Uden KFi! Tyngde, generelt
+                                variant = 'inf'
+
+                            # Dominerende last
+                            if dom == 'Nyttelast':
+                                alpha_n = (1+(self.n-1)*psi_0[dom])/self.n
+                            else:
+                                alpha_n = 1
+                            loadcombMat[:, loadtypesIndices[dom]] *= gamma_Q1*alpha_n*self.KFi   
+
+                            # Øvrige laster                  
+                            for loadtype in loadtypesIndices:
+                                if loadtype != 'Egenlast' and loadtype != dom:
+                                    if loadtype == 'Snelast' and dom == 'Vindlast':
+                                        loadcombMat[:, loadtypesIndices[loadtype]] *= gamma_Q1*psi_0['Snelast, dom vind']*self.KFi    
+                                    else:
+                                        loadcombMat[:, loadtypesIndices[loadtype]] *= gamma_Q1*psi_0[loadtype]*self.KFi               
+
+                            add(loadcombMat, allLoads, dom, variant, '6.10b')
+
+            elif state == 'ALS':
+                for prim in domList:
+                    #Tabel A1.3 DK NA Regningsmæssige lastværdier til brug ved lastkombinationer ved ulykkesdimensioneringstilstande og seismiske dimensioneringstilstande
+                    # Dimensioneringstilfælde: Brand
+                    loadcombMat = copy.deepcopy(combinations_matrix)
+
+                    # Dominerende last, A_d - ikke nødvendig for nu
+
+                    # Ikke-dominerende laster:
+                    # Primær last
+                    if prim != 'Egenlast':
+                        loadcombMat[:, loadtypesIndices[prim]] *= psi_1[prim]
+                    # Andre laster                  
+                    for loadtype in loadtypesIndices:
+                        if loadtype != 'Egenlast' and loadtype != prim:
+                                loadcombMat[:, loadtypesIndices[loadtype]] *= psi_2[loadtype] #Bemærk ikke kombineret med nogen dominerende last, men derimod primær last. Derfor f.eks. ikke anvend "Snelast, dom vind"        
+
+                    add(loadcombMat, allLoads, prim, None, '6.11a/b')
+
+            else: # SLS
+                for SLScombtype in ['Karakteristisk']:
+                    for dom in domList:
+                        if self.envelopeMode:
+                            loadcombMat = np.zeros([1,len(loadtypes)])
+                            loadcombMat[:, loadtypesIndices[dom]] = 1
+                        else:
+                            loadcombMat = self.generate_load_combinations_SLS_DKNA(loadtypes, {dom: loadtypesIndices[dom]}, contributions)
+                        add(loadcombMat, loadtypesIndices[dom], dom, None, SLScombtype)
+
+            combinationSets[state] = {
+                'coefficients': np.array(rows, float).reshape((len(rows), len(loadtypes))),
+                'names': [self.combinationName(combination) for combination in meta],
+                'meta': meta
+            }
+            if envelope is not None:
+                combinationSets[state]['envelope'] = envelope
+
+        return combinationSets
+
+    def combinationName(self, combination):
+        # Display name of a combination record from buildLoadCombinations, also its key in the results
+        if combination['dominant'] == 'Standard':
+            name = 'Uden lastfaktor / lastkombination'
+        elif combination['state'] == 'SLS':
+            name = combination['equation'] + ', ' + combination['dominant'] + ' alene'
+        elif combination['state'] == 'ALS':
+            name = combination['dominant'] + ' primær - Brand - (' + combination['equation'] + ')'
+        else:
+            gammaG = {'sup': 'Ugunstig', 'inf': 'Gunstig'}[combination['gammaG']]
+            name = 'Tyngde, generelt - ' + gammaG + ' - (' + combination['equation'] + ')'
+            if combination['equation'] == '6.10b':
+                name = combination['dominant'] + ' dominerende - ' + name
+        if combination['number'] is None:
+            return name
+        return 'Komb. ' + str(combination['number']) + '. ' + name
+
+    def envelopeCombinations(self, contributions, factors, members, fixed):
+        # Max/min of every output over all on/off states of one combination family, in time linear in loads and outputs.
+        # factors: (n_loads,) load factors of the family, members: loads switched on/off in the family, fixed: members always on.
+        # The max is the fixed part plus every positive contribution and the min likewise with the negative ones (as in
+        # loadSignPatterns). Returns the distinct governing coefficient rows, the max and min values and the governing row of each.
+        # The rows also hold the same states per load duration level of loadDurationLevels, for the timber checks, and
+        # the states of interactionPatterns for the checks of two outputs together.
+        n = len(factors)
+        optional = np.setdiff1d(members, fixed)
+        base = np.matmul(factors[fixed], contributions[fixed,:])
+        C = np.transpose(contributions[optional,:])*factors[optional] # (n_outputs, n_optional)
+        nOutputs = np.size(contributions,1)
+
+        if len(optional) == 0:
+            states = np.zeros((1, 0), bool)
+            inverse = np.zeros(2*nOutputs, int)
+            values = np.concatenate((base, base))
+        else:
+            tol = 1e-9*np.max(np.abs(C), axis=1, keepdims=True)
+            patterns = np.concatenate((C > tol, C < -tol), axis=0)
+            if len(fixed) == 0 and np.all(factors[members] != 0):
+                # A combination needs at least one load, where none helps the load closest to the extreme is taken
+                empty = np.where(~patterns.any(axis=1))[0]
+                closest = np.concatenate((np.argmax(C, axis=1), np.argmin(C, axis=1)))
+                patterns[empty, closest[empty]] = True
+            levels = [np.isin(optional, level) for level in self.loadDurationLevels(self.loadtypes, optional)[1:]]
+            shorter = np.concatenate([patterns & allowed for allowed in levels], axis=0)
+            interaction = np.concatenate([self.interactionPatterns(C*allowed) for allowed in [True] + levels], axis=0)
+            if len(fixed) == 0:
+                shorter = shorter[shorter.any(axis=1)]
+                interaction = interaction[interaction.any(axis=1)]
+            states, inverse = np.unique(np.concatenate((patterns, shorter, interaction), axis=0), axis=0, return_inverse=True)
+            inverse = np.reshape(inverse, -1)[:2*nOutputs]
+            values = np.concatenate((base, base)) + np.sum(np.where(patterns, np.concatenate((C, C)), 0), axis=1)
+
+        coefficients = np.zeros((np.size(states,0), n))
+        coefficients[:, optional] = states
+        coefficients[:, fixed] = 1
+        coefficients *= factors
+        return coefficients, values[:nOutputs], values[nOutputs:], inverse[:nOutputs], inverse[nOutputs:]
+
+    def splitEnvelopes(self, combinationSets, nPoints):
+        # Envelopes per limit state and quantity, with the governing combination as an index into 'names'
+        envelopes = {}
+        for state in combinationSets:
+            envelope = combinationSets[state]['envelope']
+            envelopes[state] = {'names': combinationSets[state]['names']}
+            for i, key in enumerate(['F1', 'F2', 'M', 'VeX', 'VeY', 'Ve_loc', 'R0']):
+                part = slice(i*nPoints, (i+1)*nPoints) if key != 'R0' else slice(6*nPoints, None)
+                envelopes[state][key] = {field: envelope[field][part] for field in ['max', 'min', 'maxCombination', 'minCombination']}
+        return envelopes
+
+    def combineLoads(self, combinationSets, singleLoads, R0_singleload):
+        # Superposition for all limit states in one product.
+        # singleLoads: (n_loads, n_quantities, n_points) with quantities F1, F2, M, VeX, VeY, Ve_loc; R0_singleload: (n_loads, n_sup)
+        # Returns per limit state dense arrays with the combination first
+        states = list(combinationSets)
+        C = np.concatenate([combinationSets[state]['coefficients'] for state in states], axis=0)
+        combined = np.tensordot(C, singleLoads, axes=(1,0))
+        R0 = np.matmul(C, R0_singleload)
+
+        arrays = {}
+        start = 0
+        for state in states:
+            names = combinationSets[state]['names']
+            q = combined[start:start+len(names)]
+            arrays[state] = {
+                'names': names,
+                'meta': combinationSets[state]['meta'],
+                'coefficients': combinationSets[state]['coefficients'],
+                'F1': np.ascontiguousarray(q[:,0]),
+                'F2': np.ascontiguousarray(q[:,1]),
+                'M': np.ascontiguousarray(q[:,2]),
+                'Ve': np.stack((q[:,3], q[:,4]), axis=-1),
+                'Ve_loc': np.ascontiguousarray(q[:,5]),
+                'R0': R0[start:start+len(names)]
+            }
+            start += len(names)
+        return arrays
+
+    def getECbase(self, i):
+        member = self.member_discr[i]
+
+        #Only init base once per member (for speed)
+        if self.initMemberECobj[i] == None:
             if member['membertype'] == 'Stål':
-                ECcalcObj = EC3calc(ECbaseObj)      # object containing methods for calculations
-            elif member['membertype'] == 'Træ':
-                ECcalcObj = EC5calc(ECbaseObj, lc, loadcombMatDict, typeOfState)      # object containing methods for calculations
+                self.initMemberECobj[i] = EC3base(self, member)
+            if member['membertype'] == 'Træ':
+                self.initMemberECobj[i] = EC5base(self, member)
             elif member['membertype'] == 'Murværk':
-                ECcalcObj = EC3calc(ECbaseObj)      # object containing methods for calculations
+                self.initMemberECobj[i] = EC6(self.model, member, self.project)
+
+        return self.initMemberECobj[i]
+
+    def checkCombinations(self, typeOfState, evaluate):
+        # Eurocode checks of every member for the combinations marked in evaluate (n_members, n_comb), member by member so
+        # members with batched checks get all their combinations in one call. The URs are held in
+        # self._URarrays[typeOfState]['UR'] (n_members, n_checks, n_comb), NaN where a check does not apply, with the check
+        # names in 'checks' and the unchecked pairs in 'pruned'. loadCombinations is filled by setCombinationObjects
+        names = self._loadCombinationArrays[typeOfState]['names']
+        self._URarrays[typeOfState] = {'checks': [], 'checkIndex': {}, 'UR': np.full((len(self.member_discr), 0, len(names)), np.nan), 'pruned': ~evaluate}
+        for i in range(len(self.member_discr)):
+            cols = np.flatnonzero(evaluate[i])
+            _, UR = self.getMemberURvalues(i, cols, typeOfState)
+            self.storeURvalues(typeOfState, i, cols, UR)
+
+    def storeURvalues(self, typeOfState, i, cols, UR):
+        # UR: check name -> values of member i for the combinations cols
+        URarrays = self._URarrays[typeOfState]
+        for name, values in UR.items():
+            if name not in URarrays['checkIndex']:
+                URarrays['checkIndex'][name] = len(URarrays['checks'])
+                URarrays['checks'].append(name)
+                nMembers, _, nComb = np.shape(URarrays['UR'])
+                URarrays['UR'] = np.concatenate((URarrays['UR'], np.full((nMembers, 1, nComb), np.nan)), axis=1)
+            URarrays['UR'][i, URarrays['checkIndex'][name], cols] = values
+
+    def memberURlayout(self, typeOfState, i):
+        # Rows and columns of member i in the UR array: the checks in order of first appearance and the combinations with checks
+        present = ~np.isnan(self._URarrays[typeOfState]['UR'][i])
+        checks = np.flatnonzero(present.any(axis=1))
+        combs = np.flatnonzero(present.any(axis=0))
+        first = np.argmax(present[checks], axis=1)
+        return checks[np.lexsort((checks, first))], combs
+
+    def getMemberURvalues(self, i, cols, typeOfState):
+        # URs of member i for the combinations cols (rows of the combination arrays) as check name -> array over cols, with
+        # a function k -> EC object of combination cols[k]. Batched members build these objects only when called
+        member = self.member_discr[i]
+        memberprop = member['memberprop']
+        ECbaseObj = self.getECbase(i) # base object
+        arrays = self._loadCombinationArrays[typeOfState]
+        T = self.T_discr[member['consistOfelements']]
+        forces = [arrays[key][cols][:,T] for key in ['F1', 'F2', 'M', 'Ve', 'Ve_loc']]
+
+        if member['membertype'] == 'Stål':
+            ECbatchObj = EC3calcBatch(ECbaseObj, *forces)
+            if typeOfState == 'ULS' or typeOfState == 'ALS':
+                ECbatchObj.forskydning626()
+                ECbatchObj.boejningsmoment625()
+                ECbatchObj.trykpaavirkedeElementerMedKonstantTvaersnit631()
+                #ECbatchObj.kipning632()
+                if 'RH' not in memberprop['profile']:
+                    ECbatchObj.lokaleTvaergaaendeKraefter617()
+            elif typeOfState == 'SLS':
+                ECbatchObj.deformation()
+            return ECbatchObj.view, ECbatchObj.UR
+
+        if member['membertype'] == 'Træ':
+            ECbatchObj = EC5calcBatch(ECbaseObj, [arrays['meta'][j] for j in cols], *forces)
+            if typeOfState == 'ULS' or typeOfState == 'ALS':
+                ECbatchObj.boejning616()
+                ECbatchObj.forskydning617()
+                ECbatchObj.trykVinkelretPaaFibrene615()
+                ECbatchObj.trykParalleltMedFibrene614()
+                ECbatchObj.traekParalleltMedFibrene612()
+                ECbatchObj.boejningOgTryk624()
+                ECbatchObj.boejningOgTraek623()
+            elif typeOfState == 'SLS':
+                ECbatchObj.deformation()
+            return ECbatchObj.view, ECbatchObj.UR
+
+        memberList = []
+        for k in range(len(cols)):
+            ECcalcObj = EC3calc(ECbaseObj)      # object containing methods for calculations
 
-            
             # Instead of assigning attributes to ECobj, just store them locally:
-            F1 = self.loadCombinationsFE_discr[typeOfState]['F1'][lc][self.T_discr[member['consistOfelements']]]
-            F2 = self.loadCombinationsFE_discr[typeOfState]['F2'][lc][self.T_discr[member['consistOfelements']]]
-            M  = self.loadCombinationsFE_discr[typeOfState]['M'][lc][self.T_discr[member['consistOfelements']]]
-            Ve = self.loadCombinationsFE_discr[typeOfState]['Ve'][lc][self.T_discr[member['consistOfelements']]]
-            Ve_loc = self.loadCombinationsFE_discr[typeOfState]['Ve_loc'][lc][self.T_discr[member['consistOfelements']]]
+            F1, F2, M, Ve, Ve_loc = [values[k] for values in forces]
 
             ECcalcObj.F1 = F1
             ECcalcObj.F2 = F2
@@ -891,41 +726,7 @@ class S():
             ECcalcObj.Ve = Ve
             ECcalcObj.Ve_loc = Ve_loc
 
-            if member['membertype'] == 'Stål':
-                if 'RH' not in memberprop['profile']:
-                    if typeOfState == 'ULS' or typeOfState == 'ALS':
-                        ECcalcObj.forskydning626()
-                        ECcalcObj.boejningsmoment625()
-                        ECcalcObj.trykpaavirkedeElementerMedKonstantTvaersnit631()
-                        #ECobj.kipning632()
-                        ECcalcObj.lokaleTvaergaaendeKraefter617()
-                    elif typeOfState == 'SLS':
-                        ECcalcObj.deformation()
-                    memberList.append(ECcalcObj)
-                else:
-                    if typeOfState == 'ULS' or typeOfState == 'ALS':
-                        ECcalcObj.forskydning626()
-                        ECcalcObj.boejningsmoment625()
-                        ECcalcObj.trykpaavirkedeElementerMedKonstantTvaersnit631()
-                        #ECcalcObj.kipning632()
-                    elif typeOfState == 'SLS':
-                        ECcalcObj.deformation()
-                    memberList.append(ECcalcObj)
-
-            elif member['membertype'] == 'Træ':
-                if typeOfState == 'ULS' or typeOfState == 'ALS':
-                    ECcalcObj.boejning616(1)
-                    ECcalcObj.forskydning617()
-                    ECcalcObj.trykVinkelretPaaFibrene615()
-                    ECcalcObj.trykParalleltMedFibrene614(1)
-                    ECcalcObj.traekParalleltMedFibrene612(1)
-                    ECcalcObj.boejningOgTryk624()
-                    ECcalcObj.boejningOgTraek623()
-                elif typeOfState == 'SLS':
-                    ECcalcObj.deformation(lc)
-                memberList.append(ECcalcObj)
-
-            elif member['membertype'] == 'Murværk':
+            if member['membertype'] == 'Murværk':
                 if typeOfState == 'ULS' or typeOfState == 'ALS':
                     ECcalcObj.getParameterStandardMurvaerk()
                     ECcalcObj.excentricitetRitter()
@@ -934,34 +735,201 @@ class S():
                     ECcalcObj.koncentreretLast()
                 memberList.append(ECcalcObj)
 
-        return memberList
+        UR = {}
+        for k, ECcalcObj in enumerate(memberList):
+            for name, value in ECcalcObj.UR.items():
+                UR.setdefault(name, np.full(len(cols), np.nan))[k] = value
+        return memberList.__getitem__, UR
 
-            
-    def discretizeSectionForces(self, member, sectionForceType, loadcomb):
+    def domainMasks(self, typeOfState, domList, isStandardPresent):
+        # (n_categories, n_comb) boolean, the combinations in which getTopXValuesPerRow_ULS/_SLS pick the governing
+        # combination of every check: per dominant load, in ULS together with the (6.10a) combinations
+        meta = self._loadCombinationArrays[typeOfState]['meta']
+        if isStandardPresent:
+            categories = ['Standard']
+        else:
+            categories = domList
+        dominant = np.array([m['dominant'] for m in meta], dtype=object)
+        equation = np.array([m['equation'] for m in meta], dtype=object)
+        masks = np.zeros((len(categories), len(meta)), bool)
+        for k, cat in enumerate(categories):
+            masks[k] = dominant == cat
+            if typeOfState != 'SLS':
+                masks[k] |= equation == '6.10a'
+        return masks
+
+    def combinationGroups(self, typeOfState, domainMasks):
+        # Column groups in which getTopXValuesPerRow_ULS/_SLS pick the governing combination of every check
+        groups = [list(np.flatnonzero(mask)) for mask in domainMasks if mask.any()]
+        if typeOfState != 'SLS' and not groups and np.size(domainMasks, 1) > 0:
+            groups = [list(range(np.size(domainMasks, 1)))] # highest value overall
+        return groups
+
+    def screeningMeasures(self, i, typeOfState):
+        # Inputs of the Eurocode checks of member i for every combination, each such that a larger value never gives a
+        # smaller UR, and per check the inputs it depends on and those it is strictly increasing in.
+        # None if the checks of the member are not screened
+        member = self.member_discr[i]
+        arrays = self._loadCombinationArrays[typeOfState]
+        T = self.T_discr[member['consistOfelements']]
+        nComb = len(arrays['meta'])
+        if member['membertype'] not in ['Stål', 'Træ']:
+            return None
+        ECbaseObj = self.getECbase(i)
+
+        if typeOfState == 'SLS':
+            if ECbaseObj.deflectionIsLocal:
+                deflection = np.max(np.abs(arrays['Ve_loc'][:,T]).reshape((nComb,-1)), axis=1)
+            else:
+                Ve = arrays['Ve'][:,T]
+                deflection = np.max(np.sqrt(Ve[...,0]**2 + Ve[...,1]**2).reshape((nComb,-1)), axis=1)
+            return deflection[:,None], [([0], [0])]
+
+        F1 = arrays['F1'][:,T].reshape((nComb,-1))
+        F2 = arrays['F2'][:,T]
+        M = np.max(np.abs(arrays['M'][:,T]).reshape((nComb,-1)), axis=1)
+        V = np.max(np.abs(F2).reshape((nComb,-1)), axis=1)
+
+        if member['membertype'] == 'Stål':
+            # Bending is reduced for shear above 0.5*V_plRd, which is only increasing in V up to V_plRd
+            ECcalcObj = EC3calc(ECbaseObj)
+            ECcalcObj.F2 = np.zeros(1)
+            ECcalcObj.forskydning626()
+            if np.max(V) >= ECcalcObj.V_plRd:
+                return None
+            N_c = np.maximum(-np.min(F1, axis=1), 0)
+            Q = np.stack((M, V, N_c), axis=1)
+            return Q, [([0,1], [0]), ([1], [1]), ([2], [2])]
+
+        # Træ, compression and tension as in trykParalleltMedFibrene614 and traekParalleltMedFibrene612
+        F1maxAbs = F1[np.arange(nComb), np.argmax(np.abs(F1), axis=1)]
+        N_c = np.where(F1maxAbs > 0, 0, np.abs(F1maxAbs))
+        N_t = np.where(F1maxAbs <= 0, 0, np.abs(F1maxAbs))
+        R = np.maximum(np.abs(F2[:,0,0]), np.abs(F2[:,-1,-1]))
+        k_mod = EC5calcBatch(ECbaseObj, arrays['meta'], F1, F2, None, None, None).k_mod
+        Q = np.stack((M, V, N_c, N_t, R, -k_mod), axis=1)
+        return Q, [([0,5], [0]), ([1,5], [1]), ([4,5], [4]), ([2,5], [2]), ([3,5], [3]), ([0,2,5], [0,2]), ([0,3,5], [0,3])]
+
+    def screenCombinations(self, typeOfState, groups):
+        # Bound based pre-screening of the combinations of every member before the full Eurocode checks.
+        # Within a group a combination is skipped for a check if a checked combination has all inputs of the check at least
+        # as large and either comes first (argmax keeps the first maximum) or is strictly larger with a margin, so its UR is
+        # bounded by one that is checked, see boundingCombinations. The first combination of each group is always checked.
+        # Returns the (n_members, n_comb) mask of member/combination pairs to check in full
+        nComb = len(self._loadCombinationArrays[typeOfState]['meta'])
+        evaluate = np.zeros((len(self.member_discr), nComb), bool)
+        for i in range(len(self.member_discr)):
+            screening = self.screeningMeasures(i, typeOfState)
+            if screening is None:
+                evaluate[i,:] = True
+                continue
+            Q, checks = screening
+
+            grouped = np.zeros(nComb, bool)
+            for cols in groups:
+                cols = np.asarray(cols)
+                grouped[cols] = True
+                evaluate[i, cols[0]] = True
+                for relevant, strict in checks:
+                    evaluate[i, cols[self.boundingCombinations(Q[np.ix_(cols, relevant)], np.isin(relevant, strict))]] = True
+            evaluate[i, ~grouped] = True
+        return evaluate
+
+    def boundingCombinations(self, q, strict):
+        # Rows of q (n_comb, n_inputs) to check so every other row is bounded by a checked one, strict: mask of the inputs
+        # the check is strictly increasing in. The rows are taken in growing chunks in order of decreasing sum of the
+        # scaled inputs, so a row that bounds another comes before it, and are skipped only when a checked row bounds
+        # them. The search stops when a checked row bounds the largest inputs and the first position of all remaining rows
+        n = len(q)
+        scale = np.max(np.abs(q), axis=0)
+        scale[scale == 0] = 1
+        order = np.lexsort((np.arange(n), -np.sum(q/scale, axis=1)))
+        remainingMax = np.maximum.accumulate(q[order][::-1], axis=0)[::-1]
+        remainingFirst = np.minimum.accumulate(order[::-1])[::-1]
+        checked = np.zeros(0, int)
+        start, chunk = 0, 16
+        while start < n:
+            if np.any(self.bounds(q[checked], checked, remainingMax[start:start+1], remainingFirst[start:start+1], strict)):
+                break
+            candidates = order[start:start+chunk]
+            start, chunk = start + chunk, min(2*chunk, 1024)
+            candidates = candidates[~np.any(self.bounds(q[checked], checked, q[candidates], candidates, strict), axis=0)]
+            # Within the chunk the rows bounded by no other are checked, and the rest unless one of those bounds them
+            bounded = self.bounds(q[candidates], candidates, q[candidates], candidates, strict)
+            top = ~np.any(bounded, axis=0)
+            checked = np.concatenate((checked, candidates[top | ~np.any(bounded[top], axis=0)]))
+        return checked
+
+    def bounds(self, qr, ir, qc, ic, strict):
+        # (len(qr), len(qc)) mask of the rows qr (at positions ir) that bound the rows qc (at positions ic): all inputs at
+        # least as large and either first or larger by a margin in the strict inputs
+        qr, qc = qr[:,None,:], qc[None,:,:]
+        above = qr[...,strict] > qc[...,strict]*(1+1e-9)
+        larger = np.all(above | (qc[...,strict] == 0), axis=2) & np.any(above, axis=2)
+        return np.all(qr >= qc, axis=2) & ((ir[:,None] < ic[None,:]) | larger)
+
+    def fillPrunedCombinations(self, typeOfState, groups):
+        # Skipped pairs get the checks of the first combination in their group, which is always checked, at -inf
+        URarrays = self._URarrays[typeOfState]
+        representative = np.arange(np.size(URarrays['pruned'], 1))
+        for cols in groups[::-1]:
+            representative[cols] = cols[0]
+        for i in np.flatnonzero(URarrays['pruned'].any(axis=1)):
+            cols = np.flatnonzero(URarrays['pruned'][i])
+            URarrays['UR'][i][:, cols] = np.where(np.isnan(URarrays['UR'][i][:, representative[cols]]), np.nan, -np.inf)
+
+    def completePrunedCombinations(self, typeOfState, columns):
+        # columns: the governing combinations of all members. These are reported for every member, so the pairs skipped in
+        # the pre-screening are checked
+        URarrays = self._URarrays[typeOfState]
+        for i in range(len(self.member_discr)):
+            cols = columns[URarrays['pruned'][i, columns]]
+            if len(cols) == 0:
+                continue
+            _, UR = self.getMemberURvalues(i, cols, typeOfState)
+            URarrays['UR'][i][:, cols] = np.nan
+            self.storeURvalues(typeOfState, i, cols, UR)
+            URarrays['pruned'][i, cols] = False
+
+    def setCombinationObjects(self, typeOfState, columns):
+        # loadCombinations: EC objects of every member for the reported combinations columns and for the first combination,
+        # which the report takes the member data from, rechecked in one batch per member. The other combinations get
+        # UnreportedCombination stand-ins so large runs do not hold an EC object per member and combination
+        URarrays = self._URarrays[typeOfState]
+        names = self._loadCombinationArrays[typeOfState]['names']
+        if len(names):
+            columns = np.union1d(columns, [0])
+        standIns = [[UnreportedCombination(URarrays['checks'], values) for values in URarrays['UR'][i].T.tolist()] for i in range(len(self.member_discr))]
+        for j, comb in enumerate(names):
+            self.loadCombinations[typeOfState][comb] = [memberStandIns[j] for memberStandIns in standIns]
+        for i in range(len(self.member_discr)):
+            view, _ = self.getMemberURvalues(i, columns, typeOfState)
+            for k, j in enumerate(columns):
+                self.loadCombinations[typeOfState][names[j]][i] = view(k)
+
+    def discretizeSectionForcesAll(self, member, F1, F2, M, Ve, distLoads):
+        # Section forces F1, F2 and M along the member for all load cases at once.
+        # F1/F2/M are (nlc,nel,2), Ve (nlc,nel,6) and distLoads (nlc,nel,4).
+        # Per sub-segment one spline is fitted to the stacked nodal values of all load cases and force types.
+        # Returns the stations xfine_loc and a dict of (nlc,len(xfine_loc)) arrays.
         X = self.model.X
         T = self.model.T
-        SF = self.loadCombinationsFE[sectionForceType][loadcomb]
-        if sectionForceType == 'M': SF = -SF
+        nlc = np.size(F1,0)
 
         discr = self.model.discr
 
         nrp = self.plotDiscr*discr+1
 
-        X1beam = X[int(T[member['consistOfelements'][0], 0]),:]
-        X2beam = X[int(T[member['consistOfelements'][-1], 1]),:]
+        geometry = self.model.elementGeometry()
+        im = geometry['memberOf'][member['consistOfelements'][0]]
+        X1beam = geometry['X1beam'][im]
+        AuBeam = geometry['AuBeam'][im]
 
-        AAbeam, _ = self.Abeam(X1beam, X2beam)
+        nseg = int(len(member['consistOfelements'])/discr)
+        xfine_loc = np.zeros(nseg*nrp)
+        SFfine = np.zeros((3, nlc, nseg*nrp)) # F1, F2, M
 
-        AuBeam = np.zeros((2,2))
-        for i in range(0,2):
-            for j in range(0,2):
-                AuBeam[i][j] = AAbeam[i][j]
-
-        xfine_loc = np.array([])  # Displacement storage
-        SFfine = np.array([])
-
-        # Fit a cubic spline to the calculated moments
-        for d in range(int(len(member['consistOfelements'])/discr)):
+        for d in range(nseg):
             ele = member['consistOfelements'][d*discr:d*discr+discr]
 
             xy = X[T[ele][:,0]]  # positions along the beam
@@ -973,136 +941,112 @@ class S():
             xy_loc = np.dot(AuBeam, np.transpose(xy))
             x_loc = xy_loc[0,:]
 
-            SFp = SF[ele,:][:,0]
-            SFp = np.append(SFp, SF[ele[-1],1])
+            xfine_loc_temp = np.linspace(x_loc[0], x_loc[-1], nrp)  # positions along the beam for plotting
 
-            SFp[abs(SFp) < 10**-6] = 0
+            if self.model.exactFields:
+                # Evaluate the element fields at the stations instead of fitting a spline to the nodal values
+                k = np.clip(np.searchsorted(x_loc, xfine_loc_temp, side='right')-1, 0, discr-1)
+                xi = np.clip((xfine_loc_temp-x_loc[k])/(x_loc[k+1]-x_loc[k]), 0, 1)
+                N, V, Mx, _, _ = self.model.elementFields(ele[k], xi, F1, F2, M, Ve, distLoads)
+                SFfine_temp = np.stack((N, V, -Mx))
+            else:
+                # Nodal values (3,nlc,discr+1), M with the sign used for plotting and checks
+                SFp = np.stack((F1[:,ele,0], F2[:,ele,0], -M[:,ele,0]))
+                SFp = np.append(SFp, np.stack((F1[:,ele[-1],1], F2[:,ele[-1],1], -M[:,ele[-1],1]))[:,:,None], axis=2)
 
-            splineM = CubicSpline(x_loc, SFp, bc_type='not-a-knot')
+                SFp[abs(SFp) < 10**-6] = 0
 
-            xfine_loc_temp = np.linspace(x_loc[0], x_loc[-1], nrp)  # positions along the beam for plotting
+                spline = CubicSpline(x_loc, SFp, axis=2, bc_type='not-a-knot')
 
-            SFfine_temp = splineM(xfine_loc_temp)
+                SFfine_temp = spline(xfine_loc_temp)
 
-            xfine_loc = np.append(xfine_loc, xfine_loc_temp)
-            SFfine = np.append(SFfine, SFfine_temp)
-            
-        # xfine_loc = np.append(xfine_loc, xfine_loc_temp[-1])
-        # SFfine = np.append(SFfine, SFfine_temp[-1])
+            xfine_loc[d*nrp:(d+1)*nrp] = xfine_loc_temp
+            SFfine[:,:,d*nrp:(d+1)*nrp] = SFfine_temp
 
         SFfine[abs(SFfine) < 10**-6] = 0
 
-        return xfine_loc, SFfine, AuBeam, X1beam 
+        return xfine_loc, {'F1': SFfine[0], 'F2': SFfine[1], 'M': SFfine[2]}, AuBeam, X1beam 
         
-    #Transformation matrix 
-    def Abeam(self, X1,X2):
-        a0 = X2 - X1
-        L = np.sqrt(np.matmul(a0,a0))
-        n = a0/L
-        A = [[n[0], n[1], 0, 0, 0, 0],
-                [-n[1], n[0], 0, 0, 0, 0],
-                [0, 0, 1, 0, 0, 0],
-                [0, 0, 0, n[0], n[1], 0],
-                [0, 0, 0, -n[1], n[0],0],
-                [0, 0, 0, 0, 0, 1]]
-        return A, L
-     
-    def getDeformation(self, member, loadcomb):
+    def getDeformationAll(self, member, F1, F2, M, Ve, distLoads):
+        # Deformations along the member for all load cases at once, F1/F2/M are (nlc,nel,2), Ve (nlc,nel,6), distLoads (nlc,nel,4).
+        # Returns the global displacements and the displacements relative to the chord between the deformed ends, both (nlc,npts,2)
         X = self.model.X
         T = self.model.T
-        Ve = self.loadCombinationsFE['Ve'][loadcomb]
-        defArray_global = np.empty((0, 2))
-        defArray_local = np.empty((0, 2))
-        posDefArray = np.empty((0, 2))
+        nlc = np.size(Ve,0)
 
         discr = self.model.discr
        
-        nrp = self.plotDiscr+1 #SKAL MATCHE discretizeSectionForces --> self.plotDiscr + 1
-
-        for d in range(int(len(member['consistOfelements'])/discr)):
-            for k, el in enumerate(member['consistOfelements'][d*discr:d*discr+discr]):
-                # Create transformation matrix
-                no1 = int(T[el, 0])
-                no2 = int(T[el, 1])
-                X1 = X[no1, :]
-                X2 = X[no2, :]
-                A, L = self.Abeam(X1, X2)
-
-                Au = np.zeros((2,2))
-                for i in range(0,2):
-                    for j in range(0,2):
-                        Au[i][j] = A[i][j]
-
-                # Get global deformations
-                v = Ve[el,:]
-
-                # make local deformations
-                v = np.matmul(A, v)
-
-                Xx = np.zeros((2, nrp))
-                Xs = np.zeros((2, nrp))
-                Us_g = np.zeros((2, nrp))  # Displacement storage
-                Us_l = np.zeros((2, nrp))
-                for i in range(nrp):
-                    s = i / (nrp - 1)
-
-                    N = [[1-s, 0, 0, s, 0, 0],
-                        [0, 1 - 3 * s**2 + 2 * s**3, (s-2*s**2+s**3)*L, 0, 3*s**2-2*s**3, (-s**2+s**3)*L]]
-                    
-                    Us_l[:,i] = np.dot(N,v)
-                    Us_g[:,i] = np.dot(np.transpose(Au),np.dot(N,v)) # Displacement storage
-                    Xx[:,i] = np.transpose(X[int(T[el,0]),:])*(1-s) + np.transpose(X[int(T[el,1]),:])*s # positions along the beam for plotting
-                    Xs[:,i] = Xx[:,i] + Us_g[:,i] #position and displacement
-
-
-                if k == 0:
-                    defArray_global_temp = np.transpose(Us_g)
-                    defArray_local_temp = np.transpose(Us_l)
-                    posDefArray_temp = np.transpose(Xs)
-                else:
-                    defArray_global_temp = np.append(defArray_global_temp, np.transpose(Us_g[:,1:]), axis=0)
-                    defArray_local_temp = np.append(defArray_local_temp, np.transpose(Us_l[:,1:]), axis=0)
-                    posDefArray_temp = np.append(posDefArray_temp, np.transpose(Xs[:,1:]), axis=0)
+        nrp = self.plotDiscr+1 #SKAL MATCHE discretizeSectionForcesAll --> self.plotDiscr + 1
+
+        els = np.asarray(member['consistOfelements'], int)
+        Au = self.model.elementGeometry()['A'][els][:,0:2,0:2]
 
-            defArray_global = np.append(defArray_global, defArray_global_temp, axis=0)
-            defArray_local = np.append(defArray_local, defArray_local_temp, axis=0)
-            posDefArray = np.append(posDefArray, posDefArray_temp, axis=0)
+        # Local displacements (nlc,nel,nrp,2)
+        s = np.linspace(0, 1, nrp)
+        if self.model.exactFields:
+            # Hermite interpolation plus the deflection from the line load within the element
+            _, _, _, u, w = self.model.elementFields(np.repeat(els, nrp), np.tile(s, len(els)), F1, F2, M, Ve, distLoads)
+            Us_l = np.stack((u, w), -1).reshape((nlc, len(els), nrp, 2))
+        else:
+            Us_l = self.model.localDeformations(els, Ve, nrp)
+
+        Us_g = np.einsum('eki,lesk->lesi', Au, Us_l)
+        Xx = X[T[els,0]][:,None,:]*(1-s)[None,:,None] + X[T[els,1]][:,None,:]*s[None,:,None] # positions along the beam for plotting
+        Xs = Xx + Us_g #position and displacement
 
-        end1 = posDefArray[0,:]
-        end2 = posDefArray[-1,:]
+        # Per sub-segment the first element gives all stations, the following elements all but their first
+        keep = np.ones((len(els), nrp), bool)
+        keep[np.arange(len(els)) % discr != 0, 0] = False
 
-        A_end2end, L_end2end = self.Abeam(end1, end2)
+        defArray_global = Us_g[:,keep]
+        posDefArray = Xs[:,keep]
 
-        Au = np.zeros((2,2))
-        for i in range(0,2):
-            for j in range(0,2):
-                Au[i][j] = A_end2end[i][j]
+        # Rotate into the direction of the chord between the deformed ends
+        chord = posDefArray[:,-1,:] - posDefArray[:,0,:]
+        L_end2end = np.sqrt(np.sum(chord**2, 1))
+        c = chord[:,0]/L_end2end
+        sn = chord[:,1]/L_end2end
+        Au_end2end = np.stack((np.stack((c, sn), -1), np.stack((-sn, c), -1)), 1)
 
-        defArray_end2end_local = np.transpose(np.matmul(Au, np.transpose(posDefArray)))
-        defArray_end2end_local = np.array([
-            defArray_end2end_local[:,0] - defArray_end2end_local[0,0],
-            defArray_end2end_local[:,1] - defArray_end2end_local[0,1]
-        ]).T
+        defArray_end2end_local = np.einsum('lij,lpj->lpi', Au_end2end, posDefArray)
+        defArray_end2end_local = defArray_end2end_local - defArray_end2end_local[:,0:1,:]
 
         return defArray_global, defArray_end2end_local
     
-    def generate_load_combinations(self, loads, indicesDeadload):
+    def generate_load_combinations(self, loads, indicesDeadload, contributions=None):
+        # On/off states of all loads with the dead loads always on.
+        # contributions: optional (n_loads, n_outputs) value of every output for each load alone. With more than
+        # maxEnumeratedLoads variable loads it is used to generate the sign based states instead of all 2^n.
         n = len(loads)
-        combinations = list(itertools.product([0, 1], repeat=n))
-        matrix = np.array(combinations, float)
+        variable = np.setdiff1d(np.arange(n), np.asarray(indicesDeadload, int))
+        if contributions is None or len(variable) <= self.maxEnumeratedLoads:
+            combinations = list(itertools.product([0, 1], repeat=n))
+            matrix = np.array(combinations, float)
+        else:
+            rows = []
+            for level in self.loadDurationLevels(loads, variable):
+                patterns = self.loadSignPatterns(contributions, level) if len(level) > 0 else np.zeros((1, 0))
+                rows.append(np.zeros((np.size(patterns,0), n), float))
+                rows[-1][:, level] = patterns
+            matrix = np.concatenate(rows, axis=0)
         # Treat any non-empty list/array of indices as True
         if np.size(indicesDeadload) > 0:  # was: if indicesDeadload:
             matrix[:, indicesDeadload] = 1.0
         matrix = matrix[~(matrix == 0).all(axis=1)]
         return np.unique(matrix, axis=0) #remove repetitions
     
-    def generate_load_combinations_SLS_DKNA(self, loads, loadtypesIndices):
+    def generate_load_combinations_SLS_DKNA(self, loads, loadtypesIndices, contributions=None):
         # Initialize an empty matrix to stack all load type combinations
         final_matrix = np.empty((0, len(loads)), dtype=float)
         for loadtype in loadtypesIndices:
             if loadtype == 'Egenlast':
                 matrix = np.zeros((1, len(loads)), dtype=float)
                 matrix[:, loadtypesIndices[loadtype]] = 1
+            elif contributions is not None and len(loadtypesIndices[loadtype]) > self.maxEnumeratedLoads:
+                indices = loadtypesIndices[loadtype]
+                patterns = self.loadSignPatterns(contributions, indices)
+                matrix = np.zeros((np.size(patterns,0), len(loads)), dtype=float)
+                matrix[:, indices] = patterns
             else:
                 indices = loadtypesIndices[loadtype]
                 num_combinations = 2 ** len(indices)
@@ -1123,6 +1067,97 @@ class S():
     
     
     
+    def loadDurationLevels(self, loads, indices):
+        # The loads in indices allowed in each load duration class of EC5.getLoadDuration: all of them, then without
+        # wind (Short term), without snow (Medium term) and without live loads (Permanent). Switching a load on can
+        # shorten the class and raise k_mod, so in timber the governing combination may leave out loads that increase
+        # the section forces. The sign based states are generated per level to include it
+        levels = [np.asarray(indices, int)]
+        excluded = []
+        for loadtype in ['Vindlast', 'Snelast', 'Nyttelast']:
+            excluded.append(loadtype)
+            levels.append(np.array([i for i in indices if loads[i] not in excluded], int))
+        return levels
+
+    def loadSignPatterns(self, contributions, indices):
+        # On/off states of the loads in indices that can govern some output or check.
+        # Combination factors are never negative, so the max of a linear output is found with exactly the loads that
+        # increase it switched on, and the min with those that decrease it. Checks of two outputs together get the
+        # states of interactionPatterns. The number of distinct states is bounded by the number of outputs and pairs of
+        # them, not 2^len(indices).
+        P = np.transpose(contributions[indices,:])
+        tol = 1e-9*np.max(np.abs(P), axis=1, keepdims=True)
+        patterns = np.concatenate((P > tol, P < -tol, self.interactionPatterns(P)), axis=0)
+        return np.unique(patterns, axis=0).astype(float)
+
+    def interactionOutputGroups(self, contributions, nPoints):
+        # Columns of contributions that enter one check together, as (first, second, cross) per member. With cross every
+        # column of first is paired with every column of second, as the checks take the largest value of each along the
+        # member: axial force and moment in timber (6.2.3/6.2.4), shear force and moment in steel. Otherwise the columns
+        # are paired in order: the global deflection of a station
+        groups = []
+        for i, m in enumerate(self.member_discr):
+            stations = np.unique(self.T_discr[m['consistOfelements']])
+            if m['membertype'] == 'Træ':
+                groups.append((0*nPoints + stations, 2*nPoints + stations, True))
+            elif m['membertype'] == 'Stål':
+                # The bending resistance is only reduced for shear above 0.5*V_plRd (6.2.5), the stations that no
+                # combination takes there are left out. No load factor exceeds gamma_Q1*KFi = 1.5*KFi
+                ECcalcObj = EC3calc(self.getECbase(i))
+                ECcalcObj.F2 = np.zeros(1)
+                ECcalcObj.forskydning626()
+                shear = 1*nPoints + stations
+                reduced = 1.5*self.KFi*np.sum(np.abs(contributions[:,shear]), axis=0) > 0.5*ECcalcObj.V_plRd
+                groups.append((shear[reduced], 2*nPoints + stations, True))
+            if not m['memberprop'].get('deflectionIsLocal', True):
+                groups.append((3*nPoints + stations, 4*nPoints + stations, False))
+        return groups
+
+    def interactionPatterns(self, P):
+        # On/off states of the loads for the checks of two outputs together, see interactionOutputGroups.
+        # P: (n_outputs, n) value of every output for each load. The sums of the loads in the plane of two outputs span a
+        # polygon, and a check with convex lower level sets in the two (6.2.3/6.2.4, the bending resistance reduced for
+        # shear below V_plRd and the deflection) is largest at one of its corners. The corner farthest in a direction has
+        # the loads with a positive component along it switched on, so the at most 2n corners are found by turning the
+        # direction past each load. Scaling an output does not move the corners, so equal outputs up to scale are only
+        # paired once
+        n = np.size(P,1)
+        states = [np.zeros((0, n), bool)]
+        for first, second, cross in self.interactionOutputs:
+            tol = 1e-9*np.max(np.abs(P[np.concatenate((first, second))]), initial=0)
+            if cross:
+                X, Y = self.uniqueDirections(P[first], tol), self.uniqueDirections(P[second], tol)
+                X, Y = np.repeat(X, len(Y), axis=0), np.tile(Y, (len(X), 1))
+            else:
+                XY = np.unique(np.concatenate((self.normalizeRows(P[first], tol), self.normalizeRows(P[second], tol)), axis=1), axis=0)
+                X, Y = XY[:,:n], XY[:,n:]
+            chunk = max(1, 2**22//(2*n*n + 1))
+            for start in range(0, len(X), chunk):
+                corners = self.polygonCorners(X[start:start+chunk], Y[start:start+chunk])
+                states.append(np.unique(corners.reshape((-1, n)), axis=0))
+        return np.unique(np.concatenate(states, axis=0), axis=0)
+
+    def normalizeRows(self, P, tol):
+        # Rows with the values up to tol set to 0, scaled to the largest absolute value 1 with the first such entry
+        # positive and rounded to compare them
+        P = np.where(np.abs(P) > tol, P, 0)
+        largest = P[np.arange(len(P)), np.argmax(np.abs(P), axis=1)]
+        return np.round(P/np.where(largest == 0, 1, largest)[:,None], 9)
+
+    def uniqueDirections(self, P, tol):
+        P = np.unique(self.normalizeRows(P, tol), axis=0)
+        return P[np.any(P != 0, axis=1)]
+
+    def polygonCorners(self, X, Y):
+        # X, Y: (n_pairs, n). On/off states of the corners of the polygon of the sums of the loads (X, Y), (n_pairs, 2n, n).
+        # Which loads are on changes where the direction is perpendicular to a load, the corners are found halfway between
+        angle = np.arctan2(Y, X)
+        size = np.hypot(X, Y)
+        active = size > 1e-9*np.max(size, axis=1, keepdims=True)
+        critical = np.sort(np.mod(np.concatenate((angle + np.pi/2, angle - np.pi/2), axis=1), 2*np.pi), axis=1)
+        directions = (critical + np.concatenate((critical[:,1:], critical[:,:1] + 2*np.pi), axis=1))/2
+        return (np.cos(directions[:,:,None] - angle[:,None,:]) > 0) & active[:,None,:]
+
     def groupLoads(self, loadIndices, loadcombMat):
         row_mask = np.any(loadcombMat[:, loadIndices] == 1, axis=1)
         row_ids = np.where(row_mask)[0]
@@ -1132,142 +1167,63 @@ class S():
         return np.unique(loadcombMat, axis=0) #remove repetitions
     
 
-    def getTopXValuesPerRow_ULS(self, UR_loadcomb_mat, x, LoadCombnames, domList, isStandardPresent):
+    def getTopXValuesPerRow_ULS(self, UR_loadcomb_mat, x, LoadCombnames, domainMasks):
         """
         Select columns ensuring:
-        - Minimum one load combination per domain in domList (if present in names)
+        - Minimum one load combination per domain (row of domainMasks with any column)
         - Remaining highest values per row until at least x total selections per row
           (x is promoted to at least number of domains with data)
         Union of all selected column indices across rows is returned (like previous impl).
+        domainMasks: (n_domains, n_cols) boolean, see domainMasks
         """
         import numpy as np
         n_rows, n_cols = UR_loadcomb_mat.shape
         if n_cols == 0:
             return np.zeros((n_rows, 0)), [], []
 
-        if isStandardPresent:
-            categories = ['Uden lastfaktor / lastkombination']
-        else:
-            categories = domList
-        
-        # Pre-map domain -> column indices.
-        dom_to_cols = {dom: [j for j, name in enumerate(LoadCombnames) if dom in name or '(6.10a)' in name] for dom in categories}
-
         # Domains that actually have columns
-        active_domains = [d for d, cols in dom_to_cols.items() if len(cols) > 0]
-
-        effective_x = max(x, len(active_domains))  # ensure at least one per active domain
-
-        per_row_selected = []  # list of lists of selected column indices per row
-        for i in range(n_rows):
-            row = UR_loadcomb_mat[i, :]
-            selected = []
-
-            # 1. Pick best (max) column per active domain
-            for dom in active_domains:
-                cols = dom_to_cols[dom]
-                if cols:
-                    vals = row[cols]
-                    best_local = cols[int(np.argmax(vals))]
-                    selected.append(best_local)
-
-            # 2. Add remaining top values until reaching effective_x
-            if len(selected) < effective_x:
-                # Remaining candidates excluding already selected
-                remaining_cols = [c for c in range(n_cols) if c not in selected]
-                if remaining_cols:
-                    remaining_vals = row[remaining_cols]
-                    order = np.argsort(remaining_vals)[::-1]
-                    for idx in order:
-                        selected.append(remaining_cols[idx])
-                        if len(selected) >= effective_x:
-                            break
-
-            # 3. (Optional) If domains alone exceed effective_x we keep them all (requirement: min one per dom)
-            per_row_selected.append(sorted(set(selected)))
+        active = [np.flatnonzero(mask) for mask in domainMasks if mask.any()]
+        effective_x = max(x, len(active))  # ensure at least one per active domain
 
-        # Union indices across all rows
-        union_indices = sorted(set(j for lst in per_row_selected for j in lst))
+        # 1. Pick best (max) column per active domain, (n_active, n_rows)
+        selected = np.array([cols[np.argmax(UR_loadcomb_mat[:, cols], axis=1)] for cols in active], int).reshape((len(active), n_rows))
 
-        # Build reduced value matrix
-        top_values = np.zeros((n_rows, len(union_indices)), dtype=float)
-        for i in range(n_rows):
-            row = UR_loadcomb_mat[i, :]
-            for j, col in enumerate(union_indices):
-                top_values[i, j] = row[col]
+        # 2. Add remaining top values until reaching effective_x (only when x exceeds the number of domains)
+        if len(active) < effective_x and n_rows > 0:
+            extra = []
+            for i in range(n_rows):
+                remaining_cols = np.setdiff1d(np.arange(n_cols), selected[:, i])
+                order = np.argsort(UR_loadcomb_mat[i, remaining_cols])[::-1]
+                extra.append(remaining_cols[order[:effective_x - len(active)]])
+            selected = np.concatenate((selected.ravel(), np.concatenate(extra)))
 
+        # Union indices across all rows
+        union_indices = np.unique(selected).tolist()
+
+        top_values = np.array(UR_loadcomb_mat[:, union_indices], dtype=float)
         top_names = [LoadCombnames[i] for i in union_indices]
         top_indices = union_indices
         return top_values, top_names, top_indices
     
 
-    def getTopXValuesPerRow_SLS(self, UR_loadcomb_mat, domList, LoadCombnames_SLS, isStandardPresent):
+    def getTopXValuesPerRow_SLS(self, UR_loadcomb_mat, LoadCombnames_SLS, domainMasks):
         import numpy as np
         n_rows, _ = UR_loadcomb_mat.shape
-        if isStandardPresent:
-            categories = ['Uden lastfaktor / lastkombination']
-        else:
-            categories = domList
-        # Pre-calculate candidate column indices per category
-        cat_to_cols = {cat: [j for j, name in enumerate(LoadCombnames_SLS) if cat in name] for cat in categories}
-        if all(len(cols) == 0 for cols in cat_to_cols.values()):
+        active = [np.flatnonzero(mask) for mask in domainMasks if mask.any()]
+        if not active:
             return np.zeros((n_rows, 0)), [], []
         
-        # For each row, choose the candidate column (if exists) with the max value per category
-        row_selected = []  # list of dict: {category: candidate_index}
-        for i in range(n_rows):
-            sel = {}
-            for cat in categories:
-                cols = cat_to_cols[cat]
-                if cols:
-                    values = UR_loadcomb_mat[i, cols]
-                    if values.size > 0:
-                        max_pos = np.argmax(values)
-                        sel[cat] = cols[max_pos]
-            row_selected.append(sel)
-        
-        # Union candidate indices from all rows (preserving category order)
-        union_indices = []
-        for sel in row_selected:
-            for cat in categories:
-                if cat in sel and sel[cat] not in union_indices:
-                    union_indices.append(sel[cat])
-        union_indices.sort()
+        # For each row, the candidate column with the max value per category, (n_active, n_rows)
+        selected = np.array([cols[np.argmax(UR_loadcomb_mat[:, cols], axis=1)] for cols in active], int)
+        union_indices = np.unique(selected)
         
-        # Create the top_values matrix: each row gets value if its candidate matches union index, else 0.
+        # Each row gets its value in the columns selected for it by some category, else 0
+        rows = np.arange(n_rows)
         top_values = np.zeros((n_rows, len(union_indices)), dtype=float)
-        for i in range(n_rows):
-            for j, idx in enumerate(union_indices):
-                found = False
-                for cat in categories:
-                    if cat in row_selected[i] and row_selected[i][cat] == idx:
-                        top_values[i, j] = UR_loadcomb_mat[i, idx]
-                        found = True
-                        break
-                if not found:
-                    top_values[i, j] = 0.0
+        for cols in selected:
+            top_values[rows, np.searchsorted(union_indices, cols)] = UR_loadcomb_mat[rows, cols]
         
+        union_indices = union_indices.tolist()
         top_names = [LoadCombnames_SLS[i] for i in union_indices]
         top_indices = union_indices
         return top_values, top_names, top_indices
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
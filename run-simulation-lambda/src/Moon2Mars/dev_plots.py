@@ -107,9 +107,8 @@ def DEFplot(model,ax,s):
         no2 = int(T[el,1])
         X1 = X[no1,:]
         X2 = X[no2,:]
-        Ae = model.Abeam(X1,X2)
-        A = Ae[0]
-        L = Ae[1]
+        A = model.elementGeometry()['A'][el]
+        L = model.elementGeometry()['L'][el]
         Au = np.zeros((2,2))
         for i in range(0,2):
             for j in range(0,2):
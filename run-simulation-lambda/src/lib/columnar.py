@@ -0,0 +1,114 @@
+"""Binary columnar container for simulation output.
+
+Layout: MAGIC | zlib(manifest length (uint32, little endian) | manifest (UTF-8 JSON) | data block)
+
+The manifest holds the object tree with every numeric array of at least MIN_BLOCK_SIZE values replaced by
+{'__array__': k}, and per array k its dtype, shape and offset in the data block. A dict whose values are numeric
+arrays of one shape and dtype, like the per combination results of a limit state in S.loadCombinationsFE_discr,
+is stored as one stacked array {'__columns__': k, 'keys': [...]}. NaN and Inf are kept in the arrays of the data
+block. In the manifest they are written as None, as in the JSONB output (e.g. S.coor2 of a point load is
+[None, None]), and counted in stats like serialize_instance.
+An array or dict referenced several times is stored once.
+
+Objects are written like serialize_instance: their public, non-callable attributes.
+generate-report-lambda/src/columnar.py mirrors unpack_columnar.
+"""
+import json
+import math
+import struct
+import zlib
+
+import numpy as np
+
+MAGIC = b'M2MC\x01'
+MIN_BLOCK_SIZE = 16
+ALIGNMENT = 8
+
+
+def _is_block(value):
+    return isinstance(value, np.ndarray) and value.dtype.kind in 'biuf'
+
+
+def pack_columnar(obj, stats=None, level=6):
+    """Encode obj (dicts, lists, objects, numpy arrays and scalars) to the binary columnar format.
+    stats: optional dict with 'nan', 'inf' and '-inf' counters of the values written as None."""
+    arrays = []
+    stored = {} # id of an array or column dict -> (index in arrays, the object, kept alive so the id stays unique)
+
+    def add(value, array):
+        # Objects referenced more than once, like the forces in both the S object and the result, are stored once
+        if id(value) not in stored:
+            arrays.append(np.ascontiguousarray(array))
+            stored[id(value)] = (len(arrays) - 1, value)
+        return stored[id(value)][0]
+
+    def walk(value):
+        if isinstance(value, np.ndarray):
+            if _is_block(value) and value.size >= MIN_BLOCK_SIZE:
+                return {'__array__': add(value, value)}
+            return walk(value.tolist())
+        if isinstance(value, np.generic):
+            return walk(value.item())
+        if isinstance(value, float) and not math.isfinite(value):
+            if stats is not None:
+                stats['nan' if math.isnan(value) else 'inf' if value > 0 else '-inf'] += 1
+            return None
+        if isinstance(value, dict):
+            values = list(value.values())
+            if len(values) > 1 and all(_is_block(v) and v.shape == values[0].shape and v.dtype == values[0].dtype for v in values):
+                return {'__columns__': add(value, np.stack(values)), 'keys': list(value)}
+            return {k: walk(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [walk(v) for v in value]
+        if isinstance(value, (str, int, float, bool)) or value is None:
+            return value
+        if hasattr(value, '__dict__'):
+            return {k: walk(v) for k, v in value.__dict__.items() if not callable(v) and not k.startswith('_')}
+        if hasattr(value, '__slots__'):
+            return {slot: walk(getattr(value, slot)) for slot in value.__slots__
+                    if not callable(getattr(value, slot)) and not slot.startswith('_')}
+        return str(value)
+
+    tree = walk(obj)
+
+    entries = []
+    offset = 0
+    for array in arrays:
+        offset += -offset % ALIGNMENT
+        entries.append({'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset})
+        offset += array.nbytes
+    data = bytearray(offset)
+    for entry, array in zip(entries, arrays):
+        data[entry['offset']:entry['offset'] + array.nbytes] = array.tobytes()
+
+    manifest = json.dumps({'arrays': entries, 'tree': tree}, default=str).encode('utf-8')
+    return MAGIC + zlib.compress(struct.pack('<I', len(manifest)) + manifest + bytes(data), level)
+
+
+def unpack_columnar(blob):
+    """Decode pack_columnar output back to dicts, lists and (writable) numpy arrays."""
+    blob = bytes(blob)
+    if not blob.startswith(MAGIC):
+        raise ValueError('Not a columnar simulation blob')
+    raw = bytearray(zlib.decompress(blob[len(MAGIC):]))
+    n = struct.unpack_from('<I', raw, 0)[0]
+    manifest = json.loads(raw[4:4 + n].decode('utf-8'))
+    data = memoryview(raw)[4 + n:]
+
+    arrays = []
+    for entry in manifest['arrays']:
+        count = int(np.prod(entry['shape'], dtype=np.int64))
+        arrays.append(np.frombuffer(data, dtype=entry['dtype'], count=count, offset=entry['offset']).reshape(entry['shape']))
+
+    def walk(value):
+        if isinstance(value, dict):
+            if '__array__' in value:
+                return arrays[value['__array__']]
+            if '__columns__' in value:
+                return dict(zip(value['keys'], arrays[value['__columns__']]))
+            return {k: walk(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [walk(v) for v in value]
+        return value
+
+    return walk(manifest['tree'])
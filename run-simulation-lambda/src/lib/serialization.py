@@ -1,9 +1,36 @@
 import numpy as np
+from math import isfinite
 
-def convert_numpy(obj):
+def sanitize_float(value, stats):
+    # NaN/Inf -> None (JSONB rejects them), counted in stats
+    if isfinite(value):
+        return value
+    stats['nan' if value != value else ('inf' if value > 0 else '-inf')] += 1
+    return None
+
+def sanitize_array(array, stats):
+    # Nested lists of a numpy array with NaN/Inf as None, masked and counted in numpy without walking the values in Python
+    if array.dtype.kind == 'f':
+        nonfinite = ~np.isfinite(array)
+        if not nonfinite.any():
+            return array.tolist()
+        stats['nan'] += int(np.count_nonzero(np.isnan(array)))
+        stats['inf'] += int(np.count_nonzero(array == np.inf))
+        stats['-inf'] += int(np.count_nonzero(array == -np.inf))
+        masked = array.astype(object)
+        masked[nonfinite] = None
+        return masked.tolist()
+    if array.dtype.kind == 'O':
+        return convert_numpy(array.tolist(), stats)
+    return array.tolist()
+
+def convert_numpy(obj, stats=None):
+    # With stats NaN/Inf become None and are counted in stats ({'nan': 0, 'inf': 0, '-inf': 0})
     try:
-        if isinstance(obj, np.ndarray):
-            return obj.tolist()
+        if stats is not None and isinstance(obj, (float, np.floating)):
+            return sanitize_float(float(obj), stats)
+        elif isinstance(obj, np.ndarray):
+            return sanitize_array(obj, stats) if stats is not None else obj.tolist()
         elif isinstance(obj, (np.int_, np.intc, np.intp, np.int8, np.int16, np.int32, np.int64, 
                             np.uint8, np.uint16, np.uint32, np.uint64)):
             return int(obj)
@@ -18,36 +45,37 @@ def convert_numpy(obj):
         elif isinstance(obj, np.dtype):
             return str(obj)
         elif isinstance(obj, dict):
-            return {k: convert_numpy(v) for k, v in obj.items()}
+            return {k: convert_numpy(v, stats) for k, v in obj.items()}
         elif isinstance(obj, list):
-            return [convert_numpy(v) for v in obj]
+            return [convert_numpy(v, stats) for v in obj]
         elif isinstance(obj, tuple):
-            return tuple(convert_numpy(v) for v in obj)
+            return tuple(convert_numpy(v, stats) for v in obj)
         else:
             return obj
     except TypeError:
         return "Not serializable"
 
-def serialize_instance(obj):
-    """Recursively serializes objects to JSON, including nested instances and handling numpy types."""
+def serialize_instance(obj, stats=None):
+    """Recursively serializes objects to JSON, including nested instances and handling numpy types.
+    With stats NaN/Inf are replaced by None and counted in stats, see convert_numpy."""
     try:
         if isinstance(obj, dict):
-            return {k: serialize_instance(v) for k, v in obj.items()}
+            return {k: serialize_instance(v, stats) for k, v in obj.items()}
         elif isinstance(obj, list):
-            return [serialize_instance(v) for v in obj]
+            return [serialize_instance(v, stats) for v in obj]
         elif isinstance(obj, tuple):
-            return tuple(serialize_instance(v) for v in obj)
+            return tuple(serialize_instance(v, stats) for v in obj)
         elif hasattr(obj, "__dict__"):
             d = {}
             for key, value in obj.__dict__.items():
                 if not callable(value) and not key.startswith('_'):
-                    d[key] = serialize_instance(value)
+                    d[key] = serialize_instance(value, stats)
             return d
         elif hasattr(obj, "__slots__"):
-            return {slot: serialize_instance(getattr(obj, slot)) for slot in obj.__slots__
+            return {slot: serialize_instance(getattr(obj, slot), stats) for slot in obj.__slots__
                     if not callable(getattr(obj, slot)) and not slot.startswith('_')}
         else:
-            return convert_numpy(obj)
+            return convert_numpy(obj, stats)
     except TypeError:
         return "Not serializable"
 
@@ -163,6 +163,7 @@ def handler(event, context):
 
     # Build and run model
     from lib.serialization import serialize_instance, default_handler
+    from lib.columnar import pack_columnar
     from Moon2Mars.S import S
     from Moon2Mars.Frame_FEM import Model
     from Moon2Mars.Project import Project
@@ -246,53 +247,48 @@ def handler(event, context):
         members = { b['id']: b for b in s.member_discr }
         FEMModel = { 'members': members, 'X': s.X_discr, 'T': s.T_discr, 'R0_coor': s.R0_coordinates, 'R0_types': s.R0_type }
 
-        # Serialize core s (object 's') and lightweight results separately
-        s_payload = serialize_instance({'s': s})  # returns JSON-serialisable dict
+        # Postgres JSONB rejects NaN/Infinity tokens (standard JSON) -> serialized as null, counted in stats
+        stats = {'nan': 0, 'inf': 0, '-inf': 0}
+
+        # With the result_blob column the full output (object 's' and results) is stored in the binary columnar format
+        # and the JSONB result is a summary holding the forces of the reported combinations only. Without it both are JSONB
+        columnar = 'result_blob' in simulations_table.c
+        if columnar:
+            result_blob = pack_columnar({
+                's': s,
+                'result': {'FEMModel': FEMModel, 'forces': s.loadCombinationsFE_discr, 'UR': s.sectionResults}
+            }, stats)
+            reported = {state: s.sectionResults[0]['LoadCombnames_' + state] if s.sectionResults else [] for state in s.loadCombinationsFE_discr}
+            forces = {state: {key: {lc: values[lc] for lc in reported[state]} for key, values in s.loadCombinationsFE_discr[state].items()}
+                      for state in s.loadCombinationsFE_discr}
+            s_payload = None
+        else:
+            forces = s.loadCombinationsFE_discr
+            s_payload = serialize_instance({'s': s}, stats)  # returns JSON-serialisable dict
         result_payload = serialize_instance({
             'FEMModel': FEMModel,
-            'forces': s.loadCombinationsFE_discr,
+            'forces': forces,
             'UR': s.sectionResults
-        })
+        }, stats)
 
-        # Postgres JSONB rejects NaN/Infinity tokens (standard JSON) -> replace with null
-        from math import isnan, isinf
-        stats = {'nan': 0, 'inf': 0, '-inf': 0}
-        def _sanitize(v):
-            if isinstance(v, float):
-                if isnan(v):
-                    stats['nan'] += 1
-                    return None
-                if isinf(v):
-                    if v > 0:
-                        stats['inf'] += 1
-                    else:
-                        stats['-inf'] += 1
-                    return None
-                return v
-            if isinstance(v, dict):
-                return {k: _sanitize(x) for k, x in v.items()}
-            if isinstance(v, list):
-                return [_sanitize(x) for x in v]
-            if isinstance(v, tuple):
-                return [_sanitize(x) for x in v]
-            return v
-
-        s_payload = _sanitize(s_payload)
-        result_payload = _sanitize(result_payload)
         if any(stats.values()):
             print(f"[sanitize] replaced NaN/Inf values: {stats}")
         # Attach metadata for forward compatibility/version checks
         meta = {
-            'schema_version': 1,
+            'schema_version': 2 if columnar else 1,
             'python_version': platform.python_version(),
             'numpy_version': np.__version__,
             # Future: add moon2mars_hash, app_version, etc.
         }
+        values = dict(status='completed', end_time=func.now(), meta=meta, result=result_payload, encoded_s=s_payload)
+        if columnar:
+            values['result_blob'] = result_blob
+            meta['result_blob_bytes'] = len(result_blob)
 
         session.execute(
             update(simulations_table)
             .where(simulations_table.c.id == simulation_id)
-            .values(status='completed', end_time=func.now(), meta=meta, result=result_payload, encoded_s=s_payload)
+            .values(**values)
         )
         session.commit()
         return {'statusCode': 200, 'body': json.dumps({'message': 'Simulation completed successfully', 'simulation_id': simulation_id})}
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Equivalence tests for the simulation engine: results must match the stored results of the original implementation,
+and the fast paths (solver backends, static condensation, exact fields, sign based and envelope load combinations,
+pruning, columnar output) the results of the plain evaluation.
+
+Run with: python -m pytest run-simulation-lambda/test_equivalence.py
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from Moon2Mars.S import S, UnreportedCombination
+from Moon2Mars.Frame_FEM import Model
+from Moon2Mars.Project import Project
+from lib.columnar import pack_columnar, unpack_columnar
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline_portal_frame.json')
+
+
+def steel(name, profile='IPE300'):
+    return {'name': name, 'type': 'Steel', 'steelProfile': profile, 'steelStrength': 'S235',
+            'deflectionRequirement': 400, 'deflectionIsLocal': True, 'selfWeightEnabled': True}
+
+
+def wood(name):
+    return {'name': name, 'type': 'Wood', 'woodType': 'C24', 'woodSize': {'width': 45, 'height': 145},
+            'deflectionIsLocal': True, 'deflectionRequirementFinished': 400, 'deflectionRequirementInstantSnow': 300,
+            'deflectionRequirementInstantWind': 300, 'deflectionRequirementInstantLive': 300, 'selfWeightEnabled': True}
+
+
+def continuous_beam(nspan, loads_per_span, memberprop, span=4.0):
+    # Continuous beam on pinned/roller supports, line loads cycling through live, snow, dead and wind
+    nodes, members, supports, distributedLoads = {}, {}, {}, {}
+    types = ['Live', 'Snow', 'Dead', 'Wind']
+    for i in range(nspan+1):
+        nodes[f'n{i}'] = {'resolved': {'x': i*span, 'y': 0.0}, 'assembly': 'Fixed'}
+        supports[f's{i}'] = {'resolved': {'x': i*span, 'y': 0.0}, 'type': 'Pinned' if i == 0 else 'Roller', 'angle': 0}
+    for i in range(nspan):
+        dependants = [f's{i}', f's{i+1}']
+        for j in range(loads_per_span):
+            a = i*span + span*j/(loads_per_span+1)
+            distributedLoads[f'dl{i}_{j}'] = {'resolved': {'point1': {'x': a, 'y': 0.0}, 'point2': {'x': a+span/2, 'y': 0.0}},
+                                              'type': types[(i+j) % 4], 'magnitude1': 1.0+j, 'magnitude2': 2.0}
+            dependants.append(f'dl{i}_{j}')
+        members[f'm{i}'] = {'node1': {'id': f'n{i}'}, 'node2': {'id': f'n{i+1}'}, 'memberprop': memberprop(f'B{i}'), 'dependants': dependants}
+    return {'nodes': nodes, 'members': members, 'supports': supports, 'pointLoads': {},
+            'distributedLoads': distributedLoads, 'momentLoads': {}}
+
+
+def point_loaded_beam(memberprop, loads, span=4.0):
+    # Simply supported beam with live point loads, loads: (x, [Fx, Fy]) per load
+    entity_set = continuous_beam(1, 0, memberprop, span)
+    for j, (x, force) in enumerate(loads):
+        entity_set['pointLoads'][f'pl{j}'] = {'resolved': {'x': x, 'y': 0.0}, 'type': 'Live', 'force': force}
+        entity_set['members']['m0']['dependants'].append(f'pl{j}')
+    return entity_set
+
+
+def portal_frame():
+    # Steel columns and beam with a hinge, timber column and rafter, point, line and moment loads of all types
+    coordinates = {'n1': (0, 0), 'n2': (0, 3), 'n3': (6, 3), 'n4': (6, 0), 'n5': (9, 4.5), 'n6': (3, 3)}
+    nodes = {k: {'resolved': {'x': x, 'y': y}, 'assembly': 'Hinge' if k == 'n3' else 'Fixed'} for k, (x, y) in coordinates.items()}
+    members = {
+        'm1': {'node1': {'id': 'n1'}, 'node2': {'id': 'n2'}, 'memberprop': steel('C1', 'HE200B'), 'dependants': ['s1', 'dl3']},
+        'm2': {'node1': {'id': 'n2'}, 'node2': {'id': 'n3'}, 'memberprop': steel('B1'), 'dependants': ['pl1', 'dl1', 'ml1', 'n6', 'pl2']},
+        'm3': {'node1': {'id': 'n3'}, 'node2': {'id': 'n4'}, 'memberprop': wood('C2'), 'dependants': ['s2']},
+        'm4': {'node1': {'id': 'n3'}, 'node2': {'id': 'n5'}, 'memberprop': wood('R1'), 'dependants': ['s3', 'dl2']},
+    }
+    supports = {'s1': {'resolved': {'x': 0, 'y': 0}, 'type': 'Fixed'}, 's2': {'resolved': {'x': 6, 'y': 0}, 'type': 'Pinned'},
+                's3': {'resolved': {'x': 9, 'y': 4.5}, 'type': 'Pinned'}}
+    pointLoads = {'pl1': {'resolved': {'x': 2, 'y': 3}, 'type': 'Live'}, 'pl2': {'resolved': {'x': 4.5, 'y': 3}, 'type': 'Dead'}}
+    distributedLoads = {
+        'dl1': {'resolved': {'point1': {'x': 1, 'y': 3}, 'point2': {'x': 5, 'y': 3}}, 'type': 'Live', 'magnitude1': 2.0, 'magnitude2': 3.0},
+        'dl2': {'resolved': {'point1': {'x': 6, 'y': 3}, 'point2': {'x': 9, 'y': 4.5}}, 'type': 'Snow', 'magnitude1': 1.5, 'magnitude2': 1.5},
+        'dl3': {'resolved': {'point1': {'x': 0, 'y': 0}, 'point2': {'x': 0, 'y': 3}}, 'type': 'Wind', 'magnitude1': 0.8, 'magnitude2': 0.8},
+    }
+    momentLoads = {'ml1': {'resolved': {'x': 4, 'y': 3}, 'type': 'Nyttelast', 'magnitude': 1.0}}
+    return {'nodes': nodes, 'members': members, 'supports': supports, 'pointLoads': pointLoads,
+            'distributedLoads': distributedLoads, 'momentLoads': momentLoads}
+
+
+def build(entity_set):
+    # Model and load setup as in main.handler
+    project = Project()
+    model = Model()
+    s = S(model, project)
+    project.projectNumber = 'test'
+    project.address = 'test'
+    project.CC = 'CC2'
+    project.robustFactorOnOff = False
+    project.addNumberOfLevelsAbove(1)
+
+    model.addMembers(entity_set)
+    for support in entity_set['supports'].values():
+        x, y = support['resolved']['x'], support['resolved']['y']
+        if support['type'] == 'Fixed':
+            model.addSupport([x, y], 'x'); model.addSupport([x, y], 'y'); model.addSupport([x, y], 'r')
+        elif support['type'] == 'Pinned':
+            model.addSupport([x, y], 'x'); model.addSupport([x, y], 'y')
+        elif support['type'] == 'Roller':
+            model.addSupport([x, y], 'y')
+
+    loadtypes = {'Dead': 'Egenlast', 'Live': 'Nyttelast', 'Snow': 'Snelast', 'Wind': 'Vindlast'}
+    for id, point_load in entity_set['pointLoads'].items():
+        s.addPointLoad([point_load['resolved']['x'], point_load['resolved']['y']], point_load.get('force', [0, -10000]), loadtypes[point_load['type']], id)
+    for id, line_load in entity_set['distributedLoads'].items():
+        p1, p2 = sorted([line_load['resolved']['point1'], line_load['resolved']['point2']], key=lambda p: p['x'])
+        dx, dy = p2['x']-p1['x'], p2['y']-p1['y']
+        c = (dx**2+dy**2)**0.5
+        q1, q2 = line_load['magnitude1']*1e3, line_load['magnitude2']*1e3
+        if line_load['type'] == 'Wind':
+            # Perpendicular to the member
+            F1, F2 = [q1/c*dy, -q1/c*dx], [q2/c*dy, -q2/c*dx]
+        elif line_load['type'] == 'Snow':
+            # Per horizontal projection
+            F1, F2 = [0, -abs(dx/c)*q1], [0, -abs(dx/c)*q2]
+        else:
+            F1, F2 = [0, -q1], [0, -q2]
+        s.addLineLoad([p1['x'], p1['y']], [p2['x'], p2['y']], F1, F2, loadtypes[line_load['type']], id)
+    for id, moment_load in entity_set['momentLoads'].items():
+        s.addMoment([moment_load['resolved']['x'], moment_load['resolved']['y']], [moment_load['magnitude']*1e3], moment_load['type'], id)
+    s.addSelfweight()
+    return s
+
+
+def run(entity_set, model=None, **settings):
+    # settings are set on the S object, model on the FE model
+    s = build(entity_set)
+    for name, value in settings.items():
+        setattr(s, name, value)
+    for name, value in (model or {}).items():
+        setattr(s.model, name, value)
+    with contextlib.redirect_stdout(io.StringIO()):
+        s.run()
+    return s
+
+
+def governingURs(s):
+    # (member, limit state, check) -> highest UR over the reported combinations
+    URs = {}
+    for i, section in enumerate(s.sectionResults):
+        for state in ['ULS', 'SLS', 'ALS']:
+            for name, row in zip(section['URnames_' + state], section['UR_loadcomb_mat_' + state]):
+                URs[(i, state, name)] = np.nanmax(row)
+    return URs
+
+
+def summary(s, stride=10):
+    # Governing URs and the max/min over all combinations of the discretized results (every stride'th station),
+    # the content of baseline_portal_frame.json
+    envelopes = {}
+    for state, fields in s.loadCombinationsFE_discr.items():
+        envelopes[state] = {}
+        for field, combinations in fields.items():
+            values = np.array([np.asarray(v) for v in combinations.values()])
+            if field != 'R0':
+                values = values[:, ::stride]
+            envelopes[state][field] = {'max': values.max(0).tolist(), 'min': values.min(0).tolist()}
+    URs = [[i, state, name, value] for (i, state, name), value in governingURs(s).items()]
+    return {'URs': URs, 'envelopes': envelopes}
+
+
+class TestBaseline(unittest.TestCase):
+    # baseline_portal_frame.json holds summary(run(portal_frame())) of the original implementation
+
+    def test_portal_frame(self):
+        with open(BASELINE, encoding='utf-8') as f:
+            expected = json.load(f)
+        actual = summary(run(portal_frame()))
+        URs = {(i, state, name): value for i, state, name, value in actual['URs']}
+        self.assertEqual(len(URs), len(expected['URs']))
+        for i, state, name, value in expected['URs']:
+            self.assertAlmostEqual(URs[(i, state, name)], value, delta=1e-9*max(abs(value), 1), msg=(i, state, name))
+        for state, fields in expected['envelopes'].items():
+            for field, bounds in fields.items():
+                for bound in ['max', 'min']:
+                    values, reference = np.array(actual['envelopes'][state][field][bound]), np.array(bounds[bound])
+                    scale = np.max(np.abs(reference), initial=0) + 1e-12
+                    self.assertLessEqual(np.max(np.abs(values - reference), initial=0), 1e-9*scale, msg=(state, field, bound))
+
+
+class TestModel(unittest.TestCase):
+    # Section forces, displacements and reactions of all combinations at the stations of the discretization
+
+    def assertSameFields(self, reference, s, rtol=1e-9, fields=('F1', 'F2', 'M', 'Ve', 'R0')):
+        for state, results in reference.loadCombinationsFE_discr.items():
+            for field in fields:
+                self.assertEqual(list(results[field]), list(s.loadCombinationsFE_discr[state][field]))
+                for name, expected in results[field].items():
+                    expected, actual = np.asarray(expected), np.asarray(s.loadCombinationsFE_discr[state][field][name])
+                    scale = np.max(np.abs(expected), initial=0) + 1e-12
+                    self.assertLessEqual(np.max(np.abs(actual - expected), initial=0), rtol*scale, msg=(state, field, name))
+
+    def test_solver_backends(self):
+        # Dense Cholesky in the original dof order as the reference
+        for entity_set in [portal_frame(), continuous_beam(6, 2, steel)]:
+            reference = run(entity_set, model={'solver': 'dense', 'renumber': False})
+            for solver in ['auto', 'banded', 'sparse']:
+                with self.subTest(solver=solver):
+                    self.assertSameFields(reference, run(entity_set, model={'solver': solver}))
+
+    def test_condensation(self):
+        for entity_set in [portal_frame(), continuous_beam(6, 2, steel)]:
+            self.assertSameFields(run(entity_set), run(entity_set, model={'condense': True}))
+
+    def test_exact_fields(self):
+        # At the stations of the discretization the analytic fields agree with the spline interpolation of the nodal
+        # section forces, the deflections differ by the interpolation error of the splines
+        entity_set = continuous_beam(3, 2, steel)
+        reference, s = run(entity_set), run(entity_set, model={'exactFields': True})
+        for state, fields in reference.loadCombinationsFE_discr.items():
+            for field, rtol in [('F1', 1e-6), ('F2', 1e-6), ('M', 1e-6), ('Ve', 1e-3)]:
+                for name, expected in fields[field].items():
+                    expected, actual = np.asarray(expected), np.asarray(s.loadCombinationsFE_discr[state][field][name])
+                    scale = np.nanmax(np.abs(expected)) + 1e-12
+                    self.assertLessEqual(np.nanmax(np.abs(actual - expected)), rtol*scale, msg=(state, field, name))
+
+
+class TestLoadCombinations(unittest.TestCase):
+    # Above maxEnumeratedLoads variable loads only the sign based on/off states are generated, these must contain the
+    # governing combination of the exhaustive enumeration
+
+    def assertSameGoverning(self, entity_set, **settings):
+        exhaustive = governingURs(run(entity_set, maxEnumeratedLoads=64))
+        reduced = governingURs(run(entity_set, **settings))
+        self.assertEqual(set(exhaustive), set(reduced))
+        for key, value in exhaustive.items():
+            self.assertAlmostEqual(reduced[key], value, delta=1e-9*abs(value), msg=str(key))
+
+    def test_timber_sign_patterns(self):
+        # 9 variable loads. Switching wind on raises k_mod, the governing combination leaves it out
+        self.assertSameGoverning(continuous_beam(4, 3, wood), maxEnumeratedLoads=8)
+
+    def test_timber_envelope(self):
+        self.assertSameGoverning(continuous_beam(4, 3, wood), maxEnumeratedLoads=8, envelopeMode=True)
+
+    def test_steel_sign_patterns(self):
+        self.assertSameGoverning(continuous_beam(4, 3, steel), maxEnumeratedLoads=8)
+
+    def test_timber_axial_interaction(self):
+        # 9 variable loads, 4 of them with a large axial compression and a small moment against that of the others.
+        # The governing 6.2.4 combination has them on, which no sign based state of a single output does
+        entity_set = point_loaded_beam(wood, [(0.5+0.6*j, [0, -1000]) for j in range(5)] + [(0.8+0.8*j, [-50000, 10]) for j in range(4)])
+        self.assertSameGoverning(entity_set, maxEnumeratedLoads=8)
+        self.assertSameGoverning(entity_set, maxEnumeratedLoads=8, envelopeMode=True)
+
+
+class TestEnvelope(unittest.TestCase):
+
+    def test_envelope_mode(self):
+        # The envelope combinations reproduce the max/min over all combinations and the governing URs
+        for entity_set in [portal_frame(), continuous_beam(4, 2, steel)]:
+            reference, s = run(entity_set), run(entity_set, envelopeMode=True)
+            for state, envelopes in s.envelopes.items():
+                arrays = reference._loadCombinationArrays[state]
+                for field, values in [('F1', arrays['F1']), ('M', arrays['M']), ('VeY', arrays['Ve'][...,1]), ('R0', arrays['R0'])]:
+                    scale = np.max(np.abs(values), initial=0) + 1e-12
+                    self.assertLessEqual(np.max(np.abs(values.max(0) - envelopes[field]['max'])), 1e-12*scale, msg=(state, field))
+                    self.assertLessEqual(np.max(np.abs(values.min(0) - envelopes[field]['min'])), 1e-12*scale, msg=(state, field))
+            expected, actual = governingURs(reference), governingURs(s)
+            for key, value in expected.items():
+                self.assertAlmostEqual(actual[key], value, delta=1e-12*abs(value), msg=str(key))
+
+
+class TestPruning(unittest.TestCase):
+
+    def test_pruned_section_results(self):
+        # Pre-screening skips only combinations that cannot govern, the reported results are unchanged
+        for entity_set in [portal_frame(), continuous_beam(6, 2, steel), continuous_beam(4, 3, wood)]:
+            reference, s = run(entity_set, pruneCombinations=False), run(entity_set)
+            np.testing.assert_equal(s.sectionResults, reference.sectionResults)
+
+
+class TestCombinationObjects(unittest.TestCase):
+
+    def test_reported_combinations(self):
+        # EC objects only for the reported combinations and the first one, with the URs of sectionResults, stand-ins
+        # with the same URs for the others
+        for entity_set in [portal_frame(), continuous_beam(4, 3, wood)]:
+            s = run(entity_set)
+            for state in ['ULS', 'SLS', 'ALS']:
+                names = list(s.loadCombinations[state])
+                reported = set(s.sectionResults[0]['LoadCombnames_' + state]) | set(names[:1])
+                for i, section in enumerate(s.sectionResults):
+                    for comb in names:
+                        m = s.loadCombinations[state][comb][i]
+                        self.assertEqual(isinstance(m, UnreportedCombination), comb not in reported)
+                    for k, comb in enumerate(section['LoadCombnames_' + state]):
+                        UR = s.loadCombinations[state][comb][i].UR
+                        expected = dict(zip(section['URnames_' + state], section['UR_loadcomb_mat_' + state][:, k]))
+                        for name, value in expected.items():
+                            if np.isnan(value):
+                                self.assertNotIn(name, UR)
+                            else:
+                                self.assertAlmostEqual(UR[name], value, delta=1e-12*abs(value), msg=(state, comb, name))
+
+
+class TestColumnar(unittest.TestCase):
+
+    def test_round_trip(self):
+        s = run(portal_frame())
+        forces = s.loadCombinationsFE_discr
+        back = unpack_columnar(pack_columnar({'s': s, 'result': {'forces': forces, 'UR': s.sectionResults}}))
+        for state, fields in forces.items():
+            for field, combinations in fields.items():
+                self.assertEqual(list(combinations), list(back['result']['forces'][state][field]))
+                for name, values in combinations.items():
+                    np.testing.assert_array_equal(back['result']['forces'][state][field][name], np.asarray(values))
+        for expected, actual in zip(s.sectionResults, back['result']['UR']):
+            for key, value in expected.items():
+                if isinstance(value, np.ndarray) and value.dtype.kind in 'biuf':
+                    # Arrays below MIN_BLOCK_SIZE are lists in the manifest, with None for NaN/Inf
+                    expected = np.where(np.isfinite(value), value, np.nan) if not isinstance(actual[key], np.ndarray) else value
+                    np.testing.assert_array_equal(np.array(actual[key], dtype=float), expected, err_msg=key)
+        np.testing.assert_array_equal(back['s']['X_discr'], s.X_discr)
+
+    def test_none_for_nan(self):
+        # Outside the data block NaN/Inf are written as None like in the JSONB output: coor2 of point loads, moments and self
+        # weight is [None, None], which the report uses to tell them from line loads
+        s = run(portal_frame())
+        stats = {'nan': 0, 'inf': 0, '-inf': 0}
+        back = unpack_columnar(pack_columnar({'s': s}, stats))['s']
+        for form, coor2, expected in zip(s.loadform, back['coor2'], s.coor2):
+            self.assertEqual(coor2, [None, None] if form != 'lineload' else expected)
+        self.assertGreater(stats['nan'], 0)
+
+        report = os.path.join(os.path.dirname(__file__), '..', 'generate-report-lambda')
+        path = list(sys.path)
+        sys.path[:0] = [report, os.path.join(report, 'src')]
+        try:
+            import create_report
+        except ImportError as e:
+            self.skipTest(f'report dependencies not installed: {e}')
+        finally:
+            sys.path[:] = path
+        rows = create_report.load_table(create_report._wrap_struct(back))
+        self.assertEqual([row['lasttype'] for row in rows], ['Linjelast']*s.loadform.count('lineload'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for lib.serialization: with a stats dict NaN/Inf are replaced by None during serialization and counted, with
+the same output and counts as the former serialize + _sanitize pass of main.handler.
+
+Run with: python -m pytest run-simulation-lambda/test_serialization.py
+"""
+import json
+import os
+import sys
+import unittest
+from math import isnan, isinf
+
+import numpy as np
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from lib.serialization import serialize_instance
+
+
+def sanitize_reference(v, stats):
+    # The former _sanitize of main.handler, applied after serialize_instance
+    if isinstance(v, float):
+        if isnan(v):
+            stats['nan'] += 1
+            return None
+        if isinf(v):
+            if v > 0:
+                stats['inf'] += 1
+            else:
+                stats['-inf'] += 1
+            return None
+        return v
+    if isinstance(v, dict):
+        return {k: sanitize_reference(x, stats) for k, x in v.items()}
+    if isinstance(v, list):
+        return [sanitize_reference(x, stats) for x in v]
+    if isinstance(v, tuple):
+        return [sanitize_reference(x, stats) for x in v]
+    return v
+
+
+class Section:
+    __slots__ = ['name', 'UR', '_cache']
+
+    def __init__(self, name, UR):
+        self.name = name
+        self.UR = UR
+        self._cache = np.full(3, np.nan)
+
+
+class Result:
+    def __init__(self, rng):
+        forces = rng.normal(size=(4, 3, 11))
+        forces[0, 1, 2] = np.nan
+        forces[2, :, 5] = np.inf
+        forces[3, 0, 0] = -np.inf
+        self.forces = {'ULS': {'Komb. 1': forces, 'Komb. 2': forces[1:]}, 'SLS': {}}
+        self.sections = [Section('B0', np.array([[0.5, np.nan], [np.inf, 1.2]])), Section('B1', np.zeros((0, 2)))]
+        self.scalars = [np.float64(np.nan), float('-inf'), np.float32(2.5), 1.5, np.int64(3), np.bool_(True)]
+        self.mixed = np.array([1.0, None, 'a', np.nan], dtype=object)
+        self.zero_dim = np.array(np.inf)
+        self.integers = np.arange(6).reshape(2, 3)
+        self.pair = (np.array([np.nan, 1.0]), 'x')
+        self._private = np.full(5, np.nan)
+        self.callback = lambda: None
+
+
+class TestSanitize(unittest.TestCase):
+
+    def assertSameAsReference(self, obj):
+        reference_stats = {'nan': 0, 'inf': 0, '-inf': 0}
+        reference = sanitize_reference(serialize_instance(obj), reference_stats)
+        stats = {'nan': 0, 'inf': 0, '-inf': 0}
+        payload = serialize_instance(obj, stats)
+        self.assertEqual(stats, reference_stats)
+        self.assertEqual(json.dumps(payload, allow_nan=False), json.dumps(reference, allow_nan=False))
+
+    def test_counts_and_output(self):
+        self.assertSameAsReference({'s': Result(np.random.default_rng(0))})
+
+    def test_finite(self):
+        stats = {'nan': 0, 'inf': 0, '-inf': 0}
+        payload = serialize_instance({'a': np.linspace(0, 1, 5), 'b': [1.0, 2]}, stats)
+        self.assertEqual(stats, {'nan': 0, 'inf': 0, '-inf': 0})
+        self.assertEqual(payload, {'a': [0.0, 0.25, 0.5, 0.75, 1.0], 'b': [1.0, 2]})
+
+    def test_counts(self):
+        stats = {'nan': 0, 'inf': 0, '-inf': 0}
+        payload = serialize_instance([np.array([np.nan, np.inf, -np.inf, np.nan, 1.0]), np.float64(np.nan)], stats)
+        self.assertEqual(stats, {'nan': 3, 'inf': 1, '-inf': 1})
+        self.assertEqual(payload, [[None, None, None, None, 1.0], None])
+
+    def test_without_stats(self):
+        # Without stats NaN/Inf are kept, as before
+        payload = serialize_instance({'a': np.array([np.nan, 1.0])})
+        self.assertTrue(isnan(payload['a'][0]))
+
+
+if __name__ == '__main__':
+    unittest.main()